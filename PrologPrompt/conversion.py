@@ -1,7 +1,14 @@
 import os
 import random
 import pandas as pd
-import openai
+import sys
+import time
+
+# Run as a file (python PrologPrompt/<script>.py): make the repository's fallacy package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fallacy.clients import make_sdk_client
+from fallacy.telemetry import Telemetry, error_class, response_tokens
 
 # ——— CONFIGURATION ——————————————————————————————————————————————————————
 API_KEY = "YOUR_API_KEY"    # leave empty as requested
@@ -9,9 +16,12 @@ CSV_PATH = "SmartyPat_label.csv"
 EXAMPLES_DIR = "."          # where your *_examples.txt live
 OUTPUT_DIR = "outputs"
 MAX_SENTENCES = 25
+MODEL = "gpt-4o"
+TELEMETRY_FILE = os.path.join(OUTPUT_DIR, "telemetry")  # Written as .json and .prom
 
 # Initialize OpenAI client
-client = openai.OpenAI(api_key=API_KEY)
+client = make_sdk_client("openai", API_KEY, sync=True)
+telemetry = Telemetry()
 
 # Fallacy definitions
 definitions = {
@@ -65,12 +75,21 @@ def generate_fallacy_sentences(fallacy_type, definition, sentences, facts):
     List: {sentences}
     PrologFacts: {facts}
 """
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-        max_tokens=4000
-    )
+    metrics = telemetry.get(MODEL, fallacy_type)
+    start = time.monotonic()
+    try:
+        response = client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=4000
+        )
+    except Exception as e:
+        metrics.record_call(time.monotonic() - start, error=error_class(e))
+        metrics.record_request(time.monotonic() - start, ok=False)
+        raise
+    metrics.record_call(time.monotonic() - start, response_tokens("openai", response))
+    metrics.record_request(time.monotonic() - start)
     return response.choices[0].message.content
 
 # ——— MAIN WORKFLOW —————————————————————————————————————————————————————
@@ -104,5 +123,7 @@ def main():
 
         print(f"  • Saved output to {out_path}")
 
+    telemetry.write(TELEMETRY_FILE)
+
 if __name__ == "__main__":
     main()
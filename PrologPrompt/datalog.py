@@ -0,0 +1,731 @@
+"""
+Embedded Datalog engine for the Prolog rules and facts of fallacies.pl.
+
+The fallacy rules are Datalog: facts over atoms, conjunctive rules, the
+comparisons \\=, =, ==, \\==, @<, @>, @=< and @>=, and negation as failure
+(\\+ Goal or \\+ (Goal, ...)). This module parses that subset of Prolog and
+evaluates every rule bottom-up, so the knowledge generated by prompt.py can be
+checked at scale without SWI-Prolog:
+
+- predicates are evaluated stratum by stratum (strongly connected components
+  of the dependency graph), so a negated goal is only read once complete;
+- recursive predicates such as implies_transitively use semi-naive
+  evaluation: each round joins only the tuples derived in the round before;
+- every relation is indexed lazily on the argument positions a rule looks up,
+  so joins are hash lookups instead of scans.
+
+Clauses outside the subset are skipped and reported with their line, not
+fatal: the listall_* drivers (write/1, format/2, findall/3, fail), negative
+facts such as "\\+implies(a, b).", which Prolog refuses as well, and syntax
+errors such as a predicate name starting with an upper-case letter. Goals on
+predicates that have no clause are reported as undefined; they have no
+solutions. Numbers are kept as numbers and tokens such as 2_mins as atoms.
+
+Usage (from the repository root):
+    python -m PrologPrompt.datalog
+    python -m PrologPrompt.datalog PrologPrompt/fallacies.pl improper_transposition_examples.txt --json instances.json
+    python -m PrologPrompt.datalog --query "implies_transitively(fever, X)"
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fallacies.pl")
+
+# Fallacy predicates of fallacies.pl -> fallacy type, as labelled in the CSVs
+FALLACIES = {
+    "accident_fallacy": "accident fallacy",
+    "wrong_direction": "wrong direction",
+    "improper_dist": "improper distribution or addition",
+    "false_analogy": "false analogy",
+    "false_premise": "false premise",
+    "fallacy_of_composition": "fallacy of composition",
+    "begging_the_question": "begging the question",
+    "contextomy": "contextomy",
+    "inverse_error": "inverse error",
+    "strong_improper_transposition": "improper transposition",
+    "false_cause": "false cause",
+}
+COMPARISONS = {"\\=", "=", "==", "\\==", "@<", "@>", "@=<", "@>="}
+# Built-ins with side effects or outside Datalog; clauses calling them are skipped
+UNSUPPORTED = {"write", "writeln", "print", "nl", "format", "fail", "false", "findall", "bagof", "setof",
+               "forall", "assert", "asserta", "assertz", "retract", "is", "call", "!"}
+
+TOKEN = re.compile(r"""
+    (?P<space>\s+|%[^\n]*|/\*.*?\*/)
+  | (?P<end>\.(?=\s|%|$))
+  | (?P<var>[A-Z_][A-Za-z0-9_]*)
+  | (?P<atom>[a-z][A-Za-z0-9_]*|[0-9][A-Za-z0-9_]*(?:\.[0-9]+)?|'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|\[\])
+  | (?P<op>:-|\\\+|\\==|\\=|@=<|@>=|@<|@>|==|=|[(),\[\]|])
+  | (?P<other>\S)
+""", re.X | re.S)
+NUMBER = re.compile(r"[0-9]+(?:\.[0-9]+)?")
+
+Var = namedtuple("Var", "name")
+Struct = namedtuple("Struct", "name args")  # Compound term, or a goal
+
+
+class DatalogError(Exception):
+    """A program the engine cannot evaluate, e.g. one with negation through recursion."""
+
+
+class PrologSyntaxError(Exception):
+    def __init__(self, message: str, line: int):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+# ========== Parsing ==========
+def atom_value(text: str):
+    """The Python value of an atom or number token."""
+    if NUMBER.fullmatch(text):
+        return float(text) if "." in text else int(text)
+    if text[0] in "'\"":
+        body = text[1:-1].replace(text[0] * 2, text[0])
+        return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), body)
+    return text
+
+
+def tokenize(text: str):
+    """Yield (kind, value, line) tokens, ending every clause with an "end" token."""
+    line = 1
+    for match in TOKEN.finditer(text):
+        kind, value = match.lastgroup, match.group()
+        if kind != "space":
+            yield kind, value, line
+        line += value.count("\n")
+    yield "end", "", line
+
+
+class Parser:
+    """Recursive-descent parser for one clause at a time."""
+
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.pos = 0
+        self.anonymous = 0
+
+    def peek(self, offset: int = 0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value: str):
+        kind, text, line = self.next()
+        if text != value:
+            raise PrologSyntaxError(f"expected {value!r}, found {text or 'end of clause'!r}", line)
+
+    def clause(self):
+        """(head, body) of the clause; body is a list of goals, empty for a fact."""
+        if self.peek()[1] == "\\+":  # "\+fact." would redefine \+/1, which Prolog refuses
+            raise PrologSyntaxError("negative facts cannot be asserted", self.peek()[2])
+        head = self.term()
+        body = []
+        if self.peek()[1] == ":-":
+            self.next()
+            body = self.conjunction()
+        kind, text, line = self.next()
+        if kind != "end":
+            raise PrologSyntaxError(f"operator expected before {text!r}", line)
+        return head, body
+
+    def conjunction(self) -> list:
+        goals = [self.goal()]
+        while self.peek()[1] == ",":
+            self.next()
+            goals.append(self.goal())
+        return goals
+
+    def goal(self):
+        if self.peek()[1] == "\\+":
+            self.next()
+            return Struct("\\+", (self.goal(),))
+        if self.peek()[1] == "(":
+            self.next()
+            goals = self.conjunction()
+            self.expect(")")
+            return goals[0] if len(goals) == 1 else Struct(",", tuple(goals))
+        left = self.term()
+        if self.peek()[1] in COMPARISONS:
+            op = self.next()[1]
+            return Struct(op, (left, self.term()))
+        return left
+
+    def term(self):
+        kind, text, line = self.next()
+        if kind == "var":
+            if self.peek()[1] == "(":
+                raise PrologSyntaxError(f"predicate name {text} must start with a lower-case letter", line)
+            if text == "_":
+                self.anonymous += 1
+                return Var(f"_{self.anonymous}")
+            return Var(text)
+        if kind == "atom":
+            value = atom_value(text)
+            if self.peek()[1] == "(" and isinstance(value, str):
+                self.next()
+                args = [self.argument()]
+                while self.peek()[1] == ",":
+                    self.next()
+                    args.append(self.argument())
+                self.expect(")")
+                return Struct(value, tuple(args))
+            return value
+        if text == "[":  # Lists only appear in the drivers; parsed so those can be skipped
+            items = []
+            while self.peek()[1] != "]":
+                items.append(self.argument())
+                if self.peek()[1] in (",", "|"):
+                    self.next()
+                elif self.peek()[1] != "]":
+                    raise PrologSyntaxError(f"unexpected {self.peek()[1]!r} in list", self.peek()[2])
+            self.next()
+            return Struct("[]", tuple(items))
+        raise PrologSyntaxError(f"unexpected {text or 'end of clause'!r}", line)
+
+    def argument(self):
+        return self.goal()
+
+
+def ground_fact(tokens: list):
+    """The head of a clause such as "cause(rain, wet_streets).", the bulk of any fact file, or None."""
+    if len(tokens) < 5 or tokens[0][0] != "atom" or tokens[1][1] != "(" or tokens[-2][1] != ")":
+        return None
+    if any(kind != "atom" for kind, _, _ in tokens[2:-2:2]) or any(text != "," for _, text, _ in tokens[3:-2:2]):
+        return None
+    name = atom_value(tokens[0][1])
+    return Struct(name, tuple(atom_value(text) for _, text, _ in tokens[2:-2:2])) if isinstance(name, str) else None
+
+
+def parse(text: str, source: str = "<string>"):
+    """Yield (head, body, line) for every clause, or (None, error, line) for a clause that cannot be parsed."""
+    clause = []
+    for token in tokenize(text):
+        clause.append(token)
+        if token[0] != "end":
+            continue
+        fact = ground_fact(clause)
+        if fact is not None:
+            yield fact, [], clause[0][2]
+        elif len(clause) > 1:
+            try:
+                head, body = Parser(clause).clause()
+                yield head, body, clause[0][2]
+            except PrologSyntaxError as e:
+                yield None, f"{source}:{e}", clause[0][2]
+        clause = []
+
+
+# ========== Relations ==========
+class Relation:
+    """A set of tuples with hash indexes on the argument positions that are looked up."""
+
+    def __init__(self, arity: int):
+        self.arity = arity
+        self.tuples = set()
+        self.indexes = {}  # Bound positions -> {key: [tuples]}
+
+    def __len__(self):
+        return len(self.tuples)
+
+    def add(self, row: tuple) -> bool:
+        if row in self.tuples:
+            return False
+        self.tuples.add(row)
+        for positions, index in self.indexes.items():
+            index.setdefault(tuple(row[p] for p in positions), []).append(row)
+        return True
+
+    def lookup(self, positions: tuple, key: tuple):
+        """Tuples whose values at positions equal key."""
+        if not positions:
+            return self.tuples
+        if len(positions) == self.arity:
+            return (key,) if key in self.tuples else ()
+        index = self.indexes.get(positions)
+        if index is None:
+            index = self.indexes[positions] = {}
+            for row in self.tuples:
+                index.setdefault(tuple(row[p] for p in positions), []).append(row)
+        return index.get(key, ())
+
+
+# ========== Rules ==========
+def is_goal(term) -> bool:
+    return isinstance(term, (str, Struct))
+
+
+def predicate(goal) -> tuple:
+    """(name, arity) of a goal."""
+    return (goal, 0) if isinstance(goal, str) else (goal.name, len(goal.args))
+
+
+def variables(term, found: list = None) -> list:
+    found = found if found is not None else []
+    if isinstance(term, Var):
+        if term not in found:
+            found.append(term)
+    elif isinstance(term, Struct):
+        for arg in term.args:
+            variables(arg, found)
+    return found
+
+
+def flatten(goals) -> list:
+    """Goals of a body with nested conjunctions spliced in and "true" removed."""
+    flat = []
+    for goal in goals:
+        if isinstance(goal, Struct) and goal.name == ",":
+            flat.extend(flatten(goal.args))
+        elif goal != "true":
+            flat.append(goal)
+    return flat
+
+
+def is_positive(goal) -> bool:
+    return isinstance(goal, str) or goal.name not in COMPARISONS and goal.name != "\\+"
+
+
+def join_order(goals: list, first: int = None) -> list:
+    """
+    The goals of a body in the order they are joined: goals[first], if given,
+    then repeatedly the positive goal with the most arguments already bound
+    (the earliest one on ties), each comparison or negation as soon as the
+    variables it shares with the rest of the body are bound. Rules have no side
+    effects, so the order changes the cost of a join, never its result; e.g.
+    inverse_error joins implies/2 before the second complement_cases/2 instead
+    of building the product of both.
+    """
+    positive = [goal for goal in goals if is_positive(goal)]
+    filters = [goal for goal in goals if not is_positive(goal)]
+    shared = set(variables(Struct(",", tuple(positive))))
+    bound, ordered = set(), []
+
+    def ready(goal) -> bool:
+        if goal.name == "=":
+            return any(not isinstance(arg, Var) or arg in bound for arg in goal.args)
+        return all(var in bound for var in variables(goal) if var in shared)
+
+    def place(goal=None):
+        if goal is not None:
+            ordered.append(goal)
+            bound.update(variables(goal))
+        for waiting in list(filters):
+            if waiting in filters and ready(waiting):
+                filters.remove(waiting)
+                place(waiting)
+
+    if first is not None:
+        positive.remove(goals[first])
+    place(goals[first] if first is not None else None)
+    while positive:
+        goal = max(positive, key=lambda goal: sum(1 for arg in (goal.args if isinstance(goal, Struct) else ())
+                                                  if not isinstance(arg, Var) or arg in bound))
+        positive.remove(goal)
+        place(goal)
+    return ordered + filters
+
+
+class Rule:
+    """
+    A clause compiled into a join plan. Variables become slots of one binding
+    list; each step is a lookup on an indexed relation, a comparison or a
+    negated sub-plan. The clause is checked for safety (every variable bound
+    before it is compared, negated or put in the head) in the order it is
+    written, then compiled in join_order.
+    """
+
+    def __init__(self, head, body: list, line: int = 0, first: int = None):
+        self.line = line
+        self.head_term = head
+        self.body = flatten(body)
+        self.key = predicate(head)
+        self.slots = {}
+        bound = set()
+        self.compile(self.body, bound)  # Raises if the clause is unsafe as written
+        self.head = [self.operand(arg, "head", bound) for arg in (head.args if isinstance(head, Struct) else ())]
+        self.steps = self.compile(join_order(self.body, first), set())
+        self.uses = [step[1] for step in self.walk(self.steps) if step[0] == "scan"]
+        self.negated = [step[1] for step in self.walk(self.steps) if step[0] == "scan_negated"]
+
+    def slot(self, var: Var) -> int:
+        return self.slots.setdefault(var, len(self.slots))
+
+    def operand(self, term, where: str, bound: set):
+        """(True, value) for a constant, (False, slot) for a bound variable."""
+        if isinstance(term, Var):
+            if term not in bound:
+                raise DatalogError(f"variable {term.name} in {where} is not bound by a goal before it")
+            return False, self.slot(term)
+        if isinstance(term, Struct):
+            raise DatalogError(f"compound term {term.name}/{len(term.args)} in {where}")
+        return True, term
+
+    def compile(self, goals: list, bound: set) -> list:
+        steps = []
+        for goal in goals:
+            if not is_goal(goal):
+                raise DatalogError(f"{goal!r} is not a goal")
+            name, arity = predicate(goal)
+            if name in UNSUPPORTED:
+                raise DatalogError(f"{name}/{arity} is not supported")
+            if name == "\\+":
+                inner = flatten(goal.args)
+                steps.append(("not", self.compile(inner, set(bound))))
+                continue
+            if name in COMPARISONS and arity == 2:
+                left, right = goal.args
+                if name == "=" and isinstance(left, Var) and left not in bound:
+                    left, right = right, left
+                if name == "=" and isinstance(right, Var) and right not in bound:
+                    steps.append(("assign", self.slot(right), self.operand(left, "=", bound)))
+                    bound.add(right)
+                else:
+                    steps.append(("compare", name, self.operand(left, name, bound), self.operand(right, name, bound)))
+                continue
+            positions, key, assign, checks = [], [], [], []
+            for position, arg in enumerate(goal.args if isinstance(goal, Struct) else ()):
+                if isinstance(arg, Struct):
+                    raise DatalogError(f"compound term {arg.name}/{len(arg.args)} in {name}/{arity}")
+                if isinstance(arg, Var) and arg not in bound:
+                    if arg in (var for _, var in assign):
+                        checks.append((position, self.slot(arg)))
+                    else:
+                        assign.append((position, arg))
+                    continue
+                positions.append(position)
+                key.append(self.operand(arg, f"{name}/{arity}", bound))
+            bound.update(var for _, var in assign)
+            steps.append(("scan", (name, arity), tuple(positions), key,
+                          [(position, self.slot(var)) for position, var in assign], checks))
+        return steps
+
+    def walk(self, steps: list, negated: bool = False):
+        """Every step, with scans under a negation reported as "scan_negated"."""
+        for step in steps:
+            if step[0] == "not":
+                yield from self.walk(step[1], True)
+            elif step[0] == "scan" and negated:
+                yield ("scan_negated",) + step[1:]
+            else:
+                yield step
+
+    def delta_plans(self, component: set) -> list:
+        """
+        For semi-naive rounds: one copy of the rule per positive goal on a
+        predicate of component, with that goal moved first so the join starts
+        from the few tuples derived in the round before.
+        """
+        return [(predicate(goal), Rule(self.head_term, self.body, self.line, first=idx))
+                for idx, goal in enumerate(self.body) if is_positive(goal) and predicate(goal) in component]
+
+    def run(self, relations: dict, delta: tuple = None):
+        """
+        Yield the head tuples the body derives. delta, as (step index, relation),
+        reads that one positive goal from the given relation instead.
+        """
+        env = [None] * len(self.slots)
+        head = self.head
+        for _ in solve(self.steps, 0, env, relations, delta):
+            yield tuple(value if constant else env[value] for constant, value in head)
+
+
+def value_of(operand: tuple, env: list):
+    constant, value = operand
+    return value if constant else env[value]
+
+
+def order_key(value):
+    """Prolog's standard order for the values used here: numbers before atoms."""
+    return (0, value) if isinstance(value, (int, float)) else (1, value)
+
+
+def compare(op: str, left, right) -> bool:
+    if op in ("\\=", "\\=="):
+        return left != right
+    if op in ("=", "=="):
+        return left == right
+    left, right = order_key(left), order_key(right)
+    return {"@<": left < right, "@>": left > right, "@=<": left <= right, "@>=": left >= right}[op]
+
+
+def solve(steps: list, index: int, env: list, relations: dict, delta: tuple = None):
+    """Depth-first join of steps[index:], binding slots of env in place."""
+    if index == len(steps):
+        yield True
+        return
+    step = steps[index]
+    kind = step[0]
+    if kind == "scan":
+        _, key, positions, bound, assign, checks = step
+        relation = delta[1] if delta is not None and delta[0] == index else relations.get(key)
+        if relation is None:
+            return
+        for row in relation.lookup(positions, tuple(value_of(operand, env) for operand in bound)):
+            for position, slot in assign:
+                env[slot] = row[position]
+            if all(row[position] == env[slot] for position, slot in checks):
+                yield from solve(steps, index + 1, env, relations, delta)
+    elif kind == "compare":
+        if compare(step[1], value_of(step[2], env), value_of(step[3], env)):
+            yield from solve(steps, index + 1, env, relations, delta)
+    elif kind == "assign":
+        env[step[1]] = value_of(step[2], env)
+        yield from solve(steps, index + 1, env, relations, delta)
+    elif kind == "not":
+        if not any(solve(step[1], 0, env, relations)):
+            yield from solve(steps, index + 1, env, relations, delta)
+
+
+# ========== Programs ==========
+class Program:
+    """Facts and compiled rules from one or more Prolog files, plus the clauses that were skipped."""
+
+    def __init__(self):
+        self.facts = {}  # (name, arity) -> set of tuples
+        self.rules = []
+        self.skipped = []  # (source:line, reason)
+        self.fields = {}  # (name, arity) -> argument names of the first rule head
+
+    def consult(self, text: str, source: str = "<string>"):
+        """Add the clauses of a Prolog text."""
+        for head, body, line in parse(text, source):
+            where = f"{source}:{line}"
+            if head is None:
+                self.skipped.append((where, body.split(":", 2)[-1].strip()))
+                continue
+            try:
+                if not is_goal(head) or predicate(head)[0] in (",", "\\+") or predicate(head)[0] in COMPARISONS:
+                    raise DatalogError("the head is not a predicate")
+                if body:
+                    rule = Rule(head, body, line)
+                    self.rules.append(rule)
+                    self.fields.setdefault(rule.key, [arg.name if isinstance(arg, Var) else None
+                                                      for arg in head.args] if isinstance(head, Struct) else [])
+                else:
+                    args = head.args if isinstance(head, Struct) else ()
+                    if any(isinstance(arg, (Var, Struct)) for arg in args):
+                        raise DatalogError("facts must be ground atoms")
+                    self.facts.setdefault(predicate(head), set()).add(tuple(args))
+            except DatalogError as e:
+                self.skipped.append((where, f"{'/'.join(map(str, predicate(head)))}: {e}"))
+        return self
+
+    def load(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            return self.consult(f.read(), os.path.basename(path))
+
+    def defined(self) -> set:
+        return set(self.facts) | {rule.key for rule in self.rules}
+
+    def undefined(self) -> list:
+        """Predicates called by a rule without any clause of their own."""
+        called = {key for rule in self.rules for key in rule.uses + rule.negated}
+        return sorted(called - self.defined())
+
+    def strata(self) -> list:
+        """
+        Predicates defined by rules, grouped into strongly connected components
+        in evaluation order. Raises DatalogError on negation through recursion.
+        """
+        graph = {}
+        for rule in self.rules:
+            graph.setdefault(rule.key, set()).update(rule.uses, rule.negated)
+        order, low, stack, on_stack, components = {}, {}, [], set(), []
+
+        def connect(node):  # Tarjan: components come out dependencies first
+            order[node] = low[node] = len(order)
+            stack.append(node)
+            on_stack.add(node)
+            for succ in graph.get(node, ()):
+                if succ not in order:
+                    connect(succ)
+                    low[node] = min(low[node], low[succ])
+                elif succ in on_stack:
+                    low[node] = min(low[node], order[succ])
+            if low[node] == order[node]:
+                component = set()
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.add(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 10 * len(graph) + 100))
+        try:
+            for node in sorted(graph):
+                if node not in order:
+                    connect(node)
+        finally:
+            sys.setrecursionlimit(limit)
+        strata = []
+        for component in components:
+            defined = component & {rule.key for rule in self.rules}
+            if not defined:
+                continue
+            for rule in self.rules:
+                if rule.key in component and component & set(rule.negated):
+                    raise DatalogError(f"{rule.key[0]}/{rule.key[1]} (line {rule.line}) depends on its own "
+                                       f"negation; the program is not stratified")
+            strata.append(defined)
+        return strata
+
+    def evaluate(self) -> "Model":
+        """Every tuple the program derives, by semi-naive bottom-up evaluation."""
+        start = time.monotonic()
+        relations = {}
+        for key, rows in self.facts.items():
+            relation = relations[key] = Relation(key[1])
+            for row in rows:
+                relation.add(row)
+        rounds = 0
+        for component in self.strata():
+            for key in component:
+                relations.setdefault(key, Relation(key[1]))
+            rules = [rule for rule in self.rules if rule.key in component]
+            # Round one: every rule against everything known so far
+            delta = {key: Relation(key[1]) for key in component}
+            for rule in rules:
+                for row in list(rule.run(relations)):
+                    if relations[rule.key].add(row):
+                        delta[rule.key].add(row)
+            rounds += 1
+            plans = [plan for rule in rules for plan in rule.delta_plans(component)]
+            # Later rounds: only joins that read at least one tuple derived in the round before
+            while plans and any(delta.values()):
+                new = {key: Relation(key[1]) for key in component}
+                for key, plan in plans:
+                    if not delta[key]:
+                        continue
+                    for row in plan.run(relations, (0, delta[key])):
+                        if row not in relations[plan.key].tuples:
+                            new[plan.key].add(row)
+                for key, relation in new.items():
+                    for row in relation.tuples:
+                        relations[key].add(row)
+                delta = new
+                rounds += 1
+        return Model(self, relations, time.monotonic() - start, rounds)
+
+
+class Model:
+    """The evaluated program: every derived tuple, queryable by predicate or goal."""
+
+    def __init__(self, program: Program, relations: dict, seconds: float, rounds: int):
+        self.program = program
+        self.relations = relations
+        self.seconds = seconds
+        self.rounds = rounds
+
+    def tuples(self, name: str, arity: int = None) -> list:
+        """Sorted tuples of a predicate (of any arity it has, when arity is None)."""
+        rows = set()
+        for (rel_name, rel_arity), relation in self.relations.items():
+            if rel_name == name and arity in (None, rel_arity):
+                rows |= relation.tuples
+        return sorted(rows, key=lambda row: [order_key(value) for value in row])
+
+    def instances(self, name: str) -> list:
+        """
+        Tuples of a rule-defined predicate as named tuples, with fields named
+        after the variables of its rule head, e.g. accident_fallacy rows as
+        (entity, rule, reasonable, misapplied).
+        """
+        keys = [key for key in self.program.fields if key[0] == name] or [(name, None)]
+        rows = []
+        for key in keys:
+            names = [snake_case(field) if field else f"arg{idx + 1}"
+                     for idx, field in enumerate(self.program.fields.get(key, []))]
+            if len(set(names)) != len(names):
+                names = [f"arg{idx + 1}" for idx in range(len(names))]
+            row_type = namedtuple(name, names) if key[1] is not None else tuple
+            rows.extend(row_type(*row) if key[1] is not None else row for row in self.tuples(*key))
+        return rows
+
+    def query(self, text: str) -> list:
+        """Bindings of the variables of a goal such as "implies_transitively(fever, X)"."""
+        head, body, _ = next(parse(f"query :- {text.strip().rstrip('.')}.", "query"))
+        if head is None:
+            raise DatalogError(body)
+        rule = Rule("query", body)
+        names = [var for var in rule.slots if not var.name.startswith("_")]
+        env = [None] * len(rule.slots)
+        answers = {tuple(env[rule.slots[var]] for var in names) for _ in solve(rule.steps, 0, env, self.relations)}
+        return [dict(zip((var.name for var in names), answer))
+                for answer in sorted(answers, key=lambda row: [order_key(value) for value in row])]
+
+    def fallacies(self) -> dict:
+        """Derived instances of every predicate in FALLACIES, by fallacy type."""
+        return {label: self.instances(name) for name, label in FALLACIES.items()}
+
+
+def snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+
+def load_program(*paths: str) -> Program:
+    """A program made of the clauses of every file, consulted in order."""
+    program = Program()
+    for path in paths or (DEFAULT_FILE,):
+        program.load(path)
+    return program
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive every fallacy instance of Prolog files without SWI-Prolog.")
+    parser.add_argument("files", nargs="*", default=[DEFAULT_FILE],
+                        help="Prolog files, e.g. fallacies.pl followed by generated *_examples.txt")
+    parser.add_argument("--query", default=None, help='Print the answers to one goal, e.g. "false_cause(X, Y)"')
+    parser.add_argument("--json", default=None, help="Write the instances of every fallacy to this JSON file")
+    parser.add_argument("--quiet", action="store_true", help="Do not list the skipped clauses")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    program = load_program(*args.files)
+    loaded = time.monotonic() - start
+    try:
+        model = program.evaluate()
+    except DatalogError as e:
+        raise SystemExit(f"Cannot evaluate: {e}")
+    facts = sum(len(rows) for rows in program.facts.values())
+    derived = sum(len(relation) for relation in model.relations.values()) - facts
+    print(f"{facts} facts, {len(program.rules)} rules: parsed in {loaded:.3f}s, {derived} tuples derived "
+          f"in {model.seconds:.3f}s ({model.rounds} rounds)")
+    if program.skipped and not args.quiet:
+        print(f"Skipped {len(program.skipped)} clauses:")
+        reasons = {}
+        for where, reason in program.skipped:
+            reasons.setdefault(reason, []).append(where)
+        for reason, places in reasons.items():
+            print(f"  {reason}: {', '.join(places)}")
+    for name, arity in program.undefined():
+        print(f"Undefined predicate: {name}/{arity}")
+
+    if args.query:
+        answers = model.query(args.query)
+        for answer in answers:
+            print("  " + (", ".join(f"{var} = {value}" for var, value in answer.items()) or "true"))
+        print(f"{len(answers)} answers")
+        return
+    instances = model.fallacies()
+    for label, rows in instances.items():
+        print(f"{label:<35}{len(rows):>6}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({label: [row._asdict() if hasattr(row, "_asdict") else list(row) for row in rows]
+                       for label, rows in instances.items()}, f, indent=2, ensure_ascii=False)
+        print(f"Instances written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,19 @@
-import requests
 import json
 import os
+import sys
 import time
-import anthropic
+
+# Run as a file (python PrologPrompt/<script>.py): make the repository's fallacy package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fallacy.clients import connection_report, shared_http_client
+from fallacy.telemetry import Telemetry, error_class, response_tokens
 
 # API configuration
 API_KEY = "YOUR_API_KEY"  # Replace with actual API key
 BASE_URL = "YOUR_BASE_URL" # Replace with actual BASE URL
 MODEL = "claude-3-7-sonnet-20250219"  # Using Claude 3.7 extended API model
+TELEMETRY_FILE = "prompt_telemetry"  # Written as .json and .prom next to the examples
 
 # Define prompts for each fallacy type with comments removed
 improper_transposition = """
@@ -141,7 +147,7 @@ explcit_meaning_rely_on_claim(C, A).
 """
 
 # Function to call Claude 3.7 Extended API
-def call_claude_api(prompt):
+def call_claude_api(prompt, metrics=None):
     headers = {
         "x-api-key": API_KEY,
         "content-type": "application/json",
@@ -160,9 +166,19 @@ def call_claude_api(prompt):
         ]
     }
 
-    response = requests.post(BASE_URL, headers=headers, data=json.dumps(data))
-    response.raise_for_status()
-    body = response.json()
+    start = time.monotonic()
+    try:
+        # One pooled client for every call, so the connection is reused across fallacies
+        response = shared_http_client(BASE_URL, API_KEY, sync=True).post(BASE_URL, headers=headers,
+                                                                          content=json.dumps(data))
+        response.raise_for_status()
+        body = response.json()
+    except Exception as e:
+        if metrics is not None:
+            metrics.record_call(time.monotonic() - start, error=error_class(e))
+        raise
+    if metrics is not None:
+        metrics.record_call(time.monotonic() - start, response_tokens("anthropic", body))
 
     for part in body.get("content", []):
         if part.get("type") == "text":
@@ -174,9 +190,9 @@ def call_claude_api(prompt):
         return f"Error: {response.status_code}, {response.text}"
 
 # Generate examples for each fallacy
-def generate_examples(fallacy_name, prolog_knowledge):
+def generate_examples(fallacy_name, prolog_knowledge, metrics=None):
     prompt = f"Generate 20 new {fallacy_name} Prolog knowledge combinations,below are examples \n\n{prolog_knowledge}"
-    return call_claude_api(prompt)
+    return call_claude_api(prompt, metrics)
 
 # Main function to generate all examples and save to file
 def main():
@@ -195,10 +211,14 @@ def main():
     }
 
     results = {}
+    telemetry = Telemetry()
 
     for fallacy_name, prolog_knowledge in fallacies.items():
         print(f"Generating examples for {fallacy_name}...")
-        result = generate_examples(fallacy_name, prolog_knowledge)
+        metrics = telemetry.get(MODEL, fallacy_name)
+        start = time.monotonic()
+        result = generate_examples(fallacy_name, prolog_knowledge, metrics)
+        metrics.record_request(time.monotonic() - start)
         results[fallacy_name] = result
 
         # Save individual result to file
@@ -215,5 +235,8 @@ def main():
             f.write(result)
             f.write("\n\n")
 
+    telemetry.write(TELEMETRY_FILE)
+    print(f"Connections: {connection_report()}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
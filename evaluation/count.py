@@ -1,14 +1,36 @@
 import pandas as pd
-import json
+import numpy as np
+import argparse
 import asyncio
-from openai import AsyncOpenAI
-from collections import defaultdict
+import os
+import time
+
+from evaluation.judge_cache import JudgeCache, judge_key, label_set
+from fallacy.cache import ResponseCache
+from fallacy.checkpoint import CheckpointWriter, checkpoint_path, load_checkpoint
+from fallacy.clients import connection_report, make_sdk_client
+from fallacy.engine import record_usage, usage_summary
+from fallacy.parsing import extract_json
+from fallacy.ratelimit import RateController, estimate_tokens, get_controller
+from fallacy.retry import (UNEXPECTED, Backoff, FailureMonitor, FatalError, ParseError, RunAborted, classify,
+                           run_bounded, with_retries)
+from fallacy.storage import read_json, write_json
+from fallacy.telemetry import Metrics, Telemetry, error_class, response_tokens
 
 # ========== Configuration ==========
 API_KEY = ""
 BASE_URL = ""
-MAX_RETRIES = 50
-RETRY_DELAY = 0.5  # seconds between retries
+MAX_RETRIES = 10  # Attempts per sentence; see fallacy/retry.py for which errors are retried
+RETRY_DELAY = 0.5  # Base delay of the jittered backoff, in seconds
+JUDGE_MODEL = "gpt-4o"
+JUDGE_TEMPERATURE = 0
+TELEMETRY_FILE = "evaluation_telemetry"  # Written as .json and .prom next to the results
+INPUT_FILE = "SmartyPat_augmented_label.csv"
+OUTPUT_FILE = "evaluation_results.json"  # Scored rows are checkpointed to evaluation_results.jsonl until the end
+SCORE_TABLE_FILE = "score_table.csv"  # Per-label score counts, in the layout of fig/score.py
+METHOD = "ExpertProlog"  # How INPUT_FILE was generated, as named in fig/score.py
+CHUNK_SIZE = 1000  # CSV rows read at a time
+MAX_PENDING = 512  # Rows in progress at once; API calls are further limited by the adaptive rate controller
 
 # ========== Definitions ==========
 DEFINITIONS = {
@@ -37,10 +59,13 @@ DEFINITIONS_ORDER = [
 ]
 
 
+FALLACY_ORDER = [name.lower() for name in DEFINITIONS_ORDER]  # Labels in the CSV are lower case
+
+
 def get_sort_index(label: str) -> int:
-    primary = label.split(',')[0].strip()
+    primary = label.split(',')[0].strip().lower()
     try:
-        return DEFINITIONS_ORDER.index(primary)
+        return FALLACY_ORDER.index(primary)
     except ValueError:
         return float('inf')
 
@@ -78,83 +103,309 @@ SYSTEM_PROMPT = {
     "content": SCORING_GUIDE
 }
 
-# ========== Evaluate One Sentence with Retry ==========
-async def evaluate_with_retries(client, sentence: str, label: str, csv_id: int) -> dict:
+def build_judge_prompt(sentence: str, label: str) -> str:
     definition_text = get_definitions(label)
-    user_content = (
+    return (
         f'Sentence: "{sentence}"\n'
         f'Label: "{label}"\n'
         f'Definition:\n{definition_text}\n'
         'Return the result in this JSON format: '
         '{"sentence": "...", "label": "...", "score": ..., "explanation": "..."}'
     )
-    user_prompt = {"role": "user", "content": user_content}
 
-    for attempt in range(1, MAX_RETRIES + 1):
+
+def to_score(value):
+    """A 0-3 score as an int, or None for anything else (a failure marker, a missing or odd value)."""
+    if isinstance(value, bool):
+        return None
+    try:
+        score = int(value)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, float) and score != value:
+        return None
+    return score if 0 <= score <= 3 else None
+
+
+def score_of(entry: dict):
+    """The 0-3 score of a result row; older rows and some replies spell the key "Score"."""
+    return to_score(entry.get("score", entry.get("Score")))
+
+
+def parse_score(reply: str):
+    """The 0-3 score of a judge reply, or None when it has none."""
+    data = extract_json(reply or "", accept=lambda value: isinstance(value, dict))
+    return score_of(data) if data else None
+
+
+def is_score_reply(text: str) -> bool:
+    return parse_score(text) is not None
+
+
+def result_key(sentence: str, label: str, model: str = JUDGE_MODEL, temperature=JUDGE_TEMPERATURE) -> str:
+    """Judge cache key of a row (see evaluation/judge_cache.py)."""
+    return judge_key(sentence, label_set(label), DEFINITIONS, SCORING_GUIDE, model, temperature)
+
+
+# ========== Evaluate One Sentence with Retry ==========
+async def evaluate_with_retries(client, cache, sentence: str, label: str, csv_id: int, usage: dict = None,
+                                metrics: Metrics = None, monitor: FailureMonitor = None,
+                                controller: RateController = None) -> dict:
+    """
+    Score one row with the judge, retrying per fallacy/retry.py. Replies come
+    from the response cache when one is given (cache may be None); a row that
+    never gets a score comes back as a failure marker with score -1.
+    """
+    metrics = metrics if metrics is not None else Metrics(JUDGE_MODEL, "judge")
+    user_prompt = {"role": "user", "content": build_judge_prompt(sentence, label)}
+
+    request = dict(
+        model=JUDGE_MODEL,
+        temperature=JUDGE_TEMPERATURE,
+        messages=[SYSTEM_PROMPT, user_prompt]
+    )
+
+    async def send():
+        start = time.monotonic()
         try:
-            response = await client.chat.completions.create(
-                model="gpt-4o",
-                temperature=0,
-                messages=[SYSTEM_PROMPT, user_prompt]
-            )
-            reply = response.choices[0].message.content.strip()
-            parsed = json.loads(reply)
-            parsed["id"] = csv_id
-            return parsed
+            if controller is None:
+                response = await client.chat.completions.create(**request)
+            else:
+                async with controller.slot(estimate_tokens(request)):
+                    response = await client.chat.completions.create(**request)
         except Exception as e:
-            print(f"[Retry {attempt}/{MAX_RETRIES}] ID {csv_id} failed: {e}")
-            await asyncio.sleep(RETRY_DELAY)
+            metrics.record_call(time.monotonic() - start, error=error_class(e))
+            raise
+        record_usage(usage, "openai", response, time.monotonic() - start)
+        metrics.record_call(time.monotonic() - start, response_tokens("openai", response))
+        return response.choices[0].message.content.strip()
 
-    return {
-        "sentence": sentence,
-        "label": label,
-        "Score": -1,
-        "Explanation": f"Failed after {MAX_RETRIES} retries.",
-        "id": csv_id
-    }
+    attempts = 0
 
-# ========== Main Async Processing Function ==========
-async def main():
-    client = AsyncOpenAI(api_key=API_KEY, base_url=BASE_URL)
-    df = pd.read_csv("SmartyPat_augmented_label.csv", header=None, names=["sentence", "label"])
-
-    tasks = []
-    # df.values is an ndarray of shape (n_rows, 2)
-    for idx, (sentence, label) in enumerate(df.values, start=1):
-        tasks.append(
-            evaluate_with_retries(client, sentence, label, idx)
-        )
-
-    results = await asyncio.gather(*tasks)
-    sorted_results = sorted(results, key=lambda x: get_sort_index(x["label"]))
-    with open("evaluation_results.json", "w", encoding="utf-8") as f:
-        json.dump(sorted_results, f, ensure_ascii=False, indent=2)
-
-    # Read back the results just written
-    with open("evaluation_results.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Initialise the statistical structure
-    stats = defaultdict(lambda: {"counts": {0: 0, 1: 0, 2: 0, 3: 0}, "sum": 0, "total": 0})
-
-    # Iterate through all the entries and accumulate the number of individual scores and the total score
-    for entry in data:
-        label = entry["label"]
-        score = entry.get("score", entry.get("Score"))
-        if isinstance(score, (int, float)):
-            stats[label]["counts"][score] += 1
-            stats[label]["sum"] += score
-            stats[label]["total"] += 1
-
-    # Print the distribution of scores and mean scores for each label
+    async def attempt():
+        nonlocal attempts
+        attempts += 1
+        if cache is None:
+            reply = await send()
+        else:
+            reply = await cache.fetch("openai", request, send, validate=is_score_reply)
+        parsed = extract_json(reply, accept=lambda value: isinstance(value, dict))
+        score = parse_score(reply)
+        if score is None:
+            raise ParseError(f"no score in reply: {reply[:100]}...")  # Asked again
+        parsed.pop("Score", None)
+        parsed["score"] = score
+        parsed["id"] = csv_id
+        return parsed
+
+    started = time.monotonic()
+    try:
+        parsed = await with_retries(attempt, MAX_RETRIES, monitor, Backoff(RETRY_DELAY),
+                                    hints_handled=controller is not None, label=f"ID {csv_id}: ")
+    except (FatalError, RunAborted):
+        raise
+    except Exception as e:
+        if classify(e) == UNEXPECTED:
+            raise
+        metrics.record_request(time.monotonic() - started, attempts - 1, ok=False)
+        return {
+            "sentence": sentence,
+            "label": label,
+            "score": -1,
+            "explanation": f"Failed after {attempts} attempts.",
+            "id": csv_id
+        }
+    metrics.record_request(time.monotonic() - started, attempts - 1)
+    return parsed
+
+def is_scored(entry: dict) -> bool:
+    """A checkpointed row counts as done unless it is a failure marker (score -1)."""
+    return score_of(entry) is not None
+
+
+# ========== Score Statistics ==========
+def format_table(counts: pd.DataFrame, method: str = METHOD) -> pd.DataFrame:
+    """
+    Per-label table from counts indexed by label with columns 0-3 and
+    "failed": the layout of fig/score.py (Fallacy, Method, '0'-'3') plus
+    failed, scored and mean, in the fallacy order of DEFINITIONS_ORDER.
+    """
+    counts = counts.reindex(columns=[0, 1, 2, 3, "failed"], fill_value=0).astype(int)
+    histogram = counts[[0, 1, 2, 3]].to_numpy()
+    scored = histogram.sum(axis=1)
+    table = pd.DataFrame(histogram, columns=["0", "1", "2", "3"])
+    table.insert(0, "Fallacy", counts.index.astype(str))
+    table.insert(1, "Method", method)
+    table["failed"] = counts["failed"].to_numpy()
+    table["scored"] = scored
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table["mean"] = np.round(histogram @ np.arange(4) / scored, 3)
+    return table.sort_values("Fallacy", key=lambda labels: labels.map(get_sort_index), kind="stable",
+                             ignore_index=True)
+
+
+def score_table(results: list, method: str = METHOD) -> pd.DataFrame:
+    """Recompute the per-label table from stored result rows, vectorized."""
+    df = pd.DataFrame(results)
+    if df.empty:
+        return format_table(pd.DataFrame(), method)
+    scores = pd.Series(np.nan, index=df.index)
+    for key in ("Score", "score"):  # "score" wins where a row has both
+        if key in df:
+            values = df[key].where(df[key].map(type) != bool)  # to_numeric would read True as 1
+            scores = pd.to_numeric(values, errors="coerce").where(lambda values: values.notna(), scores)
+    valid = scores.isin([0, 1, 2, 3])
+    buckets = scores.where(valid, -1).astype(int).replace(-1, "failed")
+    return format_table(pd.crosstab(df["label"], buckets), method)
+
+
+class ScoreAccumulator:
+    """Per-label score counts, updated as each judgment completes; failed rows are counted apart."""
+
+    def __init__(self):
+        self.counts = {}  # label -> [count of 0, 1, 2, 3, failed]
+
+    def add(self, entry: dict):
+        row = self.counts.setdefault(entry["label"], [0] * 5)
+        score = score_of(entry)
+        row[4 if score is None else score] += 1
+
+    def table(self, method: str = METHOD) -> pd.DataFrame:
+        counts = pd.DataFrame.from_dict(self.counts, orient="index", columns=[0, 1, 2, 3, "failed"])
+        return format_table(counts, method)
+
+
+def print_table(table: pd.DataFrame):
     print("\n=== Score Statistics by Label ===")
-    for label, info in stats.items():
-        avg = info["sum"] / info["total"] if info["total"] else 0
-        counts = info["counts"]
-        print(f'{label}: counts → 0:{counts[0]} 1:{counts[1]} 2:{counts[2]} 3:{counts[3]}, average → {avg:.2f}')
+    for row in table.itertuples(index=False):
+        counts = row[2:6]
+        failed = f", failed → {row.failed}" if row.failed else ""
+        mean = f"{row.mean:.2f}" if row.scored else "n/a"
+        print(f'{row.Fallacy}: counts → 0:{counts[0]} 1:{counts[1]} 2:{counts[2]} 3:{counts[3]}, '
+              f'average → {mean}{failed}')
+
+
+def read_rows(input_file: str):
+    """Yield (id, sentence, label) from the label CSV, CHUNK_SIZE rows at a time."""
+    csv_id = 0
+    for chunk in pd.read_csv(input_file, header=None, names=["sentence", "label"], chunksize=CHUNK_SIZE):
+        for sentence, label in chunk.itertuples(index=False):
+            csv_id += 1
+            yield csv_id, sentence, label
+
+
+# ========== Streaming Scorer ==========
+async def score_file(client, cache, input_file: str = INPUT_FILE, output_file: str = OUTPUT_FILE,
+                     usage: dict = None, metrics: Metrics = None, monitor: FailureMonitor = None,
+                     controller: RateController = None, accumulator: ScoreAccumulator = None,
+                     judge_cache: JudgeCache = None, rescore: bool = False) -> list:
+    """
+    Score every row of a label CSV and write the results, sorted by label, to
+    output_file. Rows are read in chunks and at most MAX_PENDING are in
+    progress at once, so memory and open requests stay flat for any CSV size.
+    Each scored row is appended to a JSONL checkpoint next to output_file; a
+    rerun after a crash resumes from it, asking again only rows that are
+    missing, failed or changed. output_file is written only once every row is
+    scored. Rows already in judge_cache (same sentence, labels, definitions,
+    guide and judge) are not sent again, wherever they sit in the CSV. With
+    rescore, neither the checkpoint nor judge_cache is read, and the new scores
+    replace the stored ones (pass a refresh-mode cache as well). Every final
+    row is added to accumulator, when given, as it completes.
+    """
+    ckpt_file = checkpoint_path(output_file)
+    done = {} if rescore else {idx: entry for idx, entry in load_checkpoint(ckpt_file).items() if is_scored(entry)}
+    if done:
+        print(f"Resuming: {len(done)} rows already scored in {ckpt_file}")
+    controller = controller or get_controller({}, "openai")
+    accumulator = accumulator if accumulator is not None else ScoreAccumulator()
+    rows = 0
+
+    with CheckpointWriter(ckpt_file, resume=not rescore) as writer:
+        async def score_row(csv_id: int, sentence: str, label: str):
+            nonlocal rows
+            rows = max(rows, csv_id)
+            key = result_key(sentence, label)
+            entry = done.get(csv_id)
+            if entry is None or entry.get("key") != key:  # Not scored yet, or the CSV changed since
+                entry = judge_cache.get(key) if judge_cache is not None and not rescore else None
+                if entry is None:
+                    entry = await evaluate_with_retries(client, cache, sentence, label, csv_id, usage, metrics,
+                                                        monitor, controller)
+                    if judge_cache is not None and is_scored(entry):
+                        judge_cache.put(key, entry, JUDGE_MODEL)
+                # The row as it is in the CSV, not as the judge echoed it
+                entry = dict(entry, sentence=sentence, label=label, id=csv_id, key=key)
+                writer.append(entry)
+            accumulator.add(entry)
+
+        try:
+            await run_bounded((score_row(*row) for row in read_rows(input_file)), MAX_PENDING)
+        except (FatalError, RunAborted) as e:
+            print(f"Run aborted: {e}. Scored rows are kept in {ckpt_file}; run again to continue.")
+            raise
+
+    records = load_checkpoint(ckpt_file)
+    # Ids past the end of a CSV that shrank since the checkpoint are dropped
+    results = sorted(({key: value for key, value in records[idx].items() if key != "key"}
+                      for idx in sorted(records) if idx <= rows), key=lambda x: get_sort_index(x["label"]))
+    write_json(output_file, results)
+    os.remove(ckpt_file)
+    print(f"Rate control: {controller.stats()}")
+    return results
+
 
-    print("All sentences scored and saved to evaluation_results.json")
+# ========== Main Async Processing Function ==========
+async def main(rescore: bool = False, use_judge_cache: bool = True):
+    client = make_sdk_client("openai", API_KEY, BASE_URL)  # Pooled, keep-alive connections
+    cache = ResponseCache(refresh=rescore)  # Shared with the evaluation engine and its --repair pass
+
+    usage = {}  # Judge tokens, including the input read from the provider's prompt cache
+    telemetry = Telemetry()
+    metrics = telemetry.get(JUDGE_MODEL, os.path.splitext(os.path.basename(INPUT_FILE))[0])
+    monitor = FailureMonitor()  # Stops the whole run on bad credentials or a failure storm
+
+    # Scored rows by content, so a grown or re-ordered CSV only pays for new rows
+    judge_cache = JudgeCache() if use_judge_cache else None
+    accumulator = ScoreAccumulator()
+    await score_file(client, cache, INPUT_FILE, OUTPUT_FILE, usage, metrics, monitor, accumulator=accumulator,
+                     judge_cache=judge_cache, rescore=rescore)
+    table = accumulator.table()
+    print_table(table)
+    table.to_csv(SCORE_TABLE_FILE, index=False)
+    print(f"Score table written to {SCORE_TABLE_FILE}")
+
+    print(f"Usage: {usage_summary(usage)}")
+    print(f"Telemetry: {dict(metrics.summary())}")
+    telemetry.write(TELEMETRY_FILE)
+    print(f"Cache: {cache.stats()}")
+    if judge_cache is not None:
+        print(f"Judge cache: {judge_cache.stats()}")
+    print(f"Connections: {connection_report()}")
+    print(f"All sentences scored and saved to {OUTPUT_FILE}")
+
+
+def recompute(results_file: str = OUTPUT_FILE):
+    """Rebuild the score table from stored results without calling the judge."""
+    table = score_table(read_json(results_file, []))
+    print_table(table)
+    table.to_csv(SCORE_TABLE_FILE, index=False)
+    print(f"Score table written to {SCORE_TABLE_FILE}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Score the augmented sentences with the judge model.")
+    parser.add_argument("--recompute", nargs="?", const=OUTPUT_FILE, default=None, metavar="RESULTS",
+                        help=f"Only rebuild {SCORE_TABLE_FILE} from stored results (default {OUTPUT_FILE})")
+    parser.add_argument("--rescore", action="store_true",
+                        help="Ask the judge again for every row; the new scores replace the judge cache entries, "
+                             "cached replies and checkpoint")
+    parser.add_argument("--no-judge-cache", action="store_true",
+                        help="Neither read nor store scores in the judge cache (the response cache is unaffected)")
+    args = parser.parse_args()
+    if args.recompute:
+        recompute(args.recompute)
+    else:
+        try:
+            asyncio.run(main(args.rescore, not args.no_judge_cache))
+        except (FatalError, RunAborted) as e:
+            raise SystemExit(f"Run stopped: {e}")
@@ -0,0 +1,379 @@
+"""
+Multi-judge scoring of the augmented sentences.
+
+count.py scores every (sentence, label) item with one gpt-4o judge, so the
+quality numbers of the paper rest on that judge alone. This runs several
+judge models from fallacy/registry.py on the same items, with the scoring
+prompt of count.py, through one scheduler: one adaptive rate controller per
+provider and at most count.MAX_PENDING items in progress. Every judge's 0-3
+score is stored per item, and the agreement statistics are updated as each
+item completes, overall and per label:
+
+- mean and variance of each judge's scores (Welford's online algorithm);
+- Cohen's kappa for every pair of judges, from running confusion matrices;
+- Fleiss' kappa over all judges, from running category counts;
+- the ids of items whose scores are DISAGREEMENT_SPREAD or more points apart.
+
+With --tiebreak, only the disagreeing items are sent to one more judge, and
+an item's final score is the median of all its scores, so an ensemble costs
+its judges plus a small share of one more instead of one judge more per
+item. Scored items are checkpointed like count.py's; a rerun resumes, and
+asks only the judges an item is still missing, so a judge or a tiebreak can
+be added to a finished run later. Scores are also kept in the judge cache
+(evaluation/judge_cache.py), shared with count.py, so rows that move or
+reappear in the CSV are not judged again. --rescore asks every judge again,
+bypassing the checkpoint and both caches, and overwrites the stored scores.
+
+Usage (from the repository root):
+    python -m evaluation.ensemble --input csv/SmartyPat_augmented_label.csv
+    python -m evaluation.ensemble --judges gpt-4o deepseek-chat --tiebreak claude-3-5-sonnet-20241022
+"""
+import argparse
+import asyncio
+import os
+import statistics
+from itertools import combinations
+
+from evaluation.count import (INPUT_FILE, MAX_PENDING, MAX_RETRIES, SCORING_GUIDE, build_judge_prompt,
+                              get_sort_index, is_score_reply, parse_score, read_rows, result_key, score_of)
+from evaluation.judge_cache import JudgeCache
+from fallacy.cache import ResponseCache, add_cache_arguments, open_cache
+from fallacy.checkpoint import CheckpointWriter, checkpoint_path, load_checkpoint
+from fallacy.clients import connection_report
+from fallacy.engine import complete, make_client, usage_summary
+from fallacy.ratelimit import get_controller
+from fallacy.registry import MODELS, get_model
+from fallacy.retry import (UNEXPECTED, FailureMonitor, FatalError, ParseError, RunAborted, classify, run_bounded,
+                           with_retries)
+from fallacy.storage import read_json, write_json
+from fallacy.telemetry import Telemetry, add_telemetry_arguments
+
+JUDGES = ["gpt-4o", "claude-3-7-sonnet-20250219", "deepseek-chat"]
+TIEBREAK_JUDGE = "claude-3-5-sonnet-20241022"  # Asked only about items the judges disagree on
+OUTPUT_FILE = "ensemble_results.json"
+REPORT_FILE = "ensemble_report.json"
+DISAGREEMENT_SPREAD = 2  # Points between the lowest and highest score that make an item a disagreement
+SCORES = range(4)
+PROGRESS_EVERY = 500  # Items between running agreement lines
+
+
+class RunningStats:
+    """Count, mean and variance of a stream of numbers (Welford)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def summary(self) -> dict:
+        return {"n": self.n, "mean": round(self.mean, 3) if self.n else None,
+                "variance": round(self.m2 / (self.n - 1), 3) if self.n > 1 else None}
+
+
+def cohen_kappa(matrix: list):
+    """Cohen's kappa of a square confusion matrix, or None when chance agreement is total."""
+    n = sum(map(sum, matrix))
+    if not n:
+        return None
+    observed = sum(matrix[k][k] for k in SCORES) / n
+    expected = sum(sum(matrix[k]) * sum(row[k] for row in matrix) for k in SCORES) / n ** 2
+    return round((observed - expected) / (1 - expected), 3) if expected < 1 else None
+
+
+class Agreement:
+    """Agreement of a fixed set of judges over the items of one group, updated one item at a time."""
+
+    def __init__(self, judges: list, spread: int = DISAGREEMENT_SPREAD):
+        self.judges = judges
+        self.spread = spread
+        self.items = 0
+        self.scores = {judge: RunningStats() for judge in judges}
+        self.pairs = {pair: [[0] * len(SCORES) for _ in SCORES] for pair in combinations(judges, 2)}
+        self.fleiss_items = 0
+        self.fleiss_agreement = 0.0  # Sum of the per-item agreement P_i
+        self.category_totals = [0] * len(SCORES)
+        self.disagreements = []
+
+    def add(self, item_id: int, scores: dict):
+        """Add one item's {judge: score} (None for a judge that gave no usable score)."""
+        self.items += 1
+        given = {judge: scores.get(judge) for judge in self.judges if scores.get(judge) is not None}
+        for judge, score in given.items():
+            self.scores[judge].add(score)
+        for (a, b), matrix in self.pairs.items():
+            if a in given and b in given:
+                matrix[given[a]][given[b]] += 1
+        raters = len(self.judges)
+        if raters > 1 and len(given) == raters:
+            counts = [0] * len(SCORES)
+            for score in given.values():
+                counts[score] += 1
+            self.fleiss_items += 1
+            self.fleiss_agreement += (sum(c * c for c in counts) - raters) / (raters * (raters - 1))
+            self.category_totals = [total + c for total, c in zip(self.category_totals, counts)]
+        if len(given) > 1 and max(given.values()) - min(given.values()) >= self.spread:
+            self.disagreements.append(item_id)
+
+    def fleiss_kappa(self):
+        if not self.fleiss_items:
+            return None
+        ratings = self.fleiss_items * len(self.judges)
+        observed = self.fleiss_agreement / self.fleiss_items
+        expected = sum((total / ratings) ** 2 for total in self.category_totals)
+        return round((observed - expected) / (1 - expected), 3) if expected < 1 else None
+
+    def summary(self) -> dict:
+        return {
+            "items": self.items,
+            "judges": {judge: stats.summary() for judge, stats in self.scores.items()},
+            "cohen_kappa": {f"{a} / {b}": cohen_kappa(matrix) for (a, b), matrix in self.pairs.items()},
+            "fleiss_kappa": self.fleiss_kappa(),
+            "disagreements": len(self.disagreements),
+            "disagreement_rate": round(len(self.disagreements) / self.items, 3) if self.items else None,
+            "disagreement_ids": sorted(self.disagreements),
+        }
+
+
+class EnsembleStats:
+    """Agreement overall ("all") and per label."""
+
+    def __init__(self, judges: list, spread: int = DISAGREEMENT_SPREAD):
+        self.judges = judges
+        self.spread = spread
+        self.groups = {}
+
+    def add(self, record: dict):
+        for group in ("all", record["label"]):
+            if group not in self.groups:
+                self.groups[group] = Agreement(self.judges, self.spread)
+            self.groups[group].add(record["id"], record["scores"])
+
+    def disagreements(self) -> list:
+        return self.groups["all"].disagreements if "all" in self.groups else []
+
+    def report(self) -> dict:
+        labels = sorted((group for group in self.groups if group != "all"), key=get_sort_index)
+        return {group: self.groups[group].summary() for group in ["all"] + labels if group in self.groups}
+
+
+def final_score(record: dict):
+    """Median of every score an item got, tiebreak included; None when it has none."""
+    scores = [score for score in {**record["scores"], **record.get("tiebreak", {})}.values() if score is not None]
+    return statistics.median(scores) if scores else None
+
+
+class Judge:
+    """One registered model acting as a judge, with its client, rate controller, usage and metrics."""
+
+    def __init__(self, name: str, controllers: dict, cache: ResponseCache, telemetry: Telemetry, dataset: str,
+                 monitor: FailureMonitor, judge_cache: JudgeCache = None, rescore: bool = False):
+        self.name = name
+        self.config = dict(get_model(name), stream=False, early_stop=False)
+        self.client = make_client(self.config)
+        self.controller = get_controller(controllers, self.config["provider"])
+        self.cache = cache
+        self.judge_cache = judge_cache
+        self.rescore = rescore
+        self.usage = {}
+        self.metrics = telemetry.get(name, dataset, self.config["model"])
+        self.monitor = monitor
+
+    async def score(self, item_id: int, sentence: str, label: str):
+        """The judge's 0-3 score for one item, or None when no usable reply came back."""
+        key = result_key(sentence, label, self.name, self.config["temperature"])
+        if self.judge_cache is not None and not self.rescore:
+            stored = self.judge_cache.get(key)
+            if stored is not None:
+                return score_of(stored)
+        prompt = build_judge_prompt(sentence, label)
+
+        async def attempt():
+            reply = await complete(self.client, self.config, SCORING_GUIDE, prompt, self.controller, self.cache,
+                                   self.usage, validate=is_score_reply, metrics=self.metrics)
+            score = parse_score(reply)
+            if score is None:
+                raise ParseError(f"no score in reply: {reply[:100]}...")
+            return score
+
+        try:
+            score = await with_retries(attempt, MAX_RETRIES, self.monitor, hints_handled=True,
+                                       label=f"[{self.name}] ID {item_id}: ")
+        except (FatalError, RunAborted):
+            raise
+        except Exception as e:
+            if classify(e) == UNEXPECTED:
+                raise
+            print(f"[{self.name}] ID {item_id}: no score ({classify(e)})")
+            return None
+        if self.judge_cache is not None:
+            self.judge_cache.put(key, {"score": score}, self.name)
+        return score
+
+
+def load_records(output_file: str) -> dict:
+    """Items of an earlier run: the result file, updated by its checkpoint."""
+    records = {record["id"]: record for record in read_json(output_file, [])}
+    records.update(load_checkpoint(checkpoint_path(output_file)))
+    return records
+
+
+def missing(record: dict, judges: list) -> list:
+    return [judge for judge in judges if record.get("scores", {}).get(judge) is None]
+
+
+def item_key(sentence: str, label: str) -> str:
+    """What an item is, judges aside, so that a moved or edited CSV row is not matched to old scores."""
+    return result_key(sentence, label, None, None)
+
+
+async def run_ensemble(judges: list, input_file: str = INPUT_FILE, output_file: str = OUTPUT_FILE,
+                       tiebreak: str = None, spread: int = DISAGREEMENT_SPREAD, cache: ResponseCache = None,
+                       telemetry: Telemetry = None, judge_cache: JudgeCache = None, rescore: bool = False) -> dict:
+    """
+    Score every row of a label CSV with every judge and, with tiebreak, the
+    disagreeing rows with one more judge. Writes the scored items to
+    output_file and returns the report: agreement overall and per label,
+    tiebreak counts and token usage per judge. Scores found in judge_cache
+    are reused; with rescore, neither they nor the scores of an earlier run
+    are, and the new scores replace them (pass a refresh-mode cache as well).
+    """
+    telemetry = telemetry if telemetry is not None else Telemetry()
+    dataset = os.path.splitext(os.path.basename(input_file))[0]
+    controllers, monitor = {}, FailureMonitor()
+    panel = {name: Judge(name, controllers, cache, telemetry, dataset, monitor, judge_cache, rescore)
+             for name in dict.fromkeys(judges + ([tiebreak] if tiebreak else []))}
+    stats = EnsembleStats(judges, spread)
+    records = {} if rescore else load_records(output_file)
+    if records:
+        done = sum(1 for record in records.values() if not missing(record, judges))
+        print(f"Resuming: {done} items already scored by every judge")
+    rows = 0
+
+    ckpt_file = checkpoint_path(output_file)
+    with CheckpointWriter(ckpt_file, resume=not rescore) as writer:
+        async def score_item(item_id: int, sentence: str, label: str):
+            nonlocal rows
+            rows = max(rows, item_id)
+            key = item_key(sentence, label)
+            record = records.get(item_id)
+            if record is None or record.get("key") != key:
+                record = {"id": item_id, "sentence": sentence, "label": label, "key": key, "scores": {}}
+            todo = missing(record, judges)
+            if todo:
+                scores = await asyncio.gather(*(panel[judge].score(item_id, sentence, label) for judge in todo))
+                record["scores"] = {**record["scores"], **dict(zip(todo, scores))}
+                record["final_score"] = final_score(record)
+                records[item_id] = record
+                writer.append(record)
+            stats.add(record)
+            if stats.groups["all"].items % PROGRESS_EVERY == 0:
+                overall = stats.groups["all"]
+                print(f"{overall.items} items: Fleiss' kappa {overall.fleiss_kappa()}, "
+                      f"{len(overall.disagreements)} disagreements")
+
+        async def tiebreak_item(item_id: int):
+            record = records[item_id]
+            record["tiebreak"] = {tiebreak: await panel[tiebreak].score(item_id, record["sentence"], record["label"])}
+            record["final_score"] = final_score(record)
+            writer.append(record)
+
+        try:
+            await run_bounded((score_item(*row) for row in read_rows(input_file)), MAX_PENDING)
+            tiebreaks = []
+            if tiebreak:
+                tiebreaks = [idx for idx in stats.disagreements()
+                             if records[idx].get("tiebreak", {}).get(tiebreak) is None]
+                print(f"Tiebreak: asking {tiebreak} about {len(tiebreaks)} disagreements")
+                await run_bounded((tiebreak_item(idx) for idx in tiebreaks), MAX_PENDING)
+        except (FatalError, RunAborted) as e:
+            print(f"Run aborted: {e}. Scored items are kept in {ckpt_file}; run again to continue.")
+            raise
+
+    # Ids past the end of a CSV that shrank since the last run are dropped
+    results = sorted((records[idx] for idx in sorted(records) if idx <= rows),
+                     key=lambda x: get_sort_index(x["label"]))
+    write_json(output_file, results)
+    os.remove(ckpt_file)
+
+    usage = {name: usage_summary(judge.usage) for name, judge in panel.items()}
+    # Replies from the cache or an earlier run cost nothing here, so each judge is priced
+    # by its mean tokens per API call of this run, times the items it scored
+    per_call = {name: (summary.get("input_tokens", 0) + summary.get("output_tokens", 0)) / summary["requests"]
+                if summary.get("requests") else None for name, summary in usage.items()}
+    scored = {name: sum(1 for record in results
+                        if record["scores"].get(name) is not None or record.get("tiebreak", {}).get(name) is not None)
+              for name in panel}
+    cost = {name: per_call[name] * scored[name] if per_call[name] is not None else None for name in panel}
+    base = per_call[judges[0]] * len(results) if per_call[judges[0]] is not None else None
+    report = {
+        "judges": judges,
+        "items": len(results),
+        "spread": spread,
+        "agreement": stats.report(),
+        "tiebreak": {"judge": tiebreak, "asked": len(tiebreaks),
+                     "items_with_tiebreak": sum(1 for record in results if tiebreak in record.get("tiebreak", {}))},
+        "usage": usage,
+        # Estimated tokens of the whole ensemble relative to the first judge alone, from uncached calls only;
+        # None when a judge made no API call in this run
+        "cost_vs_single_judge": round(sum(value or 0 for value in cost.values()) / base, 2)
+        if base and all(value is not None for name, value in cost.items() if scored[name]) else None,
+        "rate_control": {name: controller.stats() for name, controller in controllers.items()},
+    }
+    print(f"{len(results)} items written to {output_file}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the augmented sentences with several judges and "
+                                                 "report how far they agree.")
+    parser.add_argument("--input", default=INPUT_FILE, help="Label CSV (sentence, label) to score")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Scored items, one record per row")
+    parser.add_argument("--judges", nargs="+", default=JUDGES, choices=sorted(MODELS))
+    parser.add_argument("--tiebreak", nargs="?", const=TIEBREAK_JUDGE, default=None, choices=sorted(MODELS),
+                        help=f"Ask this judge (default {TIEBREAK_JUDGE}) about the disagreements only")
+    parser.add_argument("--spread", type=int, default=DISAGREEMENT_SPREAD,
+                        help="Score spread that counts as a disagreement (1: any difference)")
+    parser.add_argument("--report", default=REPORT_FILE, help="Agreement report JSON")
+    parser.add_argument("--rescore", action="store_true",
+                        help="Ask every judge again, replacing judge cache entries, cached replies and earlier scores")
+    parser.add_argument("--no-judge-cache", action="store_true",
+                        help="Neither read nor store scores in the judge cache (the response cache is unaffected)")
+    add_cache_arguments(parser)
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    if len(args.judges) < 2:
+        parser.error("an ensemble needs at least two judges")
+    cache = open_cache(args, refresh=args.rescore)
+    judge_cache = None if args.no_judge_cache else JudgeCache()
+    telemetry = Telemetry()
+    try:
+        report = asyncio.run(run_ensemble(args.judges, args.input, args.output, args.tiebreak, args.spread, cache,
+                                          telemetry, judge_cache, args.rescore))
+    except (FatalError, RunAborted) as e:
+        raise SystemExit(f"Run stopped: {e}")
+    finally:
+        if args.telemetry:
+            print(f"Telemetry written to {', '.join(telemetry.write(args.telemetry))}")
+    overall = report["agreement"].get("all", {})
+    print(f"Fleiss' kappa: {overall.get('fleiss_kappa')}, Cohen's kappa: {overall.get('cohen_kappa')}")
+    print(f"Disagreements: {overall.get('disagreements')} ({overall.get('disagreement_rate')}), "
+          f"tiebreak: {report['tiebreak']}")
+    if report["cost_vs_single_judge"] is not None:
+        print(f"Tokens vs. {args.judges[0]} alone: {report['cost_vs_single_judge']}x")
+    write_json(args.report, report)
+    print(f"Report written to {args.report}")
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+    if judge_cache is not None:
+        print(f"Judge cache: {judge_cache.stats()}")
+    print(f"Connections: {connection_report()}")
+
+
+if __name__ == '__main__':
+    main()
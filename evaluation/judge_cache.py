@@ -0,0 +1,91 @@
+"""
+Judge results keyed by what was judged, not by where it sits in the CSV.
+
+The response cache (fallacy/cache.py) keys raw replies by the exact request
+and evicts old entries, and checkpoints key rows by their position, so a
+re-ordered or grown label CSV, or a sentence with different spacing or
+quotes, used to be scored again. Here every scored row is kept, without
+eviction, under a SHA-256 of:
+
+- the sentence, with Unicode, quotes and whitespace normalised;
+- the set of labels, lower case and in any order;
+- the definitions of exactly those labels;
+- the scoring guide (system prompt);
+- the judge model and its temperature.
+
+Adding N sentences to the CSV therefore costs N judge calls, and editing one
+definition only invalidates the rows that carry that label.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+from fallacy.parsing import SMART_QUOTES
+from fallacy.registry import ROOT_DIR
+
+DEFAULT_PATH = os.path.join(ROOT_DIR, ".cache", "judge_cache.sqlite")
+
+
+def normalize_sentence(sentence: str) -> str:
+    text = unicodedata.normalize("NFKC", str(sentence)).translate(SMART_QUOTES)
+    return re.sub(r"\s+", " ", text).strip().strip('"').strip()
+
+
+def label_set(label: str) -> list:
+    return sorted({name.strip().lower() for name in str(label).split(",") if name.strip()})
+
+
+def judge_key(sentence: str, labels: list, definitions: dict, guide: str, model: str, temperature) -> str:
+    """Stable hash of everything that decides a judge's score for one row."""
+    payload = json.dumps({
+        "sentence": normalize_sentence(sentence),
+        "labels": labels,
+        "definitions": {name: definitions.get(name) for name in labels},
+        "guide": guide,
+        "model": model,
+        "temperature": temperature,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JudgeCache:
+    """SQLite store of scored rows by judge_key, with hit/miss counters. Entries are never evicted."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+                         "model TEXT NOT NULL, created REAL NOT NULL)")
+        self._db.commit()
+
+    def get(self, key: str):
+        """Return the stored result for a key, or None."""
+        row = self._db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: dict, model: str):
+        self._db.execute("INSERT OR REPLACE INTO results (key, result, model, created) VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(result, ensure_ascii=False), model, time.time()))
+        self._db.commit()
+        self.stored += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "stored": self.stored}
+
+    def close(self):
+        self._db.close()
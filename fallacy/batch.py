@@ -0,0 +1,220 @@
+"""
+Provider batch-API mode for full-dataset sweeps.
+
+Instead of one interactive call per sentence, the whole dataset is written as
+a provider batch request file (OpenAI Batch JSONL or Anthropic Message Batches
+requests), submitted once, polled until it ends, and the results are mapped
+back by custom_id into the usual res/<dataset>/<model>.json layout. Requests
+already in the response cache are not submitted, and every batch answer is
+added to the cache.
+
+The batch id is saved next to the result file, so an interrupted run picks up
+polling with --resume instead of submitting (and paying for) the batch again.
+
+Usage (from the repository root):
+    python -m fallacy.batch --model gpt-4o --dataset SmartyPat_augmented
+    python -m fallacy.batch_server --port 8800   # offline stand-in, then point OPENAI_BASE_URL at it
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from fallacy.cache import ResponseCache, add_cache_arguments, open_cache, request_key
+from fallacy.checkpoint import CheckpointWriter, checkpoint_path, compact
+from fallacy.engine import build_request, format_result, load_sentences, make_client
+from fallacy.parsing import is_valid_reply, parse_reply, parse_summary, record_parse
+from fallacy.prompts import SYSTEM_PROMPT, build_prompt
+from fallacy.registry import DATASETS, MODELS, get_model, output_path
+
+POLL_INTERVAL = 30  # Seconds between batch status checks
+OPENAI_BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_ERROR = "error: Batch request failed"
+
+
+def custom_id(idx: int) -> str:
+    return f"row-{idx}"
+
+
+def row_id(cid: str) -> int:
+    return int(cid.split("-", 1)[1])
+
+
+def batch_files(output_file: str) -> tuple:
+    """Request file and state file kept next to a result file while a batch is open."""
+    base = os.path.splitext(output_file)[0]
+    return base + ".batch_input.jsonl", base + ".batch.json"
+
+
+def build_batch_lines(config: dict, requests: dict) -> list:
+    """
+    One batch line per request in the provider's format; requests maps row id -> request arguments.
+    """
+    lines = []
+    for idx, request in requests.items():
+        if config["api"] == "anthropic":
+            lines.append({"custom_id": custom_id(idx), "params": request})
+        else:
+            # extra_body is a client-side option; in a batch file its fields go into the body itself
+            body = {key: value for key, value in request.items() if key != "extra_body"}
+            body.update(request.get("extra_body") or {})
+            lines.append({"custom_id": custom_id(idx), "method": "POST",
+                          "url": OPENAI_BATCH_ENDPOINT, "body": body})
+    return lines
+
+
+async def submit_batch(client, config: dict, lines: list, input_file: str) -> str:
+    """Write the batch request file, submit it and return the batch id."""
+    with open(input_file, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    if config["api"] == "anthropic":
+        batch = await client.messages.batches.create(requests=lines)
+        return batch.id
+
+    with open(input_file, 'rb') as f:
+        uploaded = await client.files.create(file=f, purpose="batch")
+    batch = await client.batches.create(input_file_id=uploaded.id, endpoint=OPENAI_BATCH_ENDPOINT,
+                                        completion_window="24h")
+    return batch.id
+
+
+async def wait_for_batch(client, config: dict, batch_id: str, poll: float):
+    """Poll a batch until the provider reports it finished; returns the final batch object."""
+    while True:
+        if config["api"] == "anthropic":
+            batch = await client.messages.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            print(f"[{config['name']}] Batch {batch_id}: {batch.processing_status} "
+                  f"({counts.succeeded} succeeded, {counts.errored} errored, {counts.processing} processing)")
+            if batch.processing_status == "ended":
+                return batch
+        else:
+            batch = await client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            done = f"{counts.completed}/{counts.total}" if counts else "-"
+            print(f"[{config['name']}] Batch {batch_id}: {batch.status} ({done} completed)")
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                return batch
+        await asyncio.sleep(poll)
+
+
+async def fetch_batch_results(client, config: dict, batch) -> dict:
+    """Map custom_id -> reply text for every request that succeeded."""
+    texts = {}
+    if config["api"] == "anthropic":
+        async for entry in await client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                continue
+            for block in entry.result.message.content:
+                if block.type == "text":
+                    texts[entry.custom_id] = block.text.strip()
+                    break
+        return texts
+
+    if not batch.output_file_id:
+        return texts
+    content = await client.files.content(batch.output_file_id)
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        if entry.get("error") or response.get("status_code") != 200:
+            continue
+        message = response["body"]["choices"][0]["message"]
+        texts[entry["custom_id"]] = (message.get("content") or "").strip()
+    return texts
+
+
+async def run_batch(name: str, dataset: str, output_file: str = None, poll: float = POLL_INTERVAL,
+                    cache: ResponseCache = None, resume: bool = False) -> str:
+    """
+    Evaluate one model on one dataset through the provider's batch API and
+    write res/<dataset>/<model>.json. Returns the path of the written file.
+    """
+    config = get_model(name)
+    output_file = output_file or output_path(name, dataset)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    input_file, state_file = batch_files(output_file)
+    sentences = load_sentences(DATASETS[dataset])
+    requests = {idx: build_request(config, SYSTEM_PROMPT, build_prompt(sentence))
+                for idx, sentence in enumerate(sentences, start=1)}
+
+    # Answer what we can from the cache; only the rest goes into the batch
+    texts = {}
+    if cache is not None:
+        for idx, request in requests.items():
+            cached = cache.get(request_key(config["api"], request))
+            if cached is not None:
+                texts[custom_id(idx)] = cached
+    pending = {idx: request for idx, request in requests.items() if custom_id(idx) not in texts}
+
+    if pending and cache is not None and cache.replay:
+        print(f"[{name}] Replay mode: {len(pending)} requests not in the cache are left unanswered")
+        pending = {}
+
+    client = make_client(config)
+    if pending:
+        if resume and os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                batch_id = json.load(f)["batch_id"]
+            print(f"[{name}] Resuming batch {batch_id}")
+        else:
+            batch_id = await submit_batch(client, config, build_batch_lines(config, pending), input_file)
+            with open(state_file, 'w', encoding='utf-8') as f:
+                json.dump({"model": name, "dataset": dataset, "batch_id": batch_id,
+                           "submitted": time.time(), "requests": len(pending)}, f, indent=2)
+            print(f"[{name}] Submitted batch {batch_id} with {len(pending)} requests "
+                  f"({len(texts)} answered from cache)")
+        batch = await wait_for_batch(client, config, batch_id, poll)
+        batch_texts = await fetch_batch_results(client, config, batch)
+        if cache is not None:
+            for cid, text in batch_texts.items():
+                if is_valid_reply(text):
+                    cache.put(request_key(config["api"], requests[row_id(cid)]), text)
+        texts.update(batch_texts)
+
+    ckpt_file = checkpoint_path(output_file)
+    failed = 0
+    parse_stats = {}
+    with CheckpointWriter(ckpt_file) as writer:
+        for idx, sentence in enumerate(sentences, start=1):
+            text = texts.get(custom_id(idx), "")
+            result = None
+            if text:
+                result, outcome = parse_reply(text)
+                record_parse(parse_stats, outcome)
+            if result is None:
+                failed += 1
+                result = {"error": BATCH_ERROR, "original_sentence": sentence, "raw_response": text}
+            writer.append(format_result(idx, sentence, result))
+    new_results = compact(ckpt_file, output_file)
+    os.remove(ckpt_file)
+    for path in (input_file, state_file):
+        if os.path.exists(path):
+            os.remove(path)
+    print(f"[{name}] {len(new_results)} results written to {output_file} ({failed} failed)")
+    print(f"[{name}] Parsing: {parse_summary(parse_stats)}")
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a registered model through its provider's batch API.")
+    parser.add_argument("--model", required=True, choices=sorted(MODELS))
+    parser.add_argument("--dataset", default="SmartyPat", choices=sorted(DATASETS))
+    parser.add_argument("--output", default=None, help="Override the output JSON path")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="Seconds between status checks")
+    parser.add_argument("--resume", action="store_true", help="Poll the batch already submitted for this output")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    cache = open_cache(args)
+    asyncio.run(run_batch(args.model, args.dataset, args.output, args.poll, cache, args.resume))
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
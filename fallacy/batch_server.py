@@ -0,0 +1,242 @@
+"""
+Local stand-in for the OpenAI Batch and Anthropic Message Batches APIs.
+
+Implements just enough of both APIs for fallacy/batch.py to run offline:
+file upload and download, batch creation, status polling and results. A batch
+stays "in progress" for --delay seconds and then ends with every request
+answered by the responder (by default a fixed, parseable verdict).
+
+Usage (from the repository root):
+    python -m fallacy.batch_server --port 8800 --delay 5
+    OPENAI_BASE_URL=http://127.0.0.1:8800/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:8800 \\
+        python -m fallacy.batch --model gpt-4o --poll 1
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAND_IN_VERDICT = {
+    "logic_error": "no",
+    "logic_fallacies": [],
+    "details": "Answered by the local stand-in batch server."
+}
+
+
+def default_responder(api: str, request: dict) -> str:
+    """Reply text for one batched request."""
+    return json.dumps(STAND_IN_VERDICT)
+
+
+def chat_completion(request: dict, text: str) -> dict:
+    """Minimal OpenAI chat completion object around a reply."""
+    return {
+        "id": f"chatcmpl-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", ""),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def anthropic_message(request: dict, text: str) -> dict:
+    """Minimal Anthropic message object around a reply."""
+    return {
+        "id": f"msg_{int(time.time() * 1000)}",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", ""),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 0, "output_tokens": 0},
+    }
+
+
+class BatchStore:
+    """In-memory files and batches shared by all request handlers."""
+
+    def __init__(self, delay: float, responder):
+        self.delay = delay
+        self.responder = responder
+        self.files = {}
+        self.batches = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def new_id(self, prefix: str) -> str:
+        with self.lock:
+            return f"{prefix}{next(self.ids)}"
+
+    def ready(self, batch: dict) -> bool:
+        return time.time() - batch["_created"] >= self.delay
+
+    def openai_batch(self, batch: dict) -> dict:
+        """Current state of an OpenAI batch, producing its output file once it is due."""
+        if self.ready(batch) and batch["status"] == "in_progress":
+            lines = []
+            for line in self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                text = self.responder("openai", entry["body"])
+                lines.append(json.dumps({
+                    "id": self.new_id("batch_req_"),
+                    "custom_id": entry["custom_id"],
+                    "response": {"status_code": 200, "request_id": "", "body": chat_completion(entry["body"], text)},
+                    "error": None,
+                }))
+            output_id = self.new_id("file-")
+            self.files[output_id] = {"content": ("\n".join(lines) + "\n").encode("utf-8"),
+                                     "filename": "batch_output.jsonl", "purpose": "batch_output"}
+            batch.update(status="completed", output_file_id=output_id, completed_at=int(time.time()),
+                         request_counts={"total": len(lines), "completed": len(lines), "failed": 0})
+        return {key: value for key, value in batch.items() if not key.startswith("_")}
+
+    def anthropic_batch(self, batch: dict, base_url: str) -> dict:
+        """Current state of an Anthropic message batch."""
+        total = len(batch["_requests"])
+        if self.ready(batch):
+            batch.update(processing_status="ended", ended_at=iso_now(),
+                         results_url=f"{base_url}/v1/messages/batches/{batch['id']}/results",
+                         request_counts={"processing": 0, "succeeded": total, "errored": 0,
+                                         "canceled": 0, "expired": 0})
+        return {key: value for key, value in batch.items() if not key.startswith("_")}
+
+
+def iso_now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def make_handler(store: BatchStore):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def base_url(self) -> str:
+            return f"http://{self.headers.get('Host')}"
+
+        def send_json(self, status: int, body: dict):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def send_bytes(self, payload: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def not_found(self):
+            self.send_json(404, {"error": {"type": "not_found_error", "message": f"No route for {self.path}"}})
+
+        def do_POST(self):
+            path = self.path.split("?")[0].rstrip("/")
+            body = self.read_body()
+            if path == "/v1/files":
+                self.upload_file(body)
+            elif path == "/v1/batches":
+                request = json.loads(body)
+                stored = store.files.get(request["input_file_id"])
+                if stored is None:
+                    return self.send_json(400, {"error": {"message": "Unknown input_file_id"}})
+                total = sum(1 for line in stored["content"].splitlines() if line.strip())
+                batch_id = store.new_id("batch_")
+                store.batches[batch_id] = {
+                    "id": batch_id, "object": "batch", "endpoint": request["endpoint"], "errors": None,
+                    "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                    "status": "in_progress", "output_file_id": None, "error_file_id": None,
+                    "created_at": int(time.time()), "request_counts": {"total": total, "completed": 0, "failed": 0},
+                    "_created": time.time(),
+                }
+                self.send_json(200, store.openai_batch(store.batches[batch_id]))
+            elif path == "/v1/messages/batches":
+                request = json.loads(body)
+                batch_id = store.new_id("msgbatch_")
+                store.batches[batch_id] = {
+                    "id": batch_id, "type": "message_batch", "processing_status": "in_progress",
+                    "request_counts": {"processing": len(request["requests"]), "succeeded": 0, "errored": 0,
+                                       "canceled": 0, "expired": 0},
+                    "created_at": iso_now(), "expires_at": iso_now(), "ended_at": None,
+                    "cancel_initiated_at": None, "archived_at": None, "results_url": None,
+                    "_requests": request["requests"], "_created": time.time(),
+                }
+                self.send_json(200, store.anthropic_batch(store.batches[batch_id], self.base_url()))
+            else:
+                self.not_found()
+
+        def upload_file(self, body: bytes):
+            header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+            message = BytesParser(policy=HTTP).parsebytes(header + body)
+            content, filename, purpose = b"", "upload.jsonl", "batch"
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                if name == "file":
+                    content = part.get_payload(decode=True)
+                    filename = part.get_filename() or filename
+                elif name == "purpose":
+                    purpose = part.get_content().strip()
+            file_id = store.new_id("file-")
+            store.files[file_id] = {"content": content, "filename": filename, "purpose": purpose}
+            self.send_json(200, {"id": file_id, "object": "file", "bytes": len(content),
+                                 "created_at": int(time.time()), "filename": filename,
+                                 "purpose": purpose, "status": "processed"})
+
+        def do_GET(self):
+            path = self.path.split("?")[0].rstrip("/")
+            parts = path.strip("/").split("/")
+            if len(parts) == 4 and parts[:2] == ["v1", "files"] and parts[3] == "content":
+                stored = store.files.get(parts[2])
+                if stored is None:
+                    return self.not_found()
+                self.send_bytes(stored["content"], "application/jsonl")
+            elif len(parts) == 3 and parts[:2] == ["v1", "batches"] and parts[2] in store.batches:
+                self.send_json(200, store.openai_batch(store.batches[parts[2]]))
+            elif len(parts) == 4 and parts[:3] == ["v1", "messages", "batches"] and parts[3] in store.batches:
+                self.send_json(200, store.anthropic_batch(store.batches[parts[3]], self.base_url()))
+            elif len(parts) == 5 and parts[:3] == ["v1", "messages", "batches"] and parts[4] == "results":
+                batch = store.batches.get(parts[3])
+                if batch is None or batch["processing_status"] != "ended":
+                    return self.not_found()
+                lines = []
+                for entry in batch["_requests"]:
+                    text = store.responder("anthropic", entry["params"])
+                    lines.append(json.dumps({"custom_id": entry["custom_id"], "result": {
+                        "type": "succeeded", "message": anthropic_message(entry["params"], text)}}))
+                self.send_bytes(("\n".join(lines) + "\n").encode("utf-8"), "application/binary")
+            else:
+                self.not_found()
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8800, delay: float = 5.0, responder=default_responder):
+    """Create the stand-in server; call serve_forever() on the result."""
+    return ThreadingHTTPServer((host, port), make_handler(BatchStore(delay, responder)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI and Anthropic batch APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--delay", type=float, default=5.0, help="Seconds before a batch is reported finished")
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.delay)
+    print(f"Stand-in batch server listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+End-to-end throughput benchmarks of the evaluation path.
+
+Each scenario runs the engine (fallacy.engine.evaluate) or the judge
+(evaluation/count.py) against the offline mock server under a fixed fault
+profile, on a real dataset or on up to 100k synthetic sentences, and reports
+sentences per second, wall time, peak RSS, retries, errors and event-loop lag.
+Every scenario runs in its own process so peak RSS is its own.
+
+Results are compared with the baselines in bench/<scenario>.json, and
+regressions beyond TOLERANCE are flagged; --save replaces the baselines, so a
+change shows up as a diff of those files.
+
+Usage (from the repository root):
+    python -m fallacy.bench                      # every scenario not marked slow
+    python -m fallacy.bench engine-synthetic-100k
+    python -m fallacy.bench --save               # record new baselines
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from fallacy.registry import CSV_DIR, DATASETS, PROVIDERS, ROOT_DIR
+from fallacy.telemetry import Telemetry, percentile
+
+BASELINE_DIR = os.path.join(ROOT_DIR, "bench")
+LAG_INTERVAL = 0.05  # Seconds between event-loop lag probes
+
+# target: "engine" or "judge"; dataset: a DATASETS key, or sentences: the
+# number of synthetic sentences; profile and overrides configure the mock
+# server (fallacy/mock_server.py); slow scenarios only run when named.
+SCENARIOS = {
+    "engine-smartypat-clean": {"target": "engine", "dataset": "SmartyPat", "profile": "clean"},
+    "engine-smartypat-realistic": {"target": "engine", "dataset": "SmartyPat", "profile": "realistic",
+                                   "time_scale": 0.1},
+    "engine-smartypat-flaky": {"target": "engine", "dataset": "SmartyPat", "profile": "flaky",
+                               "time_scale": 0.1},
+    "engine-pack10-realistic": {"target": "engine", "dataset": "SmartyPat", "profile": "realistic",
+                                "time_scale": 0.1, "pack": 10},
+    "engine-synthetic-10k": {"target": "engine", "sentences": 10000, "profile": "clean",
+                             "overrides": {"latency": 0.05}},
+    "engine-synthetic-100k": {"target": "engine", "sentences": 100000, "profile": "clean",
+                              "overrides": {"latency": 0.05}, "slow": True},
+    "judge-augmented-realistic": {"target": "judge", "dataset": "SmartyPat_augmented_label",
+                                  "profile": "realistic", "time_scale": 0.1},
+}
+
+# Allowed relative change before a metric is reported as a regression, the
+# absolute change below which it is noise, and whether higher values are better
+TOLERANCE = {
+    "sentences_per_second": (0.10, 1.0, True),
+    "wall_time": (0.10, 1.0, False),
+    "peak_rss_mb": (0.20, 10.0, False),
+    "event_loop_lag_p99": (0.50, 0.05, False),
+}
+
+
+class LagMonitor:
+    """Samples how late the event loop wakes up from a short sleep."""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.monotonic() - start - self.interval)
+
+    def start(self):
+        self.task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> dict:
+        self.task.cancel()
+        return {q: round(percentile(self.samples, level) or 0.0, 4)
+                for q, level in (("p50", 0.5), ("p99", 0.99), ("max", 1.0))}
+
+
+def synthetic_sentences(count: int) -> list:
+    """count distinct sentences built from the SmartyPat ones, which the mock answers by hash."""
+    from fallacy.engine import load_sentences
+    base = load_sentences(DATASETS["SmartyPat"])
+    return [f"{base[i % len(base)]} (variant {i // len(base)})" for i in range(count)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(scenario: dict, port: int) -> subprocess.Popen:
+    """Run the mock server in its own process and wait until it accepts connections."""
+    command = [sys.executable, "-m", "fallacy.mock_server", "--port", str(port),
+               "--profile", scenario["profile"], "--time-scale", str(scenario.get("time_scale", 1.0))]
+    for field, value in scenario.get("overrides", {}).items():
+        command += [f"--{field.replace('_', '-')}", str(value)]
+    server = subprocess.Popen(command, cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Mock server did not start")
+
+
+async def run_engine(scenario: dict, workdir: str, telemetry: Telemetry) -> int:
+    from fallacy.engine import evaluate, load_sentences
+    dataset = scenario.get("dataset")
+    if dataset is None:
+        dataset = f"synthetic-{scenario['sentences']}"
+        path = os.path.join(workdir, f"{dataset}.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows([sentence] for sentence in synthetic_sentences(scenario["sentences"]))
+        DATASETS[dataset] = path
+    await evaluate(scenario.get("model", "gpt-4o"), dataset, os.path.join(workdir, "result.json"),
+                   pack=scenario.get("pack", 1), telemetry=telemetry)
+    return len(load_sentences(DATASETS[dataset]))
+
+
+async def run_judge(scenario: dict, workdir: str, telemetry: Telemetry) -> int:
+    from evaluation import count
+    from fallacy.cache import ResponseCache
+    from fallacy.clients import make_sdk_client
+    from fallacy.retry import FailureMonitor
+
+    client = make_sdk_client("openai", "mock", PROVIDERS["openai"]["base_url"])
+    cache = ResponseCache(os.path.join(workdir, "cache.sqlite"))
+    metrics = telemetry.get(count.JUDGE_MODEL, scenario["dataset"])
+    results = await count.score_file(client, cache, os.path.join(CSV_DIR, f"{scenario['dataset']}.csv"),
+                                     os.path.join(workdir, "evaluation_results.json"), {}, metrics, FailureMonitor())
+    cache.close()
+    return len(results)
+
+
+def run_scenario(name: str) -> dict:
+    """Run one scenario in this process against a fresh mock server and return its measurements."""
+    scenario = SCENARIOS[name]
+    port = free_port()
+    server = start_mock(scenario, port)
+    for provider in PROVIDERS.values():
+        provider.update(api_key="mock", base_url=f"http://127.0.0.1:{port}/v1")
+    PROVIDERS["anthropic"]["base_url"] = f"http://127.0.0.1:{port}"
+    telemetry = Telemetry()
+
+    async def run():
+        lag = LagMonitor()
+        lag.start()
+        with tempfile.TemporaryDirectory() as workdir:
+            runner = run_judge if scenario["target"] == "judge" else run_engine
+            sentences = await runner(scenario, workdir, telemetry)
+        return sentences, lag.stop()
+
+    try:
+        start = time.monotonic()
+        sentences, lag = asyncio.run(run())
+        wall = time.monotonic() - start
+    finally:
+        server.terminate()
+        server.wait()
+    runs = telemetry.report()["runs"]
+    return {
+        "scenario": name,
+        "sentences": sentences,
+        "wall_time": round(wall, 2),
+        "sentences_per_second": round(sentences / wall, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "calls": sum(run["calls"] for run in runs),
+        "retries": sum(run["retries"] for run in runs),
+        "failed": sum(run["failed"] for run in runs),
+        "errors": {error: sum(run["errors"].get(error, 0) for run in runs)
+                   for error in sorted({error for run in runs for error in run["errors"]})},
+        "event_loop_lag_p50": lag["p50"],
+        "event_loop_lag_p99": lag["p99"],
+        "event_loop_lag_max": lag["max"],
+    }
+
+
+def compare(result: dict, baseline: dict) -> list:
+    """Descriptions of the metrics that regressed beyond TOLERANCE."""
+    regressions = []
+    for metric, (tolerance, floor, higher_is_better) in TOLERANCE.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None or abs(new - old) < floor:
+            continue
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{metric} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation path against the mock server.")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all not slow); "
+                                                     f"one of {', '.join(SCENARIOS)}")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baselines")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when a metric regressed")
+    parser.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # Child process: run the scenario quietly and hand the measurements back through a file
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                result = run_scenario(args.run_one)
+            finally:
+                sys.stdout = stdout
+        with open(args.result, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    names = args.scenarios or [name for name, scenario in SCENARIOS.items() if not scenario.get("slow")]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    regressed = False
+    for name in names:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_file = f.name
+        try:
+            finished = subprocess.run([sys.executable, "-m", "fallacy.bench", "--run-one", name,
+                                       "--result", result_file], cwd=ROOT_DIR)
+            if finished.returncode != 0:
+                print(f"{name}: FAILED (exit status {finished.returncode})")
+                regressed = True
+                continue
+            with open(result_file, encoding="utf-8") as f:
+                result = json.load(f)
+        finally:
+            os.remove(result_file)
+        print(f"{name}: {result['sentences']} sentences in {result['wall_time']}s "
+              f"({result['sentences_per_second']}/s), peak RSS {result['peak_rss_mb']} MB, "
+              f"{result['retries']} retries, {result['failed']} failed, "
+              f"loop lag p99 {result['event_loop_lag_p99']}s")
+        path = baseline_path(name)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                regressions = compare(result, json.load(f))
+            for regression in regressions:
+                print(f"  REGRESSION {regression}")
+            regressed = regressed or bool(regressions)
+        if args.save:
+            os.makedirs(BASELINE_DIR, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+                f.write("\n")
+    if args.check and regressed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
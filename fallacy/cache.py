@@ -0,0 +1,168 @@
+"""
+Content-addressed on-disk cache of LLM responses.
+
+Responses are stored in a SQLite file keyed by a SHA-256 of the full request
+(API family, model, system prompt, messages, temperature, thinking budget and
+any extra fields), so re-running the evaluation engine, its --repair pass or
+the judge with unchanged prompts costs nothing. The cache is bounded in size
+and evicts least recently used entries; replay mode never calls the API and
+turns a miss into a CacheMiss error, and refresh mode always calls it and
+overwrites the stored responses.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from fallacy.registry import ROOT_DIR
+
+DEFAULT_PATH = os.path.join(ROOT_DIR, ".cache", "llm_cache.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # Evict least recently used entries beyond this size
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request has no cached response."""
+
+
+def strip_cache_control(value):
+    """Drop prompt-caching markers, which change billing but not the response."""
+    if isinstance(value, dict):
+        return {key: strip_cache_control(item) for key, item in value.items() if key != "cache_control"}
+    if isinstance(value, list):
+        return [strip_cache_control(item) for item in value]
+    return value
+
+
+def request_key(api: str, request: dict) -> str:
+    """Stable hash of every parameter that influences the response."""
+    request = strip_cache_control(request)
+    system = request.get("system")
+    if isinstance(system, list) and len(system) == 1 and set(system[0]) == {"type", "text"}:
+        # A lone text block is the same prompt as a plain string; keep keys from before prompt caching
+        request["system"] = system[0]["text"]
+    payload = json.dumps({"api": api, **request}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with hit/miss counters and LRU eviction.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES, replay: bool = False,
+                 refresh: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.refresh = refresh  # Write-only: ask the API again and replace what is stored
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if replay:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str):
+        """Return the cached response text for a key, or None."""
+        row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if not self.replay:
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response, evicting least recently used entries if the cache is full."""
+        if self.replay:
+            return
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, response, size, now, now),
+        )
+        self._size += size - (old[0] if old else 0)
+        if self._size > self.max_bytes:
+            self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at 90% of its bound."""
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 256").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._size <= target:
+                    break
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self.evictions += 1
+
+    async def fetch(self, api: str, request: dict, send, validate=None) -> str:
+        """
+        Return the response for a request, calling send() only on a cache miss
+        (always, in refresh mode).
+
+        send is a zero-argument coroutine function returning the response text.
+        Only responses accepted by validate (when given) are stored, so an
+        unusable reply is not served again on retry.
+        """
+        key = request_key(api, request)
+        if self.refresh:
+            self.misses += 1
+            cached = None
+        else:
+            cached = self.get(key)
+        if cached is not None:
+            return cached
+        if self.replay:
+            raise CacheMiss(f"No cached response for request {key[:12]}")
+        text = await send()
+        if validate is None or validate(text):
+            self.put(key, text)
+        return text
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._size,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+def add_cache_arguments(parser):
+    """Add the shared --no-cache / --replay / --cache-path options to a command line parser."""
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API")
+    parser.add_argument("--replay", action="store_true", help="Answer only from the cache; never call the API")
+    parser.add_argument("--cache-path", default=DEFAULT_PATH, help="Response cache file")
+
+
+def open_cache(args, refresh: bool = False):
+    """Open the response cache selected by add_cache_arguments() options, or None."""
+    if args.no_cache:
+        return None
+    return ResponseCache(args.cache_path, replay=args.replay, refresh=refresh)
@@ -0,0 +1,91 @@
+"""
+Crash-safe JSONL checkpoints for evaluation runs.
+
+Every finished sentence is appended to res/<dataset>/<model>.jsonl as one line
+keyed by its CSV row id, so a crash or Ctrl-C loses at most the requests that
+were still in flight. A resumed run skips ids already in the checkpoint, and
+compact() turns the checkpoint into the usual res/<dataset>/<model>.json list.
+A writer holds the checkpoint's lock (fallacy/storage.py), so a second run
+of the same model on the same dataset fails at once instead of interleaving.
+"""
+import json
+import os
+
+from fallacy.storage import locked, write_json
+
+
+def checkpoint_path(output_file: str) -> str:
+    """Checkpoint file that sits next to a result file."""
+    return os.path.splitext(output_file)[0] + ".jsonl"
+
+
+def is_done(record: dict) -> bool:
+    """A record counts as done unless it is an error marker."""
+    return "error" not in record
+
+
+def load_checkpoint(path: str) -> dict:
+    """
+    Read a checkpoint into {id: record}. Later lines win, and a line cut short
+    by a crash is ignored.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["id"]] = record
+    return records
+
+
+class CheckpointWriter:
+    """
+    Append-only JSONL writer; each record is flushed and fsynced before the
+    next one so that completed work survives a crash. Raises LockTimeout when
+    another process is writing the same checkpoint.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = locked(path, timeout=0)
+        self._lock.__enter__()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self._file.tell() > 0:
+            # Terminate a line cut short by a crash so the next record starts cleanly
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def append(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+        self._lock.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compact(path: str, output_file: str) -> list:
+    """
+    Write the checkpoint out as the id-ordered JSON list used by statistics/ and fig/.
+    """
+    records = load_checkpoint(path)
+    data = [records[idx] for idx in sorted(records)]
+    write_json(output_file, data)
+    return data
@@ -0,0 +1,179 @@
+"""
+Shared, pooled HTTP clients for every script that calls a model API.
+
+make_sdk_client hands out OpenAI / Anthropic SDK clients that all sit on one
+pooled httpx client per (base URL, credentials, sync or async), so the engine,
+the judge, the repair pass and the helper scripts reuse keep-alive connections
+to the same endpoint instead of opening a new TCP + TLS connection per client
+or per call. Connection limits, keep-alive expiry, HTTP/2 and connect/read
+timeouts come from HTTP_DEFAULTS, overridden per provider in PROVIDERS.
+
+HTTP/2 needs the optional h2 package (pip install "httpx[http2]"); without
+it the clients speak HTTP/1.1 with keep-alive. Every request is traced, and
+connection_report() gives the requests, new connections, reuse rate and time
+spent in TCP/TLS handshakes per endpoint, to confirm that handshakes are no
+longer part of per-request latency.
+
+Async clients belong to the event loop that created them; a new asyncio.run
+gets new ones.
+"""
+import asyncio
+import hashlib
+import time
+
+import httpx
+from anthropic import Anthropic, AsyncAnthropic
+from openai import AsyncOpenAI, OpenAI
+
+try:
+    import h2  # noqa: F401  (only needed for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Applied to providers that do not set their own values
+HTTP_DEFAULTS = {
+    "max_connections": 256,  # Matches the rate controller's max_concurrency
+    # httpcore scans every pooled connection for each queued request, so a large
+    # idle pool costs event-loop time under bursts; 100 is also the SDK default
+    "max_keepalive_connections": 100,
+    "keepalive_expiry": 60.0,  # Seconds an idle connection is kept open
+    "http2": True,  # Used when h2 is installed
+    "connect_timeout": 10.0,  # Seconds
+    "read_timeout": 600.0,  # Seconds; long thinking replies need minutes
+}
+
+_clients = {}  # (loop or "sync", base URL, credential digest) -> (httpx client, ConnectionStats)
+
+
+class ConnectionStats:
+    """Requests sent and connections opened on one pooled client."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.handshake_time = 0.0
+
+    def tracer(self):
+        """A trace callback for one request (see httpcore's "trace" extension)."""
+        started = {}
+
+        def trace(name: str, info: dict):
+            step, _, phase = name.rpartition(".")
+            if step not in ("connection.connect_tcp", "connection.start_tls"):
+                return
+            if phase == "started":
+                started[step] = time.monotonic()
+            elif phase == "complete":
+                if step == "connection.connect_tcp":
+                    self.connections += 1
+                else:
+                    self.tls_handshakes += 1
+                self.handshake_time += time.monotonic() - started.pop(step, time.monotonic())
+
+        return trace
+
+    def summary(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "connections": self.connections,
+            "reuse_rate": round(1 - self.connections / self.requests, 3) if self.requests else None,
+            "tls_handshakes": self.tls_handshakes,
+            "handshake_seconds": round(self.handshake_time, 3),
+        }
+
+
+class TracedTransport(httpx.AsyncBaseTransport):
+    """Async transport that counts requests and new connections."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: ConnectionStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        trace = self.stats.tracer()
+
+        async def async_trace(name, info):
+            trace(name, info)
+
+        request.extensions["trace"] = async_trace
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class SyncTracedTransport(httpx.BaseTransport):
+    """Blocking counterpart of TracedTransport."""
+
+    def __init__(self, transport: httpx.BaseTransport, stats: ConnectionStats):
+        self.transport = transport
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        request.extensions["trace"] = self.stats.tracer()
+        return self.transport.handle_request(request)
+
+    def close(self):
+        self.transport.close()
+
+
+def http_settings(overrides: dict = None) -> dict:
+    """HTTP_DEFAULTS with the matching keys of overrides (a PROVIDERS entry) applied."""
+    settings = dict(HTTP_DEFAULTS)
+    settings.update({key: value for key, value in (overrides or {}).items() if key in HTTP_DEFAULTS})
+    return settings
+
+
+def timeout(settings: dict) -> httpx.Timeout:
+    return httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"])
+
+
+def shared_http_client(base_url: str = None, api_key: str = "", settings: dict = None, sync: bool = False):
+    """
+    The pooled httpx client for an endpoint and credentials, created on first
+    use with the given settings (later calls reuse it as it is).
+    """
+    settings = http_settings(settings)
+    owner = "sync" if sync else asyncio.get_running_loop()
+    key = (owner, base_url or "", hashlib.sha256((api_key or "").encode("utf-8")).hexdigest())
+    if key not in _clients:
+        limits = httpx.Limits(max_connections=settings["max_connections"],
+                              max_keepalive_connections=settings["max_keepalive_connections"],
+                              keepalive_expiry=settings["keepalive_expiry"])
+        http2 = bool(settings["http2"]) and HTTP2_AVAILABLE
+        stats = ConnectionStats(base_url or "default")
+        if sync:
+            transport = SyncTracedTransport(httpx.HTTPTransport(limits=limits, http2=http2), stats)
+            client = httpx.Client(transport=transport, timeout=timeout(settings))
+        else:
+            transport = TracedTransport(httpx.AsyncHTTPTransport(limits=limits, http2=http2), stats)
+            client = httpx.AsyncClient(transport=transport, timeout=timeout(settings))
+        _clients[key] = (client, stats)
+    return _clients[key][0]
+
+
+def make_sdk_client(api: str, api_key: str, base_url: str = None, settings: dict = None, sync: bool = False):
+    """
+    An OpenAI or Anthropic SDK client (api "openai" or "anthropic") on the
+    shared pool for its endpoint. SDK retries are off: callers follow the
+    shared retry policy (fallacy/retry.py), so that 429s reach the rate
+    controller.
+    """
+    kwargs = {"api_key": api_key, "max_retries": 0, "timeout": timeout(http_settings(settings)),
+              "http_client": shared_http_client(base_url, api_key, settings, sync)}
+    if base_url:
+        kwargs["base_url"] = base_url
+    if api == "anthropic":
+        return (Anthropic if sync else AsyncAnthropic)(**kwargs)
+    return (OpenAI if sync else AsyncOpenAI)(**kwargs)
+
+
+def connection_report() -> list:
+    """Connection reuse of every pooled client created so far."""
+    return [stats.summary() for _, stats in _clients.values()]
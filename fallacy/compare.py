@@ -0,0 +1,91 @@
+"""
+Compare packed and single-sentence evaluation on the same sentences.
+
+Runs a model over the first --limit sentences of a dataset twice, once with one
+sentence per request and once with --pack sentences per request, and reports
+the token cost of each mode and how often the two agree.
+
+Usage (from the repository root):
+    python -m fallacy.compare --model gpt-4o --dataset SmartyPat --pack 10 --limit 100
+"""
+import argparse
+import asyncio
+import json
+
+from fallacy.cache import add_cache_arguments, open_cache
+from fallacy.engine import make_client, process_line, process_pack, load_sentences, usage_summary
+from fallacy.ratelimit import make_controller
+from fallacy.registry import DATASETS, MODELS, get_model
+
+
+def fallacy_set(result: dict) -> set:
+    fallacies = result.get("logic_fallacies") or []
+    if isinstance(fallacies, str):
+        fallacies = fallacies.split(",")
+    return {str(f).strip().lower() for f in fallacies if str(f).strip()}
+
+
+def agreement(single: dict, packed: dict) -> dict:
+    """Verdict agreement, top-fallacy agreement and mean Jaccard overlap of the fallacy lists."""
+    ids = [idx for idx in single if "error" not in single[idx] and "error" not in packed.get(idx, {"error": 1})]
+    if not ids:
+        return {"compared": 0}
+    verdict = top = jaccard = 0
+    for idx in ids:
+        a, b = single[idx], packed[idx]
+        verdict += str(a.get("logic_error", "")).lower() == str(b.get("logic_error", "")).lower()
+        list_a, list_b = a.get("logic_fallacies") or [], b.get("logic_fallacies") or []
+        if isinstance(list_a, list) and isinstance(list_b, list) and list_a and list_b:
+            top += str(list_a[0]).lower() == str(list_b[0]).lower()
+        set_a, set_b = fallacy_set(a), fallacy_set(b)
+        jaccard += len(set_a & set_b) / len(set_a | set_b) if set_a | set_b else 1.0
+    return {
+        "compared": len(ids),
+        "logic_error_agreement": round(verdict / len(ids), 3),
+        "top_fallacy_agreement": round(top / len(ids), 3),
+        "fallacy_jaccard": round(jaccard / len(ids), 3),
+    }
+
+
+async def compare(name: str, dataset: str, pack: int, limit: int, cache=None) -> dict:
+    config = get_model(name)
+    items = list(enumerate(load_sentences(DATASETS[dataset])[:limit], start=1))
+    client = make_client(config)
+    controller = make_controller(config["provider"])
+
+    single_usage, packed_usage = {}, {}
+    single = await asyncio.gather(*(process_line(client, config, sentence, controller, cache, single_usage)
+                                    for _, sentence in items))
+    single = {idx: result for (idx, _), result in zip(items, single)}
+    packed = {}
+    for chunk in await asyncio.gather(*(process_pack(client, config, items[i:i + pack], controller, cache,
+                                                     packed_usage)
+                                        for i in range(0, len(items), pack))):
+        packed.update(chunk)
+
+    return {
+        "model": name,
+        "dataset": dataset,
+        "sentences": len(items),
+        "pack": pack,
+        "single": usage_summary(single_usage),
+        "packed": usage_summary(packed_usage),
+        "packing_fallbacks": sum(1 for result in packed.values() if result.get("packing_fallback")),
+        "agreement": agreement(single, packed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare packed and single-sentence requests.")
+    parser.add_argument("--model", required=True, choices=sorted(MODELS))
+    parser.add_argument("--dataset", default="SmartyPat", choices=sorted(DATASETS))
+    parser.add_argument("--pack", type=int, default=10, help="Sentences per packed request")
+    parser.add_argument("--limit", type=int, default=100, help="Number of sentences to compare")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    report = asyncio.run(compare(args.model, args.dataset, args.pack, args.limit, open_cache(args)))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
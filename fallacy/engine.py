@@ -0,0 +1,564 @@
+"""
+Async evaluation engine for logical fallacy detection.
+
+Replaces the per-model fallacy_*.py scripts: every model in fallacy/registry.py
+is evaluated by the same code, using native async clients (AsyncOpenAI /
+AsyncAnthropic) so that many requests can be in flight on one event loop
+without a thread per request.
+
+--repair re-runs only the error entries and schema-invalid records of an
+existing result file, replacing the per-model correct.py repair scripts.
+
+Usage (from the repository root):
+    python -m fallacy.engine --model gpt-4o --dataset SmartyPat
+    python -m fallacy.engine --model gpt-4o --dataset SmartyPat --repair
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from collections import OrderedDict
+
+from fallacy.cache import ResponseCache, add_cache_arguments, open_cache
+from fallacy.checkpoint import CheckpointWriter, checkpoint_path, compact, is_done, load_checkpoint
+from fallacy.clients import connection_report, make_sdk_client
+from fallacy.hedging import HedgePolicy, HedgeSkipped, add_hedge_arguments, hedge_options, hedged, make_policy
+from fallacy.packing import PACKED_TOKENS_PER_ITEM, build_packed_prompt, is_packed_reply, parse_packed
+from fallacy.parsing import is_valid_reply, parse_reply, parse_summary, record_parse, validate_result
+from fallacy.prompts import SYSTEM_PROMPT, build_prompt
+from fallacy.progress import Cell
+from fallacy.ratelimit import RateController, estimate_tokens, get_controller
+from fallacy.registry import DATASETS, MODELS, PROVIDERS, get_model, output_path
+from fallacy.retry import (FAIL_ITEM, PARSE, UNEXPECTED, FailureMonitor, FatalError, ParseError, RunAborted,
+                           classify, gather_or_abort, with_retries)
+from fallacy.storage import read_json, update_json
+from fallacy.streaming import add_stream_arguments, stream_reply
+from fallacy.telemetry import Metrics, Telemetry, add_telemetry_arguments, error_class, response_tokens
+
+MAX_RETRIES = 5  # Max retry attempts per request
+ANTHROPIC_MAX_TOKENS = 1000  # Output cap when a model entry does not set one
+
+
+def make_client(config: dict):
+    """
+    Create the async client for a model's provider, on the connection pool
+    shared by every model of that provider (fallacy/clients.py).
+    """
+    provider = PROVIDERS[config["provider"]]
+    return make_sdk_client(provider["api"], provider["api_key"], provider["base_url"], provider)
+
+
+def build_request(config: dict, system: str, prompt: str) -> dict:
+    """
+    Build the request arguments for a model's API family.
+    """
+    if config["api"] == "anthropic":
+        request = {
+            "model": config["model"],
+            "max_tokens": config["max_tokens"] or ANTHROPIC_MAX_TOKENS,
+            "system": system,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if config["prompt_cache"]:
+            # Cache breakpoint after the static system prompt; only the sentence varies
+            request["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        if config["temperature"] is not None:
+            request["temperature"] = config["temperature"]
+        if config["thinking_budget"]:
+            request["thinking"] = {"type": "enabled", "budget_tokens": config["thinking_budget"]}
+        return request
+
+    # OpenAI-style endpoints cache the longest repeated prefix automatically, so
+    # the static system prompt always comes first and the sentence last
+    request = {
+        "model": config["model"],
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt},
+        ],
+    }
+    if config["temperature"] is not None:
+        request["temperature"] = config["temperature"]
+    if config["max_tokens"]:
+        request["max_tokens"] = config["max_tokens"]
+    if config["extra_body"]:
+        request["extra_body"] = config["extra_body"]
+    return request
+
+
+def add_usage(usage: dict, input_tokens: int, output_tokens: int, cached_tokens: int = 0,
+              cache_write_tokens: int = 0, latency: float = None):
+    """
+    Accumulate token counts of one API call into a usage dict. input_tokens is
+    the whole prompt, cached_tokens the part of it read from the provider's
+    prompt cache. Each call is also kept in usage["calls"] when
+    usage["keep_calls"] is set (for --usage-report); otherwise only totals are
+    kept, so the dict stays small however long the run.
+    """
+    input_tokens, output_tokens = input_tokens or 0, output_tokens or 0
+    cached_tokens, cache_write_tokens = cached_tokens or 0, cache_write_tokens or 0
+    usage["requests"] = usage.get("requests", 0) + 1
+    usage["input_tokens"] = usage.get("input_tokens", 0) + input_tokens
+    usage["cached_input_tokens"] = usage.get("cached_input_tokens", 0) + cached_tokens
+    usage["uncached_input_tokens"] = usage.get("uncached_input_tokens", 0) + input_tokens - cached_tokens
+    usage["cache_write_tokens"] = usage.get("cache_write_tokens", 0) + cache_write_tokens
+    usage["output_tokens"] = usage.get("output_tokens", 0) + output_tokens
+    if latency is not None:
+        # [total seconds, calls] of calls with and without prompt-cache reads, for usage_summary
+        totals = usage.setdefault("latency", {}).setdefault("cached" if cached_tokens else "uncached", [0.0, 0])
+        totals[0] += latency
+        totals[1] += 1
+    if usage.get("keep_calls"):
+        usage.setdefault("calls", []).append({
+            "input_tokens": input_tokens,
+            "cached_input_tokens": cached_tokens,
+            "cache_write_tokens": cache_write_tokens,
+            "output_tokens": output_tokens,
+            "latency": round(latency, 3) if latency is not None else None,
+        })
+
+
+def record_usage(usage: dict, api: str, response, latency: float):
+    """Add the token usage reported in an API response to usage."""
+    tokens = response_tokens(api, response)
+    if usage is None or not tokens:
+        return
+    add_usage(usage, tokens["input_tokens"], tokens["output_tokens"], tokens.get("cached_tokens", 0),
+              tokens.get("cache_write_tokens", 0), latency)
+
+
+def usage_summary(usage: dict) -> dict:
+    """Totals of a usage dict, with the cached share of input and mean latency of cached vs uncached calls."""
+    summary = {key: value for key, value in usage.items() if key not in ("calls", "keep_calls", "latency")}
+    if usage.get("input_tokens"):
+        summary["cached_share"] = round(usage["cached_input_tokens"] / usage["input_tokens"], 3)
+    for label in ("cached", "uncached"):
+        total, calls = usage.get("latency", {}).get(label, (0.0, 0))
+        if calls:
+            summary[f"{label}_mean_latency"] = round(total / calls, 3)
+    return summary
+
+
+async def send_request(client, api: str, request: dict, usage: dict = None, metrics: Metrics = None,
+                       stream: bool = False, early_stop: bool = False) -> str:
+    """
+    Send a prepared request and return the text of the reply. Token counts are
+    added to usage, and latency, tokens and errors to metrics, when given.
+    With stream, the reply is streamed and its time to first token and time to
+    verdict are recorded; with early_stop, the stream is closed as soon as the
+    verdict is complete (see fallacy/streaming.py).
+    """
+    start = time.monotonic()
+    if stream or early_stop:
+        try:
+            streamed = await stream_reply(client, api, request, early_stop)
+        except Exception as e:
+            if metrics is not None:
+                metrics.record_call(time.monotonic() - start, error=error_class(e))
+            raise
+        latency = time.monotonic() - start
+        record_usage(usage, api, streamed["response"], latency)
+        if metrics is not None:
+            metrics.record_call(latency, response_tokens(api, streamed["response"]), streamed["ttft"],
+                                ttv=streamed["ttv"], stopped=streamed["stopped"])
+        return streamed["text"].strip()
+    try:
+        if api == "anthropic":
+            response = await client.messages.create(**request)
+        else:
+            response = await client.chat.completions.create(**request)
+    except Exception as e:
+        if metrics is not None:
+            metrics.record_call(time.monotonic() - start, error=error_class(e))
+        raise
+    latency = time.monotonic() - start
+    record_usage(usage, api, response, latency)
+    if metrics is not None:
+        metrics.record_call(latency, response_tokens(api, response))
+    if api == "anthropic":
+        for block in response.content:
+            if block.type == "text":
+                return block.text.strip()
+        raise ParseError("No 'text' type content found in response.")
+    return (response.choices[0].message.content or "").strip()
+
+
+async def complete(client, config: dict, system: str, prompt: str, controller: RateController = None,
+                   cache: ResponseCache = None, usage: dict = None, validate=is_valid_reply,
+                   metrics: Metrics = None, hedge: HedgePolicy = None) -> str:
+    """
+    Send one system + user prompt to the model and return the text of the reply,
+    answering from the response cache when one is given (only replies accepted by
+    validate are cached). Only the API call itself holds a slot of the provider's
+    rate controller. With a hedge policy, a call slower than the model's latency
+    percentile is duplicated and the first valid reply is used; the duplicate takes
+    its own slot and budget tokens, and is skipped when none are free right away.
+    """
+    request = build_request(config, system, prompt)
+
+    async def call():
+        return await send_request(client, config["api"], request, usage, metrics, config["stream"],
+                                  config["early_stop"])
+
+    async def hedge_call():
+        if controller is None:
+            return await call()
+        async with controller.try_slot(estimate_tokens(request)) as free:
+            if not free:
+                raise HedgeSkipped()
+            return await call()
+
+    async def send():
+        attempt = call if hedge is None else (lambda: hedged(call, hedge, validate, send_hedge=hedge_call))
+        if controller is None:
+            return await attempt()
+        # Held by the primary call; a hedge needs a second slot of its own
+        async with controller.slot(estimate_tokens(request)):
+            return await attempt()
+
+    if cache is None:
+        return await send()
+    # Early-stopped replies lack most of their details, so they are kept apart from full ones
+    key_request = dict(request, early_stop=True) if config["early_stop"] else request
+    return await cache.fetch(config["api"], key_request, send, validate=validate)
+
+
+async def process_line(client, config: dict, sentence: str, controller: RateController = None,
+                       cache: ResponseCache = None, usage: dict = None, parse_stats: dict = None,
+                       metrics: Metrics = None, hedge: HedgePolicy = None, monitor: FailureMonitor = None) -> dict:
+    """
+    Process a single sentence by sending it to the LLM for logical fallacy detection.
+    Errors follow the shared retry policy (fallacy/retry.py): auth/config errors
+    abort the run, invalid requests fail the sentence at once, and other
+    failures are retried up to MAX_RETRIES times without holding a concurrency
+    slot while backing off. Replies are repaired and validated by parse_reply,
+    and only unusable ones are asked again; the outcome of every reply is
+    counted in parse_stats when it is given. Every call, and the sentence as a
+    whole with its retry count, is recorded in metrics.
+    """
+    prompt = build_prompt(sentence)
+    result_text = ""
+    start = time.monotonic()
+    attempts = 0
+
+    async def attempt():
+        nonlocal attempts, result_text
+        attempts += 1
+        result_text = await complete(client, config, SYSTEM_PROMPT, prompt, controller, cache, usage,
+                                     metrics=metrics, hedge=hedge)
+        result, outcome = parse_reply(result_text)
+        record_parse(parse_stats, outcome)
+        if result is None:
+            raise ParseError(f"{outcome} response: {result_text[:100]}...")
+        return result
+
+    try:
+        result = await with_retries(attempt, MAX_RETRIES, monitor, hints_handled=controller is not None,
+                                    label=f"[{config['name']}] ")
+    except (FatalError, RunAborted):
+        raise
+    except Exception as e:
+        if classify(e) == UNEXPECTED:
+            raise
+        if metrics is not None:
+            metrics.record_request(time.monotonic() - start, max(0, attempts - 1), ok=False)
+        return {
+            "error": "error: Failed after multiple retries",
+            "error_kind": classify(e),
+            "original_sentence": sentence,
+            "raw_response": result_text
+        }
+    if metrics is not None:
+        metrics.record_request(time.monotonic() - start, attempts - 1)
+    return result
+
+
+async def process_pack(client, config: dict, items: list, controller: RateController = None,
+                       cache: ResponseCache = None, usage: dict = None, parse_stats: dict = None,
+                       metrics: Metrics = None, hedge: HedgePolicy = None, monitor: FailureMonitor = None) -> dict:
+    """
+    Classify several (id, sentence) items with one packed request and return
+    {id: result}. The pack is retried like a single sentence on transient and
+    rate-limit errors. Items missing or malformed in the reply, or every item
+    after a parse or invalid-request failure, fall back to single-sentence
+    requests.
+    """
+    ids = [idx for idx, _ in items]
+    packed_config = dict(config)
+    # One reply holds every verdict, so there is no single verdict to stop at
+    packed_config["stream"] = packed_config["early_stop"] = False
+    if config["api"] == "anthropic" or config["max_tokens"]:
+        budget = (config["max_tokens"] or ANTHROPIC_MAX_TOKENS) + PACKED_TOKENS_PER_ITEM * (len(items) - 1)
+        packed_config["max_tokens"] = budget
+    results = {}
+    start = time.monotonic()
+    attempts = 0
+
+    async def attempt():
+        nonlocal attempts
+        attempts += 1
+        return await complete(client, packed_config, SYSTEM_PROMPT, build_packed_prompt(items),
+                              controller, cache, usage, validate=is_packed_reply, metrics=metrics, hedge=hedge)
+
+    try:
+        # A reply the pack cannot get right is not asked again: its sentences go one at a time
+        reply = await with_retries(attempt, MAX_RETRIES, monitor, hints_handled=controller is not None,
+                                   label=f"[{config['name']}] Packed: ", give_up=FAIL_ITEM | {PARSE})
+        results = parse_packed(reply, ids)
+    except (FatalError, RunAborted):
+        raise
+    except Exception as e:
+        kind = classify(e)
+        if kind == UNEXPECTED:
+            raise
+        if kind not in FAIL_ITEM | {PARSE}:
+            # Out of retries on a transient or rate-limit error, which singles would only repeat
+            if metrics is not None:
+                metrics.record_request(time.monotonic() - start, max(0, attempts - 1), ok=False)
+            return {idx: {"error": "error: Failed after multiple retries", "error_kind": kind,
+                          "original_sentence": sentence, "raw_response": ""} for idx, sentence in items}
+    if metrics is not None:
+        metrics.record_request(time.monotonic() - start, max(0, attempts - 1), ok=bool(results))
+
+    missing = [(idx, sentence) for idx, sentence in items if idx not in results]
+    if missing:
+        print(f"[{config['name']}] {len(missing)}/{len(items)} packed items missing, retrying singly")
+        fallbacks = await asyncio.gather(*(process_line(client, config, sentence, controller, cache, usage,
+                                                        parse_stats, metrics, hedge, monitor)
+                                           for _, sentence in missing))
+        for (idx, _), result in zip(missing, fallbacks):
+            result["packing_fallback"] = True
+            results[idx] = result
+    return results
+
+
+def load_sentences(input_file: str) -> list:
+    """
+    Load sentences from the first column of a dataset CSV.
+    """
+    sentences = []
+    with open(input_file, 'r', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        for row in reader:
+            if row and row[0].strip():
+                sentences.append(row[0].strip())
+    return sentences
+
+
+def format_result(idx: int, sentence: str, result: dict) -> OrderedDict:
+    """
+    Lay out one result the way the res/ files expect: id, sentence, then the model's fields.
+    """
+    new_dict = OrderedDict()
+    new_dict["id"] = idx
+    new_dict["sentence"] = sentence
+    for key, value in result.items():
+        if key != "sentence":
+            new_dict[key] = value
+    return new_dict
+
+
+async def evaluate(name: str, dataset: str, output_file: str = None, resume: bool = False,
+                   cache: ResponseCache = None, controllers: dict = None, progress: Cell = None,
+                   pack: int = 1, usage: dict = None, telemetry: Telemetry = None,
+                   hedge: HedgePolicy = None, monitor: FailureMonitor = None, stream: bool = False,
+                   early_stop: bool = False) -> str:
+    """
+    Evaluate one registered model on one dataset and write res/<dataset>/<model>.json.
+
+    Each result is appended to a JSONL checkpoint as soon as it completes; with
+    resume=True, sentences already in the checkpoint are not sent again. Requests
+    already answered in the response cache are not sent either. controllers maps
+    provider names to shared RateControllers so concurrent runs against the same
+    provider share one budget. progress, when given, is updated as sentences
+    start and finish. With pack > 1, that many sentences share one request.
+    Token counts of the API calls are added to usage when it is given, and
+    reply parse outcomes to progress.parse. Latencies, tokens, retries and
+    errors are recorded in telemetry under (model, dataset). hedge, when
+    given, duplicates requests that run past the model's latency percentile.
+    The run stops early on auth/config errors or when monitor (a fresh
+    FailureMonitor by default) sees too many failures; the checkpoint is kept
+    for --resume and the error is raised. stream and early_stop turn on
+    streaming and early stopping for this run (see fallacy/streaming.py).
+    Returns the path of the written file.
+    """
+    config = get_model(name)
+    config["stream"] = config["stream"] or stream
+    config["early_stop"] = config["early_stop"] or early_stop
+    output_file = output_file or output_path(name, dataset)
+    sentences = load_sentences(DATASETS[dataset])
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    ckpt_file = checkpoint_path(output_file)
+    done = set()
+    if resume:
+        done = {idx for idx, record in load_checkpoint(ckpt_file).items() if is_done(record)}
+        print(f"[{name}] Resuming: {len(done)}/{len(sentences)} sentences already done")
+
+    client = make_client(config)
+    controller = get_controller(controllers if controllers is not None else {}, config["provider"])
+    metrics = telemetry.get(name, dataset, config["model"]) if telemetry is not None else None
+    monitor = monitor or FailureMonitor()
+    progress = progress or Cell()
+    progress.total = len(sentences)
+    progress.skipped = len(done)
+
+    with CheckpointWriter(ckpt_file, resume=resume) as writer:
+        async def run_one(idx: int, sentence: str):
+            progress.begin()
+            result = await process_line(client, config, sentence, controller, cache, usage, progress.parse,
+                                        metrics, hedge, monitor)
+            writer.append(format_result(idx, sentence, result))
+            progress.finish("error" not in result)
+
+        async def run_pack(items: list):
+            for _ in items:
+                progress.begin()
+            results = await process_pack(client, config, items, controller, cache, usage, progress.parse,
+                                         metrics, hedge, monitor)
+            for idx, sentence in items:
+                writer.append(format_result(idx, sentence, results[idx]))
+                progress.finish("error" not in results[idx])
+
+        pending = [(idx, sentence) for idx, sentence in enumerate(sentences, start=1) if idx not in done]
+        try:
+            if pack > 1:
+                await gather_or_abort(run_pack(pending[i:i + pack]) for i in range(0, len(pending), pack))
+            else:
+                await gather_or_abort(run_one(idx, sentence) for idx, sentence in pending)
+        except (FatalError, RunAborted) as e:
+            print(f"[{name}] Run aborted: {e}. Finished sentences are kept in {ckpt_file}; "
+                  f"continue with --resume.")
+            raise
+
+    new_results = compact(ckpt_file, output_file)
+    os.remove(ckpt_file)
+    print(f"[{name}] {len(new_results)} results written to {output_file}")
+    print(f"[{name}] Rate control: {controller.stats()}")
+    print(f"[{name}] Parsing: {parse_summary(progress.parse)}")
+    if metrics is not None:
+        print(f"[{name}] Telemetry: {dict(metrics.summary())}")
+    if hedge is not None:
+        print(f"[{name}] Hedging: {hedge.stats()}")
+    return output_file
+
+
+def needs_repair(record: dict) -> bool:
+    """An error marker (engine or legacy style), or a verdict that fails the result schema."""
+    if not is_done(record) or "error" in record.values():
+        return True
+    return validate_result(record) is None
+
+
+async def repair(name: str, result_file: str, cache: ResponseCache = None, controllers: dict = None,
+                 usage: dict = None, telemetry: Telemetry = None, monitor: FailureMonitor = None) -> dict:
+    """
+    Re-run the error entries and schema-invalid records of a result file,
+    through process_line and the provider's rate controller like a normal
+    run, and merge the fixes into the file. Records that are still broken
+    keep (or get) an error marker with a repair_attempts count. The merge
+    re-reads the file under its lock, so only repaired ids change, and
+    replaces it atomically (fallacy/storage.py). Ids that another writer
+    removed meanwhile are counted as missing, and their fixes appended rather
+    than lost. Returns counts of what was found, fixed, left broken and missing.
+    """
+    config = get_model(name)
+    data = read_json(result_file)
+    targets = [(record.get("id", pos), record.get("sentence") or record.get("original_sentence"))
+               for pos, record in enumerate(data, start=1) if needs_repair(record)]
+    skipped = [idx for idx, sentence in targets if not sentence]
+    targets = [(idx, sentence) for idx, sentence in targets if sentence]
+    print(f"[{name}] {len(targets)} of {len(data)} records need repair"
+          + (f" ({len(skipped)} without a sentence skipped)" if skipped else ""))
+    report = {"records": len(data), "to_repair": len(targets), "fixed": 0, "still_broken": 0,
+              "skipped": len(skipped), "missing": 0}
+    if not targets:
+        return report
+
+    client = make_client(config)
+    controller = get_controller(controllers if controllers is not None else {}, config["provider"])
+    metrics = telemetry.get(name, "repair", config["model"]) if telemetry is not None else None
+    parse_stats = {}
+    results = await gather_or_abort(process_line(client, config, sentence, controller, cache, usage, parse_stats,
+                                                 metrics, monitor=monitor or FailureMonitor())
+                                    for _, sentence in targets)
+
+    def merge(data: list) -> list:
+        data = data or []
+        positions = {record.get("id", pos): pos - 1 for pos, record in enumerate(data, start=1)}
+        for (idx, sentence), result in zip(targets, results):
+            if idx not in positions:
+                # Rewritten or truncated since the scan: keep a paid-for fix, drop a failure
+                report["missing"] += 1
+                if is_done(result):
+                    data.append(format_result(idx, sentence, result))
+                    report["fixed"] += 1
+                continue
+            old = data[positions[idx]]
+            if is_done(result):
+                data[positions[idx]] = format_result(idx, sentence, result)
+                report["fixed"] += 1
+            else:
+                # Keep whatever the record held and mark it as still broken
+                old.update(error=result["error"], error_kind=result["error_kind"],
+                           raw_response=result["raw_response"][:500],
+                           repair_attempts=old.get("repair_attempts", 0) + 1)
+                old.setdefault("sentence", sentence)
+                report["still_broken"] += 1
+        return data
+
+    update_json(result_file, merge)
+    print(f"[{name}] Repair: {report}")
+    print(f"[{name}] Rate control: {controller.stats()}")
+    print(f"[{name}] Parsing: {parse_summary(parse_stats)}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a registered model on a SmartyPat dataset.")
+    parser.add_argument("--model", required=True, choices=sorted(MODELS))
+    parser.add_argument("--dataset", default="SmartyPat", choices=sorted(DATASETS))
+    parser.add_argument("--output", default=None, help="Override the output JSON path")
+    parser.add_argument("--resume", action="store_true", help="Skip sentences already in the checkpoint")
+    parser.add_argument("--pack", type=int, default=1, help="Sentences per request (1 = no packing)")
+    parser.add_argument("--usage-report", default=None, help="Write per-request token usage to this JSON file")
+    parser.add_argument("--repair", action="store_true",
+                        help="Re-run only the error and schema-invalid records of the existing result file")
+    add_cache_arguments(parser)
+    add_telemetry_arguments(parser)
+    add_hedge_arguments(parser)
+    add_stream_arguments(parser)
+    args = parser.parse_args()
+    cache = open_cache(args)
+    usage = {"keep_calls": bool(args.usage_report)}  # Per-call records only when they are written out
+    telemetry = Telemetry()
+    options = hedge_options(args)
+    hedge = make_policy(args.model, **options) if options is not None else None
+    stopped = None
+    try:
+        if args.repair:
+            asyncio.run(repair(args.model, args.output or output_path(args.model, args.dataset), cache,
+                               usage=usage, telemetry=telemetry))
+        else:
+            asyncio.run(evaluate(args.model, args.dataset, args.output, resume=args.resume, cache=cache,
+                                 pack=args.pack, usage=usage, telemetry=telemetry, hedge=hedge,
+                                 stream=args.stream, early_stop=args.early_stop))
+    except (FatalError, RunAborted) as e:
+        stopped = e
+    if args.telemetry:
+        print(f"Telemetry written to {', '.join(telemetry.write(args.telemetry))}")
+    print(f"Usage: {usage_summary(usage)}")
+    print(f"Connections: {connection_report()}")
+    if args.usage_report:
+        with open(args.usage_report, 'w', encoding='utf-8') as f:
+            json.dump({"summary": usage_summary(usage), "calls": usage.get("calls", [])}, f, indent=2)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+    if stopped is not None:
+        raise SystemExit(f"Run stopped: {stopped}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Hedged requests against slow tails.
+
+A few requests in every sweep take minutes on reasoning models while the rest
+finish in seconds. With hedging, a request still running after the model's
+latency percentile (p95 of the recent successful calls, by default) gets a
+duplicate; the first valid reply wins and the other call is cancelled.
+Hedges are capped per request and as a share of all requests, so a provider
+that is slow across the board is not sent twice the traffic. A hedge that
+finds no free rate-limit slot (HedgeSkipped) is dropped, never queued.
+"""
+import asyncio
+import time
+from collections import deque
+
+from fallacy.telemetry import percentile
+
+HEDGE_DEFAULTS = {
+    "percentile": 0.95,  # Hedge once a request runs longer than this share of recent calls
+    "min_samples": 20,  # No hedging until this many calls have completed
+    "max_hedges": 1,  # Extra copies per request
+    "budget": 0.1,  # Maximum share of requests that may be hedged
+    "window": 1000,  # Recent latencies kept per model
+}
+
+
+class HedgePolicy:
+    """Latency history, hedge budget and hedge statistics of one model."""
+
+    def __init__(self, name: str, percentile: float = 0.95, min_samples: int = 20, max_hedges: int = 1,
+                 budget: float = 0.1, window: int = 1000):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.budget = budget
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.hedged = 0  # Requests that got at least one hedge
+        self.hedges = 0  # Hedge calls sent
+        self.hedge_wins = 0  # Requests answered by a hedge
+        self.skipped = 0  # Hedges dropped for lack of rate-limit capacity
+        self.saved = 0.0  # Estimated seconds saved by hedge wins
+
+    def threshold(self):
+        """Seconds after which a request is hedged, or None while there is too little history."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return percentile(list(self.latencies), self.percentile)
+
+    def allow(self) -> bool:
+        return self.hedged < self.budget * max(self.requests, 1)
+
+    def estimate_saving(self, elapsed: float) -> float:
+        """
+        Expected remaining time of a call cancelled after elapsed seconds: mean
+        of the recorded latencies above elapsed, minus elapsed (0 without any).
+        Cancelled calls never report their latency, so this errs low.
+        """
+        slower = [latency for latency in self.latencies if latency > elapsed]
+        return sum(slower) / len(slower) - elapsed if slower else 0.0
+
+    def stats(self) -> dict:
+        threshold = self.threshold()
+        return {
+            "model": self.name,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 3) if self.requests else 0.0,
+            "hedges_sent": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.skipped,
+            "latency_saved_estimate": round(self.saved, 1),
+            "threshold": round(threshold, 3) if threshold is not None else None,
+        }
+
+
+class HedgeSkipped(Exception):
+    """Raised by a hedge call that found no capacity for an extra request."""
+
+
+def make_policy(name: str, **overrides) -> HedgePolicy:
+    options = dict(HEDGE_DEFAULTS)
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return HedgePolicy(name, **options)
+
+
+async def hedged(send, policy: HedgePolicy, validate=None, send_hedge=None) -> str:
+    """
+    Run send() (a zero-argument coroutine function returning the reply text)
+    under the hedging policy. Hedges use send_hedge instead when given, which
+    may raise HedgeSkipped to drop the hedge. The first reply accepted by
+    validate wins and the other calls are cancelled; when every call fails,
+    the last error is raised, and when none is valid, the last reply is returned.
+    """
+    policy.requests += 1
+    start = time.monotonic()
+
+    async def timed(call):
+        call_start = time.monotonic()
+        text = await call()
+        policy.latencies.append(time.monotonic() - call_start)
+        return text
+
+    primary = asyncio.create_task(timed(send))
+    tasks = {primary}
+    hedges = 0
+    last_text, last_error = None, None
+    try:
+        while tasks:
+            timeout = None
+            threshold = policy.threshold()
+            if hedges < policy.max_hedges and threshold is not None:
+                timeout = max(0.0, start + threshold * (hedges + 1) - time.monotonic())
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if policy.allow() or hedges:
+                    if not hedges:
+                        policy.hedged += 1
+                    hedges += 1
+                    policy.hedges += 1
+                    tasks.add(asyncio.create_task(timed(send_hedge or send)))
+                else:
+                    hedges = policy.max_hedges  # Out of budget: just wait for the calls already sent
+                continue
+            for task in done:
+                tasks.discard(task)
+                if isinstance(task.exception(), HedgeSkipped):
+                    # No capacity: take the hedge back and just wait for the primary
+                    hedges -= 1
+                    policy.hedges -= 1
+                    if not hedges:
+                        policy.hedged -= 1
+                    policy.skipped += 1
+                    hedges = policy.max_hedges
+                    continue
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    continue
+                last_text = task.result()
+                if validate is None or validate(last_text):
+                    if task is not primary:
+                        policy.hedge_wins += 1
+                        policy.saved += policy.estimate_saving(time.monotonic() - start)
+                    return last_text
+    finally:
+        for task in tasks:
+            task.cancel()
+    if last_text is not None:
+        return last_text
+    raise last_error
+
+
+def add_hedge_arguments(parser):
+    parser.add_argument("--hedge", action="store_true", help="Send a duplicate of requests slower than the "
+                                                             "model's latency percentile; the first reply wins")
+    parser.add_argument("--hedge-percentile", type=float, default=None,
+                        help=f"Latency percentile that triggers a hedge (default {HEDGE_DEFAULTS['percentile']})")
+    parser.add_argument("--hedge-budget", type=float, default=None,
+                        help=f"Maximum share of requests hedged (default {HEDGE_DEFAULTS['budget']})")
+
+
+def hedge_options(args) -> dict:
+    """Policy overrides from the command line, or None when hedging is off."""
+    if not args.hedge:
+        return None
+    return {"percentile": args.hedge_percentile, "budget": args.hedge_budget}
@@ -2,8 +2,9 @@ import asyncio
 import csv
 import json
 from collections import OrderedDict
-from openai import OpenAI
 from evaluation.reddit_sicne_scores import MAX_RETRIES
+from fallacy.clients import make_sdk_client
+from fallacy.storage import write_json
 
 # Configuration
 API_KEY = ""  # Fill in your API key
@@ -15,7 +16,7 @@ MAX_RETRIES = MAX_RETRIES
 CONCURRENCY_LIMIT = 5  # Limit number of concurrent requests
 
 # Initialize OpenAI client
-client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+client = make_sdk_client("openai", API_KEY, BASE_URL, sync=True)
 semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
 
 def extract_json(raw_text: str) -> dict:
@@ -120,8 +121,7 @@ async def main():
         new_results.append(new_dict)
 
     # Write output to JSON
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(new_results, f, ensure_ascii=False, indent=2)
+    write_json(OUTPUT_FILE, new_results)
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -1,16 +1,92 @@
-import os
-import subprocess
-
-def run_fallacy_scripts():
-    for root, dirs, files in os.walk('.'):
-        for filename in files:
-            if filename.startswith("fallacy_") and filename.endswith(".py"):
-                file_path = os.path.join(root, filename)
-                print(f"Running: {file_path}")
-                try:
-                    subprocess.run(["python", file_path], check=True)
-                except subprocess.CalledProcessError as e:
-                    print(f"Error while running {file_path}: {e}")
+"""
+Run the fallacy evaluation for a whole models x datasets matrix.
+
+All cells run concurrently in one event loop; requests to the same provider
+share one adaptive rate controller, so total wall time approaches that of
+the slowest single model instead of the sum of all runs.
+"""
+import argparse
+import asyncio
+from collections import Counter
+
+from fallacy.cache import add_cache_arguments, open_cache
+from fallacy.clients import connection_report
+from fallacy.engine import evaluate
+from fallacy.hedging import add_hedge_arguments, hedge_options, make_policy
+from fallacy.parsing import parse_summary
+from fallacy.progress import SweepProgress
+from fallacy.registry import DATASETS, MODELS
+from fallacy.streaming import add_stream_arguments
+from fallacy.telemetry import Telemetry, add_telemetry_arguments
+
+
+async def run_cell(name, dataset, progress, **kwargs):
+    """Evaluate one model on one dataset, recording a failure instead of raising."""
+    cell = progress.cell(name, dataset)
+    try:
+        await evaluate(name, dataset, progress=cell, **kwargs)
+    except Exception as e:
+        cell.error = str(e)
+        print(f"Error while running {name} on {dataset}: {e}")
+
+
+async def run_all(models, datasets, resume=False, cache=None, refresh=2.0, telemetry=None, hedge=None,
+                  stream=False, early_stop=False):
+    """
+    Evaluate every requested model on every requested dataset concurrently.
+    hedge holds hedging policy options, or None to disable hedging.
+    """
+    controllers = {}  # One rate controller per provider, shared by all runs
+    # One hedging policy per model, so its latency percentile covers all datasets
+    policies = {name: make_policy(name, **hedge) for name in models} if hedge is not None else {}
+    progress = SweepProgress()
+    for dataset in datasets:
+        for name in models:
+            progress.cell(name, dataset)
+
+    display = asyncio.create_task(progress.display(refresh))
+    try:
+        await asyncio.gather(*(run_cell(name, dataset, progress, resume=resume, cache=cache,
+                                        controllers=controllers, telemetry=telemetry, hedge=policies.get(name),
+                                        stream=stream, early_stop=early_stop)
+                               for dataset in datasets for name in models))
+    finally:
+        display.cancel()
+    print(progress.render())
+    for controller in controllers.values():
+        print(f"Rate control: {controller.stats()}")
+    for policy in policies.values():
+        print(f"Hedging: {policy.stats()}")
+    for name in models:
+        parse_stats = Counter()
+        for dataset in datasets:
+            parse_stats.update(progress.cell(name, dataset).parse)
+        print(f"Parsing {name}: {parse_summary(parse_stats)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fallacy evaluation for all registered models.")
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=sorted(MODELS))
+    parser.add_argument("--datasets", nargs="+", default=["SmartyPat"], choices=sorted(DATASETS))
+    parser.add_argument("--resume", action="store_true", help="Continue interrupted runs from their checkpoints")
+    parser.add_argument("--refresh", type=float, default=2.0, help="Seconds between progress updates")
+    add_cache_arguments(parser)
+    add_telemetry_arguments(parser)
+    add_hedge_arguments(parser)
+    add_stream_arguments(parser)
+    args = parser.parse_args()
+    cache = open_cache(args)
+    telemetry = Telemetry()
+    asyncio.run(run_all(args.models, args.datasets, args.resume, cache, args.refresh, telemetry,
+                        hedge_options(args), args.stream, args.early_stop))
+    report = telemetry.report()
+    print(f"Estimated cost: {report['total_cost_usd']} USD")
+    print(f"Connections: {connection_report()}")
+    if args.telemetry:
+        print(f"Telemetry written to {', '.join(telemetry.write(args.telemetry))}")
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+
 
 if __name__ == "__main__":
-    run_fallacy_scripts()
+    main()
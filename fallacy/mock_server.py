@@ -0,0 +1,434 @@
+"""
+Offline mock of the OpenAI and Anthropic APIs for testing and benchmarking.
+
+Answers chat completions (/v1/chat/completions) and messages (/v1/messages)
+from the recorded results in res/<dataset>/<model>.json, matched by sentence,
+so any runner can be pointed at it through its base URL and exercised
+without network access or cost. Single-sentence, packed, screening and
+judge prompts are recognised. Sentences that were never recorded get a
+recorded verdict chosen by a hash of the sentence. Judge scores come from a
+hash of the sentence, and each judge model moves a fixed share of them by one
+point, so multi-judge runs (evaluation/ensemble.py) see disagreements.
+
+A fault profile sets the latency distribution and the share of replies that
+are rate limited (429 with Retry-After), fail with a 5xx error, come back as
+truncated JSON or are wrapped in a Markdown fence. Every random choice is
+drawn from a generator seeded with (--seed, sentence, attempt number), so a
+run sees the same faults on the same sentences whatever the request order.
+Requests with "stream": true are answered as server-sent events, so
+streaming and early stopping (fallacy/streaming.py) can be exercised too.
+The server runs on one asyncio event loop with keep-alive connections, so
+it sustains thousands of requests per second for the benchmarks in
+fallacy/bench.py.
+
+Usage (from the repository root):
+    python -m fallacy.mock_server --port 8900 --profile realistic
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:8900 \\
+        python -m fallacy.engine --model gpt-4o --no-cache
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import math
+import os
+import random
+import re
+from collections import Counter
+
+from fallacy.batch_server import anthropic_message, chat_completion
+from fallacy.registry import MODELS, RES_DIR
+
+# Fault profiles. Latencies are in seconds: "latency" is the median of a
+# log-normal distribution with shape "sigma" (0 gives a fixed latency), and
+# "tail_rate" of the replies take "tail_latency" times longer.
+PROFILES = {
+    "clean": {
+        "latency": 0.0, "sigma": 0.0, "tail_rate": 0.0, "tail_latency": 1.0,
+        "rate_limit_rate": 0.0, "retry_after": 1.0, "server_error_rate": 0.0,
+        "truncate_rate": 0.0, "fence_rate": 0.0,
+    },
+    "realistic": {
+        "latency": 1.5, "sigma": 0.5, "tail_rate": 0.02, "tail_latency": 10.0,
+        "rate_limit_rate": 0.02, "retry_after": 1.0, "server_error_rate": 0.01,
+        "truncate_rate": 0.01, "fence_rate": 0.2,
+    },
+    "slow_tail": {
+        "latency": 1.0, "sigma": 0.3, "tail_rate": 0.05, "tail_latency": 30.0,
+        "rate_limit_rate": 0.0, "retry_after": 1.0, "server_error_rate": 0.0,
+        "truncate_rate": 0.0, "fence_rate": 0.0,
+    },
+    "flaky": {
+        "latency": 0.5, "sigma": 0.5, "tail_rate": 0.01, "tail_latency": 10.0,
+        "rate_limit_rate": 0.1, "retry_after": 2.0, "server_error_rate": 0.1,
+        "truncate_rate": 0.05, "fence_rate": 0.3,
+    },
+}
+
+SERVER_ERRORS = (500, 502, 503)
+CHARS_PER_TOKEN = 4
+PACKED_ITEM = re.compile(r"^\[(\d+)\] (.*)$", re.M)
+SINGLE_ITEM = re.compile(r"Judging this element:\n(.*?)\nPlease return", re.S)
+JUDGE_ITEM = re.compile(r'^Sentence: "(.*)"\nLabel: "(.*?)"\nDefinition:', re.S)
+STREAM_CHUNK_CHARS = 16  # Characters per streamed text delta
+FIRST_TOKEN_SHARE = 0.3  # Share of a streamed reply's latency spent before the first token
+JUDGE_DISAGREE_RATE = 0.15  # Share of judge scores a model moves one point away from the common score
+
+
+def normalize(sentence: str) -> str:
+    """Matching key: models often echo the sentence with other quotes or spacing."""
+    return " ".join(re.findall(r"[a-z0-9]+", str(sentence).lower()))
+
+
+def load_recordings(res_dir: str = RES_DIR) -> dict:
+    """{result file name: {normalized sentence: record}} for every res/<dataset>/<model>.json."""
+    recordings = {}
+    for path in sorted(glob.glob(os.path.join(res_dir, "*", "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            try:
+                records = json.load(f)
+            except ValueError:
+                continue
+        if not isinstance(records, list):
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        table = recordings.setdefault(name, {})
+        for record in records:
+            if isinstance(record, dict) and record.get("sentence") and "error" not in record:
+                table.setdefault(normalize(record["sentence"]), record)
+    return recordings
+
+
+def recording_name(request: dict, recordings: dict, default: str = None) -> str:
+    """Result file to answer from: the registry entry for the request's model, thinking variant included."""
+    if default in recordings:
+        return default
+    model = request.get("model", "")
+    thinking = bool(request.get("thinking"))
+    names = [name for name, entry in MODELS.items()
+             if entry["model"] == model and bool(entry.get("thinking_budget")) == thinking]
+    for name in names + [model]:
+        if name in recordings:
+            return name
+    return next(iter(recordings), None)
+
+
+def user_text(request: dict) -> str:
+    """Text of the last user message."""
+    for message in reversed(request.get("messages", [])):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "\n".join(block.get("text", "") for block in content if isinstance(block, dict))
+        return content
+    return ""
+
+
+def prompt_chars(api: str, request: dict) -> tuple:
+    """(characters of the system prompt, characters of the whole prompt)."""
+    system = request.get("system", "") if api == "anthropic" else ""
+    if isinstance(system, list):
+        system = "".join(block.get("text", "") for block in system)
+    total = len(system)
+    for message in request.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(block.get("text", "") for block in content if isinstance(block, dict))
+        if api == "openai" and message.get("role") == "system":
+            system = content
+        total += len(content)
+    return len(system), total
+
+
+def sample_latency(profile: dict, rng: random.Random) -> float:
+    latency = profile["latency"]
+    if latency and profile["sigma"]:
+        latency = math.exp(rng.gauss(math.log(latency), profile["sigma"]))
+    if rng.random() < profile["tail_rate"]:
+        latency *= profile["tail_latency"]
+    return latency
+
+
+class MockModel:
+    """Recordings, fault profile and counters shared by all connections."""
+
+    def __init__(self, profile: dict, seed: int = 0, recordings: dict = None, model: str = None,
+                 time_scale: float = 1.0):
+        self.profile = profile
+        self.seed = seed
+        self.recordings = load_recordings() if recordings is None else recordings
+        self.model = model
+        self.time_scale = time_scale
+        self.attempts = Counter()
+        self.prefixes = set()
+        self.stats = Counter()
+
+    def rng(self, key: str) -> random.Random:
+        """Generator for one attempt at one prompt; the n-th attempt at a prompt always draws the same values."""
+        self.attempts[key] += 1
+        attempt = self.attempts[key]
+        digest = hashlib.sha256(f"{self.seed}\0{key}\0{attempt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def record(self, name: str, sentence: str) -> dict:
+        """Recorded result for a sentence, or one picked by its hash when it was never recorded."""
+        table = self.recordings.get(name) or {}
+        record = table.get(normalize(sentence))
+        if record is None and table:
+            self.stats["unrecorded"] += 1
+            digest = int(hashlib.sha256(normalize(sentence).encode("utf-8")).hexdigest()[:8], 16)
+            record = list(table.values())[digest % len(table)]
+        if record is None:
+            return {"logic_error": "no", "logic_fallacies": [], "details": "No recording available."}
+        return {"logic_error": record.get("logic_error"), "logic_fallacies": record.get("logic_fallacies"),
+                "details": record.get("details", "")}
+
+    def reply(self, api: str, request: dict) -> str:
+        """Reply text for a request, before any fault is applied."""
+        name = recording_name(request, self.recordings, self.model)
+        text = user_text(request)
+        judged = JUDGE_ITEM.search(text)
+        if judged:
+            sentence, label = judged.groups()
+            digest = int(hashlib.sha256(normalize(sentence).encode("utf-8")).hexdigest()[:8], 16)
+            score = digest % 4
+            judge = hashlib.sha256(f"{request.get('model')}\0{normalize(sentence)}".encode("utf-8")).hexdigest()
+            if int(judge[:8], 16) / 0xFFFFFFFF < JUDGE_DISAGREE_RATE:
+                score = score + 1 if score < 3 else score - 1
+            return json.dumps({"sentence": sentence, "label": label, "score": score,
+                               "explanation": "Scored by the mock server."})
+        packed = PACKED_ITEM.findall(text)
+        if packed:
+            return json.dumps([{"id": int(idx), **self.record(name, sentence)} for idx, sentence in packed],
+                              ensure_ascii=False)
+        single = SINGLE_ITEM.search(text)
+        sentence = single.group(1).strip() if single else text.strip()
+        if "logic_fallacies" not in text:
+            # Yes/no screening prompt (fallacy/screening.py)
+            return json.dumps({"logic_error": self.record(name, sentence)["logic_error"]})
+        return json.dumps({"sentence": sentence, **self.record(name, sentence)}, ensure_ascii=False)
+
+    def usage(self, api: str, request: dict, text: str) -> dict:
+        """Token counts estimated from prompt length; a repeated system prompt counts as cached."""
+        system_chars, total_chars = prompt_chars(api, request)
+        input_tokens, output_tokens = total_chars // CHARS_PER_TOKEN, len(text) // CHARS_PER_TOKEN
+        system_tokens = system_chars // CHARS_PER_TOKEN
+        prefix = hashlib.sha256(json.dumps([request.get("model"), request.get("system"),
+                                            request.get("messages", [])[:1]]).encode("utf-8")).hexdigest()
+        seen = prefix in self.prefixes
+        self.prefixes.add(prefix)
+        if api == "anthropic":
+            marked = "cache_control" in json.dumps(request.get("system", ""))
+            read = system_tokens if marked and seen else 0
+            written = system_tokens if marked and not seen else 0
+            return {"input_tokens": input_tokens - read - written, "output_tokens": output_tokens,
+                    "cache_read_input_tokens": read, "cache_creation_input_tokens": written}
+        cached = system_tokens if seen and system_tokens >= 1024 else 0
+        return {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached}}
+
+    def answer(self, api: str, request: dict) -> tuple:
+        """
+        (HTTP status, extra headers, response body, latency in seconds) for one
+        API call, faults included; the caller waits out the latency.
+        """
+        text = self.reply(api, request)
+        rng = self.rng(user_text(request))
+        profile = self.profile
+        latency = sample_latency(profile, rng) * self.time_scale
+        draw = rng.random()
+        self.stats["requests"] += 1
+        if draw < profile["rate_limit_rate"]:
+            self.stats["rate_limited"] += 1
+            status = 429 if api == "openai" or rng.random() < 0.5 else 529
+            error_type = "rate_limit_error" if status == 429 else "overloaded_error"
+            return status, {"retry-after": str(profile["retry_after"])}, error_body(api, error_type,
+                                                                                  "Mock rate limit"), latency
+        draw -= profile["rate_limit_rate"]
+        if draw < profile["server_error_rate"]:
+            self.stats["server_errors"] += 1
+            return rng.choice(SERVER_ERRORS), {}, error_body(api, "api_error", "Mock server error"), latency
+        draw -= profile["server_error_rate"]
+        if draw < profile["truncate_rate"]:
+            self.stats["truncated"] += 1
+            text = text[:int(len(text) * rng.uniform(0.3, 0.9))]
+        elif draw - profile["truncate_rate"] < profile["fence_rate"]:
+            self.stats["fenced"] += 1
+            text = f"```json\n{text}\n```"
+        if api == "anthropic":
+            body = anthropic_message(request, text)
+        else:
+            body = chat_completion(request, text)
+        body["usage"] = self.usage(api, request, text)
+        return 200, {}, body, latency
+
+
+def stream_events(api: str, body: dict) -> list:
+    """Server-sent events (event name, data) delivering a finished response body in small text deltas."""
+    if api == "anthropic":
+        text = body["content"][0]["text"]
+        start = dict(body, content=[], stop_reason=None,
+                     usage=dict(body["usage"], output_tokens=1))
+        events = [("message_start", {"type": "message_start", "message": start}),
+                  ("content_block_start", {"type": "content_block_start", "index": 0,
+                                           "content_block": {"type": "text", "text": ""}})]
+        events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                            "delta": {"type": "text_delta", "text": text[i:i + STREAM_CHUNK_CHARS]}})
+                   for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+        events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                   ("message_delta", {"type": "message_delta",
+                                      "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                      "usage": {"output_tokens": body["usage"]["output_tokens"]}}),
+                   ("message_stop", {"type": "message_stop"})]
+        return events
+    text = body["choices"][0]["message"]["content"]
+    chunk = {key: body[key] for key in ("id", "created", "model")}
+    chunk["object"] = "chat.completion.chunk"
+    events = [(None, dict(chunk, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                           "finish_reason": None}]))]
+    events += [(None, dict(chunk, choices=[{"index": 0, "delta": {"content": text[i:i + STREAM_CHUNK_CHARS]},
+                                            "finish_reason": None}]))
+               for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+    events += [(None, dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])),
+               (None, dict(chunk, choices=[], usage=body["usage"]))]
+    return events
+
+
+def error_body(api: str, error_type: str, message: str) -> dict:
+    if api == "anthropic":
+        return {"type": "error", "error": {"type": error_type, "message": message}}
+    return {"error": {"type": error_type, "message": message, "code": None}}
+
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+                500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable", 529: "Overloaded"}
+API_PATHS = {"/v1/chat/completions": "openai", "/chat/completions": "openai", "/v1/messages": "anthropic"}
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """(method, path, headers, body) of the next request on a connection, or None once it is closed."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target = request_line.decode("latin-1").split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return method, target.split("?")[0].rstrip("/"), headers, body
+
+
+def http_response(status: int, body: dict, headers: dict = None) -> bytes:
+    payload = json.dumps(body).encode("utf-8")
+    lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Error')}", "Content-Type: application/json",
+             f"Content-Length: {len(payload)}"]
+    lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload
+
+
+async def stream_response(writer: asyncio.StreamWriter, api: str, body: dict, latency: float):
+    """
+    Send body as server-sent events: the first token after FIRST_TOKEN_SHARE
+    of the latency, the rest spread over the remaining deltas. The connection
+    is closed afterwards, as there is no Content-Length.
+    """
+    events = stream_events(api, body)
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+    await asyncio.sleep(latency * FIRST_TOKEN_SHARE)
+    for name, data in events:
+        writer.write(((f"event: {name}\n" if name else "") + f"data: {json.dumps(data)}\n\n").encode("utf-8"))
+        await writer.drain()
+        await asyncio.sleep(latency * (1 - FIRST_TOKEN_SHARE) / len(events))
+    if api == "openai":
+        writer.write(b"data: [DONE]\n\n")
+    await writer.drain()
+
+
+def make_connection_handler(mock: MockModel):
+    """
+    Connection handler for asyncio.start_server: a minimal HTTP/1.1 server
+    with keep-alive. One event loop serves every connection, so the mock
+    itself does not become the bottleneck of a benchmark.
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if method == "POST" and path in API_PATHS:
+                    api = API_PATHS[path]
+                    request = json.loads(body)
+                    status, extra, response, latency = mock.answer(api, request)
+                    if request.get("stream") and status == 200:
+                        try:
+                            await stream_response(writer, api, response, latency)
+                        except ConnectionError:
+                            mock.stats["streams_closed_early"] += 1  # The client stopped reading
+                        break
+                    await asyncio.sleep(latency)
+                    writer.write(http_response(status, response, extra))
+                elif method == "GET" and path == "/mock/stats":
+                    writer.write(http_response(200, dict(mock.stats)))
+                else:
+                    writer.write(http_response(404, {"error": {"type": "not_found_error",
+                                                                 "message": f"No route for {path}"}}))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+def make_mock(profile: str = "realistic", seed: int = 0, model: str = None, time_scale: float = 1.0,
+              **overrides) -> MockModel:
+    """A MockModel for a named profile; overrides replace profile fields."""
+    settings = dict(PROFILES[profile])
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return MockModel(settings, seed, model=model, time_scale=time_scale)
+
+
+async def serve(mock: MockModel, host: str = "127.0.0.1", port: int = 8900):
+    """Start serving mock on host:port; returns the asyncio server."""
+    return await asyncio.start_server(make_connection_handler(mock), host, port, backlog=1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock of the OpenAI and Anthropic APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--profile", default="realistic", choices=sorted(PROFILES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default=None, help="Answer every request from this result file "
+                                                      "(default: the file of the requested model)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply every latency by this factor")
+    for field, value in PROFILES["clean"].items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=None,
+                            help=f"Override the profile's {field}")
+    args = parser.parse_args()
+    overrides = {field: getattr(args, field) for field in PROFILES["clean"]}
+    mock = make_mock(args.profile, args.seed, args.model, args.time_scale, **overrides)
+
+    async def run():
+        server = await serve(mock, args.host, args.port)
+        print(f"Mock API server ({args.profile}, {sum(map(len, mock.recordings.values()))} recordings) "
+              f"listening on http://{args.host}:{args.port}")
+        await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
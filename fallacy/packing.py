@@ -0,0 +1,69 @@
+"""
+Multi-sentence request packing.
+
+Every single-sentence request repeats the long system prompt with all 14
+fallacy definitions. In packing mode N sentences share one request and the
+model answers with a JSON array keyed by sentence id; items that come back
+missing or malformed are re-asked one sentence at a time by the engine.
+"""
+from fallacy.parsing import extract_json, validate_result
+
+PACKED_TOKENS_PER_ITEM = 400  # Output budget per packed sentence
+
+
+def build_packed_prompt(items: list) -> str:
+    """
+    Build the user prompt for several sentences; items is a list of (id, sentence).
+    """
+    elements = "\n".join(f"[{idx}] {sentence}" for idx, sentence in items)
+    return f"""
+Judging each of these elements independently:
+{elements}
+Please return the result as a JSON array with one object per element, in the following format:
+[
+  {{
+    "id": "The number of the element, as given in brackets",
+    "logic_error": "Findings of the judgement, only lowercase yes or no",
+    "logic_fallacies": "Select all the closest categorisations and rank them in order of closeness.",
+    "details": "explicit explanation"
+  }}
+].
+"""
+
+
+def parse_packed(text: str, ids: list) -> dict:
+    """
+    Split a packed reply into {id: result} for the requested ids; items are
+    validated like single replies, and missing, duplicated or invalid ones are
+    simply left out.
+    """
+    data = extract_json(text, accept=is_packed_value) if text else None
+    if data is None:
+        return {}
+    if isinstance(data, dict):
+        data = data.get("results", [data])
+    wanted = set(ids)
+    results = {}
+    for item in data:
+        result = validate_result(item)
+        if result is None:
+            continue
+        try:
+            idx = int(str(result.pop("id", "")).strip("[] "))
+        except ValueError:
+            continue
+        if idx in wanted and idx not in results:
+            results[idx] = result
+    return results
+
+
+def is_packed_value(data) -> bool:
+    """An array of objects, an object wrapping one under "results", or a lone item object."""
+    if isinstance(data, dict):
+        data = data.get("results", [data])
+    return isinstance(data, list) and any(isinstance(item, dict) for item in data)
+
+
+def is_packed_reply(text: str) -> bool:
+    """Cache only replies that contain a packed array."""
+    return extract_json(text, accept=is_packed_value) is not None
@@ -0,0 +1,251 @@
+"""
+Parsing of model replies into result records.
+
+Replies often wrap the JSON verdict in prose, Markdown fences or reasoning
+text, use single quotes, leave trailing commas or are cut off mid-object.
+extract_json finds the first balanced JSON value in the text and repairs
+those defects; parse_reply then checks the verdict against the result schema
+and normalises it, so a paid retry is only spent on replies that carry no
+usable verdict at all.
+"""
+import ast
+import difflib
+import json
+import re
+
+from fallacy.prompts import FALLACY_TYPES
+
+KNOWN_FALLACIES = [name.lower() for name in FALLACY_TYPES]
+NO_FALLACY = re.compile(r"^(\[\]|none|n/?a|no(ne)? (logical )?(fallac(y|ies)|errors?)|not applicable)\b")
+LABEL_MATCH_CUTOFF = 0.85  # Minimum difflib ratio for a misspelt label to count as a known fallacy
+
+# Outcomes of parse_reply, in the order they are reported
+PARSE_OUTCOMES = ("clean", "repaired", "invalid", "unparseable")
+
+FENCE = re.compile(r"```[a-zA-Z]*")
+THINKING = re.compile(r"<think(ing)?>.*?</think(ing)?>", re.S)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+JSON_LITERALS = re.compile(r"(?<=[:\[,\s])(true|false|null)(?=\s*[,}\]])")
+PYTHON_LITERALS = {"true": "True", "false": "False", "null": "None"}
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+# Fields of a streamed reply, matched only once their value is complete
+VERDICT_FIELD = re.compile(r'"logic_error"\s*:\s*"([^"]*)"')
+FALLACIES_FIELD = re.compile(r'"logic_fallacies"\s*:\s*(\[[^\]]*\]|"(?:[^"\\]|\\.)*")')
+DETAILS_FIELD = re.compile(r'"details"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+
+def balanced_candidates(text: str):
+    """
+    Yield every substring that starts at '{' or '[' and ends at its matching
+    bracket, skipping brackets inside strings. An unclosed value at the end of
+    the text is yielded with the missing closers appended, and once more cut
+    back to its last complete member.
+    """
+    for start, char in enumerate(text):
+        if char not in "{[":
+            continue
+        stack, quote, escaped = [], None, False
+        last_member = None  # Text and closers up to the last complete member, for truncated replies
+        for end in range(start, len(text)):
+            c = text[end]
+            if quote:
+                if escaped:
+                    escaped = False
+                elif c == "\\":
+                    escaped = True
+                elif c == quote:
+                    quote = None
+            elif c in "\"'" and (c == '"' or text[end - 1] in "{[,: \n"):
+                quote = c
+            elif c == ",":
+                last_member = text[start:end] + "".join(reversed(stack))
+            elif c in "{[":
+                stack.append("}" if c == "{" else "]")
+            elif c in "}]":
+                if not stack or stack.pop() != c:
+                    break
+                if not stack:
+                    yield text[start:end + 1]
+                    break
+        else:
+            # Truncated reply: close the open string and brackets
+            yield text[start:] + (quote or "") + "".join(reversed(stack))
+            if last_member:
+                yield last_member
+
+
+def repair(candidate: str):
+    """Parse a JSON-like candidate, fixing trailing commas, single quotes and Python literals."""
+    try:
+        return json.loads(candidate, strict=False)
+    except ValueError:
+        pass
+    fixed = TRAILING_COMMA.sub(r"\1", candidate)
+    try:
+        return json.loads(fixed, strict=False)
+    except ValueError:
+        pass
+    try:
+        value = ast.literal_eval(JSON_LITERALS.sub(lambda m: PYTHON_LITERALS[m.group(0)], fixed))
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+    return value if isinstance(value, (dict, list)) else None
+
+
+def extract_json(raw_text: str, accept=None):
+    """
+    Extract JSON content from response, handling Markdown formatting issues,
+    surrounding prose, reasoning text and common syntax defects. Returns the
+    first object or array for which accept(value) is true (any, by default),
+    or None when there is none.
+    """
+    accept = accept or (lambda value: isinstance(value, (dict, list)))
+    if not raw_text:
+        return None
+    text = raw_text.strip()
+    try:
+        value = json.loads(FENCE.sub("", text).strip())
+        if accept(value):
+            return value
+    except ValueError:
+        pass
+    text = THINKING.sub("", text)
+    # Curly quotes are only replaced when the text does not parse as it is:
+    # inside a JSON string (quoting the sentence in details) they are valid
+    for variant in dict.fromkeys((text, text.translate(SMART_QUOTES))):
+        for candidate in balanced_candidates(variant):
+            value = repair(candidate)
+            if value is not None and accept(value):
+                return value
+    return None
+
+
+def normalize_fallacy(label):
+    """Map a model's label ("2. False cause fallacy", "false-premise") to a known fallacy name, or None."""
+    name = re.sub(r"^\s*(\d+[.)]|[-*])\s*", "", str(label)).strip().lower()
+    aside = re.search(r"\((.*)\)\s*$", name)
+    name = re.sub(r"\s*\(.*\)\s*$", "", name).replace("-", " ").replace("_", " ").strip(" .\"'")
+    if name in KNOWN_FALLACIES:
+        return name
+    if name.endswith(" fallacy") and name[:-len(" fallacy")] in KNOWN_FALLACIES:
+        return name[:-len(" fallacy")]
+    prefixed = [known for known in KNOWN_FALLACIES if len(name) >= 8 and known.startswith(name)]
+    if len(prefixed) == 1:
+        return prefixed[0]  # "Improper Distribution" for "improper distribution or addition"
+    close = difflib.get_close_matches(name, KNOWN_FALLACIES, n=1, cutoff=LABEL_MATCH_CUTOFF)
+    if close:
+        return close[0]
+    # "Personification (Nominal Fallacy)": the known name is given as an aside
+    return normalize_fallacy(aside.group(1)) if aside else None
+
+
+def validate_result(data):
+    """
+    Check a parsed verdict against the result schema and normalise it:
+    logic_error is "yes" or "no", logic_fallacies a ranked list of known
+    fallacy names and details a string. Labels that match no known fallacy
+    are kept in unknown_fallacies. Returns None when the verdict is unusable
+    (no yes/no, or "yes" without any known fallacy).
+    """
+    if not isinstance(data, dict):
+        return None
+    verdict = data.get("logic_error")
+    if isinstance(verdict, bool):
+        verdict = "yes" if verdict else "no"
+    verdict = str(verdict).strip().lower().rstrip(".")
+    if verdict not in ("yes", "no"):
+        return None
+
+    labels = data.get("logic_fallacies") or []
+    if isinstance(labels, str):
+        labels = re.split(r"[,;>\n]|\s\d+[.)]\s", labels)
+    elif not isinstance(labels, list):
+        labels = [labels]
+    fallacies, unknown = [], []
+    for label in labels:
+        if isinstance(label, dict):
+            label = label.get("name") or label.get("fallacy") or label.get("type") or ""
+        if not str(label).strip() or NO_FALLACY.match(str(label).strip().lower()):
+            continue
+        name = normalize_fallacy(label)
+        if name is None:
+            unknown.append(str(label).strip())
+        elif name not in fallacies:
+            fallacies.append(name)
+    if verdict == "yes" and not fallacies:
+        return None
+
+    details = data.get("details", "")
+    result = dict(data)
+    result["logic_error"] = verdict
+    result["logic_fallacies"] = fallacies
+    result["details"] = details if isinstance(details, str) else json.dumps(details, ensure_ascii=False)
+    if unknown:
+        result["unknown_fallacies"] = unknown
+    return result
+
+
+def parse_reply(raw_text: str) -> tuple:
+    """
+    Parse and validate a single-sentence reply. Returns (result, outcome)
+    where outcome is one of PARSE_OUTCOMES and result is None unless the
+    reply was clean or repaired.
+    """
+    text = (raw_text or "").strip()
+    try:
+        clean = json.loads(FENCE.sub("", text).strip())
+    except ValueError:
+        clean = None
+    data = clean if isinstance(clean, dict) else extract_json(text, accept=lambda value: isinstance(value, dict))
+    if data is None:
+        return None, "unparseable"
+    result = validate_result(data)
+    if result is None:
+        return None, "invalid"
+    return result, "clean" if data is clean else "repaired"
+
+
+def partial_verdict(text: str):
+    """
+    The validated verdict of a reply that is still streaming, once its
+    logic_error and logic_fallacies values are both complete; None until then.
+    details is whatever part of it has arrived.
+    """
+    text = THINKING.sub("", text)
+    if re.search(r"<think(ing)?>", text):
+        return None  # Still reasoning
+    verdict, labels = VERDICT_FIELD.search(text), FALLACIES_FIELD.search(text)
+    if not verdict or not labels:
+        return None
+    try:
+        fallacies = json.loads(labels.group(1), strict=False)
+    except ValueError:
+        return None
+    details = DETAILS_FIELD.search(text)
+    details = details.group(1).rstrip("\\") if details else ""
+    try:
+        details = json.loads(f'"{details}"', strict=False)
+    except ValueError:
+        pass
+    return validate_result({"logic_error": verdict.group(1), "logic_fallacies": fallacies, "details": details})
+
+
+def is_valid_reply(text: str) -> bool:
+    """Cache only replies that parse into a valid verdict."""
+    return parse_reply(text)[0] is not None
+
+
+def record_parse(stats: dict, outcome: str):
+    if stats is not None:
+        stats[outcome] = stats.get(outcome, 0) + 1
+
+
+def parse_summary(stats: dict) -> dict:
+    """Counts per outcome plus the share of replies that needed repair or were unusable."""
+    total = sum(stats.get(outcome, 0) for outcome in PARSE_OUTCOMES)
+    summary = {outcome: stats.get(outcome, 0) for outcome in PARSE_OUTCOMES}
+    summary["replies"] = total
+    if total:
+        summary["repair_rate"] = round(stats.get("repaired", 0) / total, 3)
+        summary["failure_rate"] = round((stats.get("invalid", 0) + stats.get("unparseable", 0)) / total, 3)
+    return summary
@@ -0,0 +1,94 @@
+"""
+Live progress of a models x datasets evaluation sweep.
+
+Each (model, dataset) cell counts done, failed and in-flight sentences; the
+table is redrawn periodically with an ETA derived from the overall rate.
+"""
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+
+
+class Cell:
+    """Counters for one model on one dataset."""
+
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.skipped = 0  # Already done in a resumed checkpoint
+        self.error = None  # Set when the whole run failed
+        self.parse = {}  # Reply parse outcomes, see fallacy.parsing.PARSE_OUTCOMES
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.skipped - self.done - self.failed)
+
+    def begin(self):
+        self.in_flight += 1
+
+    def finish(self, ok: bool):
+        self.in_flight -= 1
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+
+
+class SweepProgress:
+    """Progress table for every cell of a sweep."""
+
+    def __init__(self):
+        self.cells = OrderedDict()
+        self.started = time.monotonic()
+
+    def cell(self, model: str, dataset: str) -> Cell:
+        key = (model, dataset)
+        if key not in self.cells:
+            self.cells[key] = Cell()
+        return self.cells[key]
+
+    def eta(self, completed: int, remaining: int):
+        """Seconds left at the average rate so far, or None before the first completion."""
+        elapsed = time.monotonic() - self.started
+        if not completed or not elapsed:
+            return None
+        return remaining / (completed / elapsed)
+
+    def render(self) -> str:
+        lines = [f"{'Model':38} {'Dataset':22} {'Done':>6} {'Failed':>6} {'Flight':>6} {'Total':>6} {'ETA':>8}"]
+        completed = remaining = 0
+        for (model, dataset), cell in self.cells.items():
+            completed += cell.done + cell.failed
+            remaining += cell.remaining
+            if cell.error:
+                status = "error"
+            else:
+                status = format_seconds(self.eta(cell.done + cell.failed, cell.remaining))
+            lines.append(f"{model:38} {dataset:22} {cell.done + cell.skipped:>6} {cell.failed:>6} "
+                         f"{cell.in_flight:>6} {cell.total:>6} {status:>8}")
+        elapsed = time.monotonic() - self.started
+        lines.append(f"Elapsed {format_seconds(elapsed)}, {completed} completed, {remaining} remaining, "
+                     f"ETA {format_seconds(self.eta(completed, remaining))}")
+        return "\n".join(lines)
+
+    async def display(self, interval: float = 2.0, stream=sys.stdout):
+        """Redraw the table every interval seconds until cancelled."""
+        live = stream.isatty()
+        while True:
+            await asyncio.sleep(interval)
+            if live:
+                stream.write("\033[H\033[J")  # Redraw in place on a terminal
+            stream.write(self.render() + "\n")
+            stream.flush()
+
+
+def format_seconds(seconds) -> str:
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
@@ -0,0 +1,70 @@
+"""
+Prompt text shared by every fallacy evaluation model.
+
+The system prompt is kept byte-identical to the one the original per-model
+scripts sent, so results stay comparable with the files already in res/.
+"""
+
+# The 14 fallacy types, in the order used throughout the paper
+FALLACY_TYPES = [
+    "False dilemma", "Equivocation", "False Premise", "False Analogy", "Wrong Direction",
+    "Fallacy of composition", "Begging the question", "False Cause", "Inverse Error",
+    "Improper transposition", "Improper Distribution or Addition", "Contextomy",
+    "Nominal Fallacy", "Accident fallacy"
+]
+
+SYSTEM_PROMPT = (
+    "You're an expert in logic."
+    "Here's a categorisation of the 14 logic errors."
+    "Determine whether the given sentence has logical errors and deal with them as required. "
+    "False dilemma: The presentation of an issue as having only two possible outcomes, either right or wrong, without recognising that additional alternatives may exist."
+    "Equivocation: The misleading use of a word or phrase that has multiple meanings, creating ambiguity and leading to confusion in interpretation or reasoning."
+    "False Premise: The establishment of an argument based on an unfounded, non-existent, or unreasonable assumption, leading to flawed reasoning or invalid conclusions. "
+    "False Analogy: The assumption that if A and B share certain characteristics, then B must also possess other attributes of A, despite lacking a valid basis for this inference."
+    "Wrong Direction: The incorrect attribution of causality by reversing the cause-and-effect relationship, assuming the effect is the cause and the cause is the effect."
+    "Fallacy of composition: The mistaken assumption that what is true for a part of something must also be true for the whole, disregarding the possible differences between individual components and the entire entity."
+    "Begging the question: The use of a statement as both the premise and the conclusion, assuming the truth of what is to be proven instead of providing independent support. "
+    "False Cause: The incorrect assumption that a causal relationship exists between two events solely because one follows the other, failing to account for coincidence or other influencing factors."
+    "Inverse Error: The mistaken reasoning that if A implies B, then not A must imply not B, overlooking the possibility that B may still occur due to other factors."
+    "Improper transposition: The incorrect inference that if A implies B, then B must also imply A, failing to recognise that implication is not necessarily reversible."
+    "Improper Distribution or Addition: The erroneous reasoning that individual effects can be directly summed or distributed across a group without considering their actual impact or interaction."
+    "Contextomy: The act of selectively quoting or altering a statement, advertisement, or published material in a way that distorts its original meaning, often misrepresenting the intent of the original source. "
+    "Nominal Fallacy: The mistaken interpretation of a metaphorical or figurative expression as a literal statement, leading to a misunderstanding of its intended meaning. "
+    "Accident fallacy: The misapplication of a general rule to a specific case where exceptions should be considered, treating the rule as absolute without regard for context or relevant circumstances."
+)
+
+
+def build_prompt(sentence: str) -> str:
+    """
+    Build the user prompt asking for a JSON verdict on a single sentence.
+    """
+    return f"""
+Judging this element:
+{sentence}
+Please return the result in JSON format as follows:
+{{
+  "sentence": "Sentence given",
+  "logic_error": "Findings of the judgement, only lowercase yes or no",
+  "logic_fallacies": "Select all the closest categorisations and rank them in order of closeness.",
+  "details": "explicit explanation"
+}}.
+"""
+
+# Stage one of fallacy/screening.py: the short prompt of fallacy/llama/logic_llama3_1.py,
+# with no taxonomy and a one-field reply so that a tiny output budget suffices
+SCREEN_SYSTEM_PROMPT = (
+    "You're an expert in logic. Sentences will be given below. "
+    "Judge whether they are logical or not and output according to the specific requirement."
+)
+
+
+def build_screen_prompt(sentence: str) -> str:
+    """
+    Build the user prompt asking only whether a sentence has a logical error.
+    """
+    return f"""
+Judging this element:
+{sentence}
+Please return the result in JSON format as follows:
+{{"logic_error": "Findings of the judgement, only lowercase yes or no"}}.
+"""
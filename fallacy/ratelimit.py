@@ -0,0 +1,260 @@
+"""
+Adaptive, rate-limit-aware concurrency control per provider.
+
+Instead of a fixed CONCURRENCY_LIMIT semaphore, every provider gets a
+RateController that:
+  * grows its concurrency limit additively while latency and error rate stay
+    healthy, and halves it on 429 / overload responses (AIMD);
+  * pauses new requests for as long as a Retry-After header asks;
+  * enforces requests-per-minute and tokens-per-minute budgets with token buckets.
+
+Only the API call itself holds a slot; cache hits and retry backoff do not.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+from fallacy.registry import PROVIDERS
+
+# Applied to providers that do not set their own values
+RATE_LIMIT_DEFAULTS = {
+    "concurrency": 5,  # Starting concurrency limit
+    "min_concurrency": 1,
+    "max_concurrency": 256,
+    "rpm": None,  # Requests per minute budget
+    "tpm": None,  # Tokens per minute budget
+}
+
+RATE_LIMIT_STATUS = {429, 529}  # Too Many Requests, Anthropic "overloaded"
+LATENCY_TOLERANCE = 2.0  # Stop growing once latency exceeds this multiple of the best seen
+ERROR_RATE_LIMIT = 0.1  # Stop growing once the smoothed error rate exceeds this
+EWMA_ALPHA = 0.2
+OUTPUT_TOKEN_ESTIMATE = 256  # Assumed reply length when budgeting tokens before a call
+
+
+def estimate_tokens(request: dict) -> int:
+    """Rough token count of a request (about four characters per token) plus an expected reply."""
+    chars = len(request.get("system") or "")
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return chars // 4 + OUTPUT_TOKEN_ESTIMATE
+
+
+def error_status(error: Exception):
+    """HTTP status code carried by an API client exception, if any."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after(error: Exception):
+    """Seconds to wait according to the Retry-After headers of a failed response, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at per_minute / 60 tokens per second.
+
+    A request larger than the bucket is let through once the bucket is full and
+    leaves it in debt, so oversized requests are slowed down but never deadlock.
+    """
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or max(1.0, per_minute / 6)  # Ten seconds worth by default
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1):
+        async with self._lock:
+            while True:
+                self._refill()
+                need = min(amount, self.capacity)
+                if self.tokens >= need:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((need - self.tokens) / self.rate)
+
+    def available(self, amount: float = 1) -> bool:
+        """Whether acquire(amount) would return at once, with nobody queued before it."""
+        if self._lock.locked():
+            return False
+        self._refill()
+        return self.tokens >= min(amount, self.capacity)
+
+    def take(self, amount: float = 1):
+        """Spend tokens that available() just confirmed, without waiting."""
+        self.tokens -= amount
+
+
+class RateController:
+    """
+    AIMD concurrency limiter combined with RPM/TPM token buckets for one provider.
+    """
+
+    def __init__(self, name: str, concurrency: int = 5, min_concurrency: int = 1, max_concurrency: int = 256,
+                 rpm: float = None, tpm: float = None):
+        self.name = name
+        self.limit = float(concurrency)
+        self.min_limit = min_concurrency
+        self.max_limit = max_concurrency
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.in_flight = 0
+        self.pause_until = 0.0
+        self.latency_ewma = None
+        self.latency_best = None
+        self.error_ewma = 0.0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+        self.requests = 0
+        self.throttled = 0
+        self.peak_limit = self.limit
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """Hold one concurrency slot, after the RPM/TPM budgets allow it, for the duration of a call."""
+        while True:
+            delay = self.pause_until - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        if self.rpm:
+            await self.rpm.acquire(1)
+        if self.tpm and tokens:
+            await self.tpm.acquire(tokens)
+
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        async with self._held():
+            yield self
+
+    @asynccontextmanager
+    async def try_slot(self, tokens: int = 0):
+        """
+        Like slot, but never waits: yields False, holding nothing, unless a
+        concurrency slot and the RPM/TPM budget are free right now and the
+        provider is not paused. For optional extra calls such as hedges.
+        """
+        free = (self.pause_until <= time.monotonic() and self.in_flight < int(self.limit)
+                and not self._cond.locked() and (not self.rpm or self.rpm.available(1))
+                and (not self.tpm or not tokens or self.tpm.available(tokens)))
+        if not free:
+            yield False
+            return
+        # Nothing was awaited since the check, so the slot and budget are still free
+        if self.rpm:
+            self.rpm.take(1)
+        if self.tpm and tokens:
+            self.tpm.take(tokens)
+        self.in_flight += 1
+        async with self._held():
+            yield True
+
+    @asynccontextmanager
+    async def _held(self):
+        """Time a call in an acquired slot, adapt the limit to its outcome and release the slot."""
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._on_error(e)
+            raise
+        else:
+            self._on_success(time.monotonic() - start)
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                # Wake only as many waiters as there are free slots: with thousands
+                # of queued requests, notify_all makes every release O(waiters)
+                self._cond.notify(max(0, int(self.limit) - self.in_flight))
+
+    def _on_success(self, latency: float):
+        self.requests += 1
+        self.error_ewma *= (1 - EWMA_ALPHA)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += EWMA_ALPHA * (latency - self.latency_ewma)
+        if self.latency_best is None or self.latency_ewma < self.latency_best:
+            self.latency_best = self.latency_ewma
+        healthy = (self.latency_ewma <= LATENCY_TOLERANCE * self.latency_best
+                   and self.error_ewma < ERROR_RATE_LIMIT)
+        if healthy and self.limit < self.max_limit:
+            # Additive increase: about one extra slot per limit's worth of successes
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.peak_limit = max(self.peak_limit, self.limit)
+
+    def _on_error(self, error: Exception):
+        self.requests += 1
+        self.error_ewma += EWMA_ALPHA * (1 - self.error_ewma)
+        if error_status(error) not in RATE_LIMIT_STATUS:
+            return
+        self.throttled += 1
+        now = time.monotonic()
+        wait = retry_after(error)
+        if wait:
+            self.pause_until = max(self.pause_until, now + wait)
+        # Halve at most once per round trip, not once per in-flight request that hits the limit
+        if now - self._last_decrease >= (self.latency_ewma or 1.0):
+            self.limit = max(float(self.min_limit), self.limit / 2)
+            self._last_decrease = now
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "limit": round(self.limit, 2),
+            "peak_limit": round(self.peak_limit, 2),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+        }
+
+
+def make_controller(provider: str) -> RateController:
+    """Create the controller for a provider from its PROVIDERS settings."""
+    settings = dict(RATE_LIMIT_DEFAULTS)
+    settings.update({key: value for key, value in PROVIDERS[provider].items() if key in RATE_LIMIT_DEFAULTS})
+    return RateController(provider, **settings)
+
+
+def get_controller(controllers: dict, provider: str) -> RateController:
+    """Return the shared controller for a provider, creating it on first use."""
+    if provider not in controllers:
+        controllers[provider] = make_controller(provider)
+    return controllers[provider]
@@ -0,0 +1,134 @@
+"""
+Model registry for the fallacy evaluation engine.
+
+Each entry in MODELS describes one evaluated model; the key doubles as the
+result file name, so outputs land in res/<dataset>/<key>.json exactly like the
+files produced by the old per-model scripts. Adding a model means adding an
+entry here, nothing else.
+"""
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_DIR = os.path.join(ROOT_DIR, "csv")
+RES_DIR = os.path.join(ROOT_DIR, "res")
+
+# Input datasets, one sentence per row in the first column
+DATASETS = {
+    "SmartyPat": os.path.join(CSV_DIR, "SmartyPat.csv"),
+    "SmartyPat_augmented": os.path.join(CSV_DIR, "SmartyPat_augmented.csv"),
+    "SmartyPat_logic_sound": os.path.join(CSV_DIR, "SmartyPat_logic_sound.csv"),
+}
+
+# Endpoints. "api" selects the client family: "openai" for OpenAI-compatible
+# chat completions, "anthropic" for the native Messages API. Optional rate
+# limit settings ("concurrency", "max_concurrency", "rpm", "tpm") are read by
+# fallacy/ratelimit.py; requests to one provider share a single budget.
+PROVIDERS = {
+    "openai": {
+        "api": "openai",
+        "api_key": os.environ.get("OPENAI_API_KEY", ""),  # Fill in your OpenAI API key
+        "base_url": os.environ.get("OPENAI_BASE_URL", ""),  # Fill in the base URL if using a custom endpoint
+    },
+    "anthropic": {
+        "api": "anthropic",
+        "api_key": os.environ.get("ANTHROPIC_API_KEY", ""),
+        "base_url": os.environ.get("ANTHROPIC_BASE_URL", ""),
+    },
+    "deepseek": {
+        "api": "openai",
+        "api_key": os.environ.get("DEEPSEEK_API_KEY", ""),
+        "base_url": os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
+    },
+    "xai": {
+        "api": "openai",
+        "api_key": os.environ.get("XAI_API_KEY", ""),
+        "base_url": os.environ.get("XAI_BASE_URL", "https://api.x.ai/v1"),
+        "concurrency": 60,
+    },
+    "llama": {
+        "api": "openai",
+        "api_key": os.environ.get("LLAMA_API_KEY", ""),
+        "base_url": os.environ.get("LLAMA_BASE_URL", ""),
+    },
+}
+
+# Defaults applied to every model entry
+MODEL_DEFAULTS = {
+    "temperature": None,  # None leaves the provider default (required for reasoning models)
+    "max_tokens": None,  # Output cap; the Anthropic API requires one and falls back to 1000
+    "thinking_budget": None,  # Extended thinking budget (Anthropic only)
+    "extra_body": None,  # Extra request fields for OpenAI-compatible endpoints
+    "prompt_cache": True,  # Mark the static system prompt as cacheable (Anthropic cache_control)
+    "stream": False,  # Stream replies, recording time to first token and time to verdict
+    "early_stop": False,  # Close the stream once logic_error and logic_fallacies are complete
+    "screen_max_tokens": 20,  # Output cap of the yes/no screening prompt; None where reasoning needs room
+}
+
+MODELS = {
+    "claude-3-5-sonnet-20241022": {
+        "model": "claude-3-5-sonnet-20241022",
+        "provider": "anthropic",
+        "temperature": 0,
+    },
+    "claude-3-7-sonnet-20250219": {
+        "model": "claude-3-7-sonnet-20250219",
+        "provider": "anthropic",
+        "temperature": 0,
+    },
+    "claude-3-7-sonnet-20250219_thinking": {
+        "model": "claude-3-7-sonnet-20250219",
+        "provider": "anthropic",
+        "thinking_budget": 8000,
+        "max_tokens": 10000,
+        "screen_max_tokens": None,
+    },
+    "deepseek-chat": {
+        "model": "deepseek-chat",
+        "provider": "deepseek",
+        "temperature": 0,
+    },
+    "deepseek-reasoner": {
+        "model": "deepseek-reasoner",
+        "provider": "deepseek",
+        "screen_max_tokens": None,
+    },
+    "gpt-4o": {
+        "model": "gpt-4o",
+        "provider": "openai",
+        "temperature": 0,
+    },
+    "o3-mini": {
+        "model": "o3-mini",
+        "provider": "openai",
+        "screen_max_tokens": None,
+    },
+    "grok-2-1212": {
+        "model": "grok-2-1212",
+        "provider": "xai",
+        "temperature": 0,
+    },
+    "llama_3_1_405b": {
+        "model": "llama_3_1_405b",
+        "provider": "llama",
+        "temperature": 0,
+    },
+}
+
+
+def get_model(name: str) -> dict:
+    """
+    Return the full configuration of a registered model, with defaults and
+    provider settings filled in.
+    """
+    if name not in MODELS:
+        raise KeyError(f"Unknown model '{name}', expected one of: {', '.join(MODELS)}")
+    config = dict(MODEL_DEFAULTS)
+    config.update(MODELS[name])
+    config["name"] = name
+    config["api"] = PROVIDERS[config["provider"]]["api"]
+    return config
+
+
+def output_path(name: str, dataset: str) -> str:
+    """Result file for a model on a dataset: res/<dataset>/<name>.json."""
+    return os.path.join(RES_DIR, dataset, f"{name}.json")
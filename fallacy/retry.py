@@ -0,0 +1,215 @@
+"""
+Shared retry policy for every API-calling script.
+
+Errors are classified before deciding what to do with them:
+
+- auth / config (401, 403, 404): no retry can fix a bad key or an unknown
+  model, so the whole run stops at once.
+- invalid request (400, 413, 422, e.g. context too long, or a replay-mode
+  cache miss): this item fails immediately, the run goes on.
+- rate limit (429, 529): retried after the server's Retry-After hint (the
+  rate controller already waits it out when there is one), or with backoff
+  when the response carries none.
+- transient (5xx, timeouts, dropped connections): retried with
+  decorrelated-jitter backoff.
+- parse (a reply with no usable verdict): asked again right away.
+- unexpected (anything else, e.g. a TypeError from a bug): re-raised at
+  once, neither retried nor counted as an API failure.
+
+Backoff sleeps happen outside any concurrency slot, and a FailureMonitor
+aborts the run when most recent attempts fail, instead of letting a retry
+storm eat quota for hours.
+"""
+import asyncio
+import random
+from collections import deque
+
+import anthropic
+import httpx
+import openai
+
+from fallacy.cache import CacheMiss
+from fallacy.ratelimit import RATE_LIMIT_STATUS, error_status, retry_after
+
+AUTH = "auth"
+CONFIG = "config"
+INVALID_REQUEST = "invalid_request"
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+PARSE = "parse"
+UNEXPECTED = "unexpected"
+
+FAIL_RUN = {AUTH, CONFIG}  # Abort the whole run
+FAIL_ITEM = {INVALID_REQUEST}  # Give up on this item without retrying
+
+BACKOFF_BASE = 1.0  # Seconds
+BACKOFF_CAP = 60.0
+ABORT_THRESHOLD = 0.5  # Share of failed attempts in the window that aborts a run
+ABORT_WINDOW = 100
+ABORT_MIN_ATTEMPTS = 20
+# Errors without a status that still mean the call failed on the way: timeouts, dropped
+# connections, and API errors reported without an HTTP status (e.g. in the middle of a stream)
+TRANSIENT_ERRORS = (httpx.TransportError, openai.APIError, anthropic.APIError, TimeoutError, ConnectionError)
+
+
+class ParseError(ValueError):
+    """The reply arrived but carries no usable answer."""
+
+
+class FatalError(RuntimeError):
+    """An error that no retry can fix, such as a rejected API key or an unknown model."""
+
+
+class RunAborted(RuntimeError):
+    """Too many recent attempts failed; the run was stopped."""
+
+
+def classify(error: Exception) -> str:
+    """Sort an exception from an API call into one of the error kinds above."""
+    if isinstance(error, CacheMiss):
+        return INVALID_REQUEST
+    status = error_status(error)
+    if status in (401, 403):
+        return AUTH
+    if status == 404:
+        return CONFIG
+    if status in (400, 413, 422):
+        return INVALID_REQUEST
+    if status in RATE_LIMIT_STATUS:
+        return RATE_LIMIT
+    if status is not None:
+        return TRANSIENT  # 408, 409 and 5xx
+    if isinstance(error, ValueError):
+        return PARSE  # Includes ParseError and json.JSONDecodeError
+    if isinstance(error, TRANSIENT_ERRORS):
+        return TRANSIENT
+    return UNEXPECTED
+
+
+class Backoff:
+    """Decorrelated-jitter backoff: each delay is drawn from [base, 3 x previous delay], capped."""
+
+    def __init__(self, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP):
+        self.base = base
+        self.cap = cap
+        self.delay = base
+
+    def next(self) -> float:
+        self.delay = min(self.cap, random.uniform(self.base, self.delay * 3))
+        return self.delay
+
+
+class FailureMonitor:
+    """
+    Share of failed attempts among the last window attempts of a run; rate
+    limits do not count, since the rate controller handles them. Raises
+    RunAborted once the share reaches threshold.
+    """
+
+    def __init__(self, threshold: float = ABORT_THRESHOLD, window: int = ABORT_WINDOW,
+                 min_attempts: int = ABORT_MIN_ATTEMPTS):
+        self.threshold = threshold
+        self.min_attempts = min_attempts
+        self.recent = deque(maxlen=window)
+        self.errors = {}
+
+    def record(self, kind: str = None):
+        """Record one attempt: kind is None on success, else the error kind."""
+        if kind is not None:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+        if kind == RATE_LIMIT:
+            return
+        self.recent.append(kind is not None)
+        rate = sum(self.recent) / len(self.recent)
+        if len(self.recent) >= self.min_attempts and rate >= self.threshold:
+            raise RunAborted(f"{rate:.0%} of the last {len(self.recent)} attempts failed ({self.errors})")
+
+
+async def with_retries(attempt, max_attempts: int, monitor: FailureMonitor = None, backoff: Backoff = None,
+                       hints_handled: bool = False, label: str = "", give_up: set = FAIL_ITEM):
+    """
+    Await attempt() (a zero-argument coroutine function) until it succeeds,
+    following the retry policy for each error kind. Raises FatalError for
+    auth/config errors, RunAborted when the monitor trips, and otherwise the
+    last error once the item is given up: at once for the kinds in give_up,
+    else after max_attempts. Set hints_handled when a rate controller already
+    waits out Retry-After before the next call.
+    """
+    backoff = backoff or Backoff()
+    for number in range(1, max_attempts + 1):
+        try:
+            value = await attempt()
+        except Exception as e:
+            kind = classify(e)
+            if kind == UNEXPECTED:
+                raise  # A bug, not a failed call
+            print(f"{label}Attempt {number} failed ({kind}): {e}")
+            if monitor is not None:
+                monitor.record(kind)
+            if kind in FAIL_RUN:
+                raise FatalError(f"{kind} error: {e}") from e
+            if kind in give_up or number == max_attempts:
+                raise
+            if kind == PARSE:
+                continue
+            if kind == RATE_LIMIT:
+                # The rate controller only pauses for a Retry-After hint; a bare 429 needs backoff
+                hint = retry_after(e)
+                delay = 0 if hints_handled and hint else (hint or backoff.next())
+            else:
+                delay = backoff.next()
+            if delay:
+                await asyncio.sleep(delay)
+        else:
+            if monitor is not None:
+                monitor.record()
+            return value
+
+
+async def gather_or_abort(coroutines):
+    """
+    Run coroutines concurrently like asyncio.gather, but as soon as one
+    raises (or the gather itself is cancelled), cancel the rest, wait for
+    them to finish and re-raise, so none keeps calling the API or writing
+    results after the caller has given up.
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def run_bounded(coroutines, window: int):
+    """
+    Run an iterable of coroutines of any length with at most window of them
+    in flight, taking the next one only as others finish, so memory stays flat
+    however long the input is. Results are not kept: coroutines record their
+    own. The first error cancels the rest and is re-raised, like
+    gather_or_abort.
+    """
+    coroutines = iter(coroutines)
+    pending = set()
+    try:
+        while True:
+            while len(pending) >= window:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            # Only pulled once there is room, so a lazy input is read as it is consumed
+            coroutine = next(coroutines, None)
+            if coroutine is None:
+                break
+            pending.add(asyncio.ensure_future(coroutine))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
@@ -0,0 +1,218 @@
+"""
+Two-stage screening of large, unlabeled corpora.
+
+Stage one asks every sentence the short yes/no question of
+fallacy/llama/logic_llama3_1.py, with no fallacy taxonomy and an output cap
+of the model's screen_max_tokens. Stage two sends only the sentences judged
+"yes" the full 14-definition prompt of the engine; the rest are written as
+logic_error "no" without fallacies. A sentence whose screening reply stays
+unusable goes on to stage two, so a failure never hides a fallacy.
+
+Every run reports the tokens and wall time of both stages against classifying
+every sentence directly, estimated from the stage-two sentences. With
+--calibrate, stage two runs on every sentence, so the direct cost is measured
+instead, and the report counts how often the stages disagree, e.g. on
+SmartyPat_logic_sound (all sound) or SmartyPat (all fallacious). Replies
+answered from the response cache cost no tokens, so use --no-cache when
+measuring.
+
+Usage (from the repository root):
+    python -m fallacy.screening --model gpt-4o --dataset SmartyPat_augmented
+    python -m fallacy.screening --model gpt-4o --dataset SmartyPat_logic_sound --calibrate
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+from fallacy.cache import ResponseCache, add_cache_arguments, open_cache
+from fallacy.clients import connection_report
+from fallacy.engine import (MAX_RETRIES, complete, format_result, load_sentences, make_client, process_line,
+                            usage_summary)
+from fallacy.parsing import extract_json, parse_summary
+from fallacy.prompts import SCREEN_SYSTEM_PROMPT, build_screen_prompt
+from fallacy.ratelimit import RateController, get_controller
+from fallacy.registry import DATASETS, MODELS, RES_DIR, get_model
+from fallacy.retry import (UNEXPECTED, FailureMonitor, FatalError, ParseError, RunAborted, classify, gather_or_abort,
+                           with_retries)
+from fallacy.storage import write_json
+from fallacy.telemetry import Metrics, Telemetry, add_telemetry_arguments
+
+BARE_VERDICT = re.compile(r'logic_error\W*(yes|no)\b', re.I)
+
+
+def parse_screen(text: str):
+    """The "yes"/"no" verdict of a screening reply, or None when it has none."""
+    data = extract_json(text or "", accept=lambda value: isinstance(value, dict))
+    verdict = data.get("logic_error") if data else None
+    if isinstance(verdict, bool):
+        verdict = "yes" if verdict else "no"
+    verdict = str(verdict).strip().lower().rstrip(".")
+    if verdict in ("yes", "no"):
+        return verdict
+    # A reply cut off by the small output cap may still carry the verdict
+    bare = BARE_VERDICT.search(text or "") or re.fullmatch(r"\W*(yes|no)\W*", text or "", re.I)
+    return bare.group(1).lower() if bare else None
+
+
+def is_valid_screen(text: str) -> bool:
+    return parse_screen(text) is not None
+
+
+def screened_path(name: str, dataset: str) -> str:
+    """Result file of a screening run: res/<dataset>/<name>_screened.json."""
+    return os.path.join(RES_DIR, dataset, f"{name}_screened.json")
+
+
+def total_tokens(usage: dict) -> int:
+    return usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+
+
+async def screen_line(client, config: dict, sentence: str, controller: RateController = None,
+                      cache: ResponseCache = None, usage: dict = None, metrics: Metrics = None,
+                      monitor: FailureMonitor = None):
+    """Stage one for one sentence: "yes", "no", or None when no usable reply came back."""
+    screen_config = dict(config, max_tokens=config["screen_max_tokens"] or config["max_tokens"],
+                         stream=False, early_stop=False)
+    prompt = build_screen_prompt(sentence)
+
+    async def attempt():
+        text = await complete(client, screen_config, SCREEN_SYSTEM_PROMPT, prompt, controller, cache, usage,
+                              validate=is_valid_screen, metrics=metrics)
+        verdict = parse_screen(text)
+        if verdict is None:
+            raise ParseError(f"unusable screening response: {text[:100]}...")
+        return verdict
+
+    try:
+        return await with_retries(attempt, MAX_RETRIES, monitor, hints_handled=controller is not None,
+                                  label=f"[{config['name']}] Screen: ")
+    except (FatalError, RunAborted):
+        raise
+    except Exception as e:
+        if classify(e) == UNEXPECTED:
+            raise
+        return None
+
+
+async def screen(name: str, dataset: str, output_file: str = None, calibrate: bool = False,
+                 cache: ResponseCache = None, controllers: dict = None, telemetry: Telemetry = None) -> dict:
+    """
+    Screen one registered model's view of a dataset in two stages, write the
+    results to output_file (res/<dataset>/<name>_screened.json by default)
+    and return the report of savings (and, with calibrate, disagreements).
+    """
+    config = get_model(name)
+    output_file = output_file or screened_path(name, dataset)
+    sentences = load_sentences(DATASETS[dataset])
+    client = make_client(config)
+    controller = get_controller(controllers if controllers is not None else {}, config["provider"])
+    monitor = FailureMonitor()
+    screen_metrics = telemetry.get(name, f"{dataset}:screen", config["model"]) if telemetry is not None else None
+    metrics = telemetry.get(name, dataset, config["model"]) if telemetry is not None else None
+
+    screen_usage = {}
+    start = time.monotonic()
+    verdicts = await gather_or_abort(screen_line(client, config, sentence, controller, cache, screen_usage,
+                                                 screen_metrics, monitor) for sentence in sentences)
+    screen_wall = time.monotonic() - start
+    passed = {idx for idx, verdict in enumerate(verdicts, start=1) if verdict != "no"}
+    targets = [(idx, sentence) for idx, sentence in enumerate(sentences, start=1) if calibrate or idx in passed]
+    print(f"[{name}] Stage one: {len(passed)}/{len(sentences)} sentences go on to classification "
+          f"({verdicts.count(None)} unusable screening replies)")
+
+    # One usage dict per sentence, so the cost of the screened-in sentences can be told apart
+    usages = {idx: {} for idx, _ in targets}
+    parse_stats = {}
+    start = time.monotonic()
+    classified = await gather_or_abort(process_line(client, config, sentence, controller, cache, usages[idx],
+                                                    parse_stats, metrics, monitor=monitor)
+                                       for idx, sentence in targets)
+    classify_wall = time.monotonic() - start
+    results = dict(zip((idx for idx, _ in targets), classified))
+
+    records = []
+    for idx, sentence in enumerate(sentences, start=1):
+        result = results.get(idx) or {"logic_error": "no", "logic_fallacies": [], "details": ""}
+        record = format_result(idx, sentence, result)
+        record["screen"] = verdicts[idx - 1]
+        records.append(record)
+    write_json(output_file, records)
+
+    report = {"model": name, "dataset": dataset, "sentences": len(sentences), "calibrated": calibrate,
+              "stage_one": {"wall_time": round(screen_wall, 2), "usage": usage_summary(screen_usage),
+                            "yes": verdicts.count("yes"), "no": verdicts.count("no"),
+                            "unusable": verdicts.count(None)},
+              "stage_two": {"sentences": len(targets), "wall_time": round(classify_wall, 2),
+                            "parse": parse_summary(parse_stats)}}
+    classify_tokens = {idx: total_tokens(usage) for idx, usage in usages.items()}
+    screened_tokens = total_tokens(screen_usage) + sum(classify_tokens[idx] for idx in passed if idx in usages)
+    if calibrate:
+        direct_tokens, direct_wall = sum(classify_tokens.values()), classify_wall
+        screened_wall = screen_wall + classify_wall * len(passed) / max(len(sentences), 1)
+    else:
+        # Estimated: every sentence costing what a classified one did on average
+        scale = len(sentences) / len(targets) if targets else None
+        direct_tokens = round(sum(classify_tokens.values()) * scale) if scale else None
+        direct_wall = classify_wall * scale if scale else None
+        screened_wall = screen_wall + classify_wall
+    if direct_tokens:
+        report["savings"] = {
+            "direct_tokens": direct_tokens, "screened_tokens": screened_tokens,
+            "tokens_saved": direct_tokens - screened_tokens,
+            "token_share_saved": round(1 - screened_tokens / direct_tokens, 3),
+            "direct_wall_time": round(direct_wall, 2), "screened_wall_time": round(screened_wall, 2),
+            "wall_time_saved": round(direct_wall - screened_wall, 2),
+        }
+
+    if calibrate:
+        compared = [(idx, verdicts[idx - 1], results[idx]["logic_error"]) for idx in results
+                    if verdicts[idx - 1] is not None and "error" not in results[idx]]
+        missed = [idx for idx, first, second in compared if first == "no" and second == "yes"]
+        extra = [idx for idx, first, second in compared if first == "yes" and second == "no"]
+        report["disagreement"] = {
+            "compared": len(compared),
+            "screen_no_classify_yes": len(missed),  # Fallacies the screen would have hidden
+            "screen_yes_classify_no": len(extra),  # Sentences classified for nothing
+            "rate": round((len(missed) + len(extra)) / len(compared), 3) if compared else None,
+            "missed_ids": missed,
+        }
+    print(f"[{name}] {len(records)} results written to {output_file}")
+    print(f"[{name}] Rate control: {controller.stats()}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a dataset with a yes/no prompt before full classification.")
+    parser.add_argument("--model", required=True, choices=sorted(MODELS))
+    parser.add_argument("--dataset", default="SmartyPat", choices=sorted(DATASETS))
+    parser.add_argument("--output", default=None, help="Override the output JSON path")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="Classify every sentence and report how often the two stages disagree")
+    parser.add_argument("--report", default=None, help="Write the savings report to this JSON file")
+    add_cache_arguments(parser)
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    cache = open_cache(args)
+    telemetry = Telemetry()
+    try:
+        report = asyncio.run(screen(args.model, args.dataset, args.output, args.calibrate, cache,
+                                    telemetry=telemetry))
+    except (FatalError, RunAborted) as e:
+        raise SystemExit(f"Run stopped: {e}")
+    finally:
+        if args.telemetry:
+            print(f"Telemetry written to {', '.join(telemetry.write(args.telemetry))}")
+    print(json.dumps(report, indent=2))
+    print(f"Connections: {connection_report()}")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
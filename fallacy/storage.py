@@ -0,0 +1,148 @@
+"""
+Safe writes of result files shared by several processes.
+
+Every writer of res/<dataset>/<model>.json (and of the other result files)
+goes through write_json or update_json:
+
+- The new content is written to a temporary file in the same directory,
+  fsynced and renamed over the old file, so a reader or a crash sees either
+  the old version or the new one, never a truncated file.
+- An advisory lock on <file>.lock serialises writers across processes, so a
+  repair pass merging into a file cannot interleave with a sweep compacting
+  it; update_json holds it across the read, the change and the write.
+- The previous version is kept as <file>.bak.1, older ones as .bak.2 up to
+  BACKUPS, so a bad write can be rolled back by hand.
+
+Locks are fcntl.flock locks (msvcrt on Windows). They are advisory: scripts
+that open the files directly are not stopped. Lock files are left in place,
+as removing them would race with the next writer.
+"""
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BACKUPS = 3  # Previous versions kept as <file>.bak.1 (newest) to <file>.bak.<BACKUPS>
+LOCK_POLL = 0.1  # Seconds between attempts to take a lock held by another process
+
+
+class LockTimeout(RuntimeError):
+    """Another process held the lock for longer than the timeout."""
+
+
+def lock_path(path: str) -> str:
+    return f"{path}.lock"
+
+
+def _try_lock(f) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked(path: str, timeout: float = None):
+    """
+    Hold the advisory lock of a file. Waits up to timeout seconds (forever by
+    default; 0 means do not wait) and raises LockTimeout after that.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    f = open(lock_path(path), 'a+')
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not _try_lock(f):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LockTimeout(f"{path} is locked by another process")
+            time.sleep(LOCK_POLL)
+        try:
+            yield
+        finally:
+            _unlock(f)
+    finally:
+        f.close()
+
+
+def backup_path(path: str, number: int = 1) -> str:
+    return f"{path}.bak.{number}"
+
+
+def rotate_backups(path: str, backups: int = BACKUPS):
+    """Shift <file>.bak.N up by one and keep the current file as .bak.1, leaving it in place."""
+    if not backups or not os.path.exists(path):
+        return
+    for number in range(backups - 1, 0, -1):
+        if os.path.exists(backup_path(path, number)):
+            os.replace(backup_path(path, number), backup_path(path, number + 1))
+    newest = backup_path(path, 1)
+    try:
+        os.link(path, newest)  # The rename that follows replaces the name, not this inode
+    except OSError:
+        shutil.copy2(path, newest)
+
+
+def _write_locked(path: str, data, backups: int):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        rotate_backups(path, backups)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if fcntl is not None:
+        # Make the rename itself durable
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_json(path: str, data, backups: int = BACKUPS):
+    """Replace a JSON file atomically under its lock, keeping the previous version as a backup."""
+    with locked(path):
+        _write_locked(path, data, backups)
+
+
+def read_json(path: str, default=None):
+    """Load a JSON file, or return default when it does not exist."""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update_json(path: str, change, default=None, backups: int = BACKUPS):
+    """
+    Read-modify-write a JSON file under its lock: change(data) returns the
+    new content (it may also modify data in place and return it). Returns
+    what was written.
+    """
+    with locked(path):
+        data = change(read_json(path, default))
+        _write_locked(path, data, backups)
+    return data
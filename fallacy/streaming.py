@@ -0,0 +1,91 @@
+"""
+Streamed API calls with incremental parsing.
+
+With streaming on, a reply is read as it is generated: the time to the first
+token (TTFT) and the time until logic_error and logic_fallacies are both
+complete (time to verdict) are measured separately. With early stopping, the
+stream is closed at that point and the rest of the reply (the details
+explanation) is never waited for.
+
+Token usage arrives at the end of a stream, so an early-stopped call has its
+output tokens estimated from the text received; providers may still bill the
+tokens generated before the connection was closed.
+"""
+import time
+
+from fallacy.parsing import partial_verdict
+from fallacy.ratelimit import OUTPUT_TOKEN_ESTIMATE, estimate_tokens
+
+CHARS_PER_TOKEN = 4
+
+
+async def stream_reply(client, api: str, request: dict, early_stop: bool = False) -> dict:
+    """
+    Send a request with streaming on and collect the reply. Returns a dict with
+    the reply "text", a "response" carrying usage (and thinking) in the shape
+    response_tokens() reads, "ttft" and "ttv" in seconds (None when not
+    reached) and "stopped" when the stream was closed early.
+    """
+    start = time.monotonic()
+    text, thinking = [], []
+    ttft = ttv = None
+    usage = {}
+    stopped = False
+
+    if api == "anthropic":
+        stream = await client.messages.create(**request, stream=True)
+    else:
+        stream = await client.chat.completions.create(**request, stream=True,
+                                                      stream_options={"include_usage": True})
+    try:
+        async for event in stream:
+            delta = ""
+            if api == "anthropic":
+                if event.type == "message_start":
+                    usage.update(event.message.usage.model_dump())
+                elif event.type == "message_delta" and event.usage is not None:
+                    usage["output_tokens"] = event.usage.output_tokens
+                elif event.type == "content_block_delta":
+                    if event.delta.type == "text_delta":
+                        delta = event.delta.text
+                    elif event.delta.type == "thinking_delta":
+                        thinking.append(event.delta.thinking)
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+            else:
+                if event.usage is not None:
+                    usage = event.usage.model_dump()
+                if event.choices:
+                    delta = event.choices[0].delta.content or ""
+                    if ttft is None and (delta or getattr(event.choices[0].delta, "reasoning_content", None)):
+                        ttft = time.monotonic() - start
+            if not delta:
+                continue
+            text.append(delta)
+            if ttv is None and partial_verdict("".join(text)) is not None:
+                ttv = time.monotonic() - start
+                if early_stop:
+                    stopped = True
+                    break
+    finally:
+        # Also on cancellation or an error mid-stream, so the pooled connection is released
+        await stream.close()
+
+    reply = "".join(text)
+    if api == "anthropic":
+        if stopped or "output_tokens" not in usage:
+            usage["output_tokens"] = (len(reply) + len("".join(thinking))) // CHARS_PER_TOKEN
+        response = {"usage": usage, "content": [{"type": "thinking", "thinking": "".join(thinking)}]}
+    else:
+        if not usage:
+            usage = {"prompt_tokens": estimate_tokens(request) - OUTPUT_TOKEN_ESTIMATE,
+                     "completion_tokens": len(reply) // CHARS_PER_TOKEN}
+        response = {"usage": usage}
+    return {"text": reply, "response": response, "ttft": ttft, "ttv": ttv, "stopped": stopped}
+
+
+def add_stream_arguments(parser):
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream replies and record time to first token and time to verdict")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="Stream replies and stop reading once the verdict and fallacy list are complete")
@@ -0,0 +1,230 @@
+"""
+Per-request telemetry for evaluation runs.
+
+Every API call records its wall latency, time to first token (when the reply
+is streamed), token counts and error class; every logical request (one
+sentence, including its retries) records its end-to-end latency and retry
+count. Metrics are kept per (model, dataset) and exported as a JSON report
+with p50/p95/p99 latencies and cost estimates, and as a Prometheus text file.
+"""
+import json
+import math
+import os
+from collections import Counter, OrderedDict
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300)  # Seconds, Prometheus histogram bounds
+QUANTILES = (0.5, 0.95, 0.99)
+
+# USD per million tokens: (input, cached input, output), keyed by API model id.
+# List prices at the time of writing; thinking tokens are billed as output and
+# Anthropic cache writes at 1.25x input. Models without an entry get no cost.
+PRICES = {
+    "claude-3-5-sonnet-20241022": (3.00, 0.30, 15.00),
+    "claude-3-7-sonnet-20250219": (3.00, 0.30, 15.00),
+    "deepseek-chat": (0.27, 0.07, 1.10),
+    "deepseek-reasoner": (0.55, 0.14, 2.19),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "o3-mini": (1.10, 0.55, 4.40),
+    "grok-2-1212": (2.00, 2.00, 10.00),
+}
+CACHE_WRITE_PREMIUM = 1.25
+
+
+def error_class(e: Exception) -> str:
+    return type(e).__name__
+
+
+def percentile(values: list, q: float):
+    """Nearest-rank percentile of values, or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def response_tokens(api: str, response) -> dict:
+    """Token counts reported in an API response (SDK object or plain dict)."""
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    if not usage:
+        return {}
+    get = usage.get if isinstance(usage, dict) else (lambda key, default=None: getattr(usage, key, default))
+    if api == "anthropic":
+        cached = get("cache_read_input_tokens", 0) or 0
+        written = get("cache_creation_input_tokens", 0) or 0
+        # Anthropic reports cache reads and writes separately from input_tokens
+        tokens = {"input_tokens": (get("input_tokens", 0) or 0) + cached + written,
+                  "output_tokens": get("output_tokens", 0) or 0,
+                  "cached_tokens": cached, "cache_write_tokens": written}
+        content = response.get("content", []) if isinstance(response, dict) else getattr(response, "content", [])
+        thinking = sum(len((block.get("thinking") if isinstance(block, dict) else getattr(block, "thinking", ""))
+                           or "") for block in content)
+        if thinking:
+            # Not reported separately (it is part of output_tokens); estimated at 4 characters per token
+            tokens["thinking_tokens"] = thinking // 4
+        return tokens
+
+    def detail(field: str, key: str) -> int:
+        details = get(field)
+        if not details:
+            return 0
+        return (details.get(key) if isinstance(details, dict) else getattr(details, key, 0)) or 0
+
+    return {"input_tokens": get("prompt_tokens", 0) or 0,
+            "output_tokens": get("completion_tokens", 0) or 0,
+            "cached_tokens": detail("prompt_tokens_details", "cached_tokens"),
+            "thinking_tokens": detail("completion_tokens_details", "reasoning_tokens")}
+
+
+class Metrics:
+    """Telemetry of one model on one dataset."""
+
+    TOKEN_KEYS = ("input_tokens", "cached_tokens", "cache_write_tokens", "output_tokens", "thinking_tokens")
+
+    def __init__(self, model: str, dataset: str, model_id: str = None):
+        self.model = model
+        self.dataset = dataset
+        self.price = PRICES.get(model_id or model)
+        self.call_latencies = []
+        self.ttfts = []
+        self.verdict_times = []
+        self.request_latencies = []
+        self.tokens = dict.fromkeys(self.TOKEN_KEYS, 0)
+        self.calls = 0
+        self.requests = 0
+        self.failed = 0
+        self.retries = 0
+        self.early_stops = 0
+        self.errors = Counter()
+
+    def record_call(self, latency: float, tokens: dict = None, ttft: float = None, error: str = None,
+                    ttv: float = None, stopped: bool = False):
+        """
+        One API call; error is the exception class name when it failed. For a
+        streamed call, ttv is the time until the verdict was complete and
+        stopped tells whether the stream was closed right there.
+        """
+        self.calls += 1
+        self.call_latencies.append(latency)
+        if ttft is not None:
+            self.ttfts.append(ttft)
+        if ttv is not None:
+            self.verdict_times.append(ttv)
+        if stopped:
+            self.early_stops += 1
+        for key, value in (tokens or {}).items():
+            self.tokens[key] = self.tokens.get(key, 0) + (value or 0)
+        if error:
+            self.errors[error] += 1
+
+    def record_request(self, latency: float, retries: int = 0, ok: bool = True):
+        """One logical request (a sentence or a packed group), end to end including retries."""
+        self.requests += 1
+        self.request_latencies.append(latency)
+        self.retries += retries
+        if not ok:
+            self.failed += 1
+
+    def cost(self):
+        """Estimated USD cost of the recorded tokens, or None without a price."""
+        if self.price is None:
+            return None
+        input_price, cached_price, output_price = self.price
+        cached, written = self.tokens["cached_tokens"], self.tokens["cache_write_tokens"]
+        uncached = self.tokens["input_tokens"] - cached - written
+        total = (uncached * input_price + cached * cached_price + written * input_price * CACHE_WRITE_PREMIUM
+                 + self.tokens["output_tokens"] * output_price)
+        return round(total / 1e6, 4)
+
+    def summary(self) -> dict:
+        latency = lambda values: {f"p{int(q * 100)}": round(percentile(values, q), 3) if values else None
+                                  for q in QUANTILES}
+        return OrderedDict([
+            ("model", self.model),
+            ("dataset", self.dataset),
+            ("requests", self.requests),
+            ("failed", self.failed),
+            ("calls", self.calls),
+            ("retries", self.retries),
+            ("errors", dict(self.errors)),
+            ("call_latency", latency(self.call_latencies)),
+            ("request_latency", latency(self.request_latencies)),
+            ("ttft", latency(self.ttfts)),
+            ("time_to_verdict", latency(self.verdict_times)),
+            ("early_stops", self.early_stops),
+            ("tokens", dict(self.tokens)),
+            ("cost_usd", self.cost()),
+        ])
+
+
+class Telemetry:
+    """Metrics for every (model, dataset) pair of a run."""
+
+    def __init__(self):
+        self.metrics = OrderedDict()
+
+    def get(self, model: str, dataset: str, model_id: str = None) -> Metrics:
+        key = (model, dataset)
+        if key not in self.metrics:
+            self.metrics[key] = Metrics(model, dataset, model_id)
+        return self.metrics[key]
+
+    def report(self) -> dict:
+        entries = [metrics.summary() for metrics in self.metrics.values()]
+        costs = [entry["cost_usd"] for entry in entries if entry["cost_usd"] is not None]
+        return {"runs": entries, "total_cost_usd": round(sum(costs), 4) if costs else None}
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP fallacy_call_latency_seconds Wall latency of one API call.",
+            "# TYPE fallacy_call_latency_seconds histogram",
+        ]
+        for metrics in self.metrics.values():
+            labels = f'model="{metrics.model}",dataset="{metrics.dataset}"'
+            for bound in LATENCY_BUCKETS:
+                count = sum(1 for value in metrics.call_latencies if value <= bound)
+                lines.append(f'fallacy_call_latency_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'fallacy_call_latency_seconds_bucket{{{labels},le="+Inf"}} {metrics.calls}')
+            lines.append(f"fallacy_call_latency_seconds_sum{{{labels}}} {sum(metrics.call_latencies):.3f}")
+            lines.append(f"fallacy_call_latency_seconds_count{{{labels}}} {metrics.calls}")
+        for name, help_text, value in (
+                ("requests_total", "Logical requests (sentences) completed.", lambda m: m.requests),
+                ("requests_failed_total", "Logical requests that ended in an error.", lambda m: m.failed),
+                ("retries_total", "Retried API calls.", lambda m: m.retries),
+                ("cost_usd", "Estimated cost in USD.", lambda m: m.cost())):
+            lines.append(f"# HELP fallacy_{name} {help_text}")
+            lines.append(f"# TYPE fallacy_{name} {'gauge' if name == 'cost_usd' else 'counter'}")
+            for metrics in self.metrics.values():
+                if value(metrics) is not None:
+                    lines.append(f'fallacy_{name}{{model="{metrics.model}",dataset="{metrics.dataset}"}} '
+                                 f'{value(metrics)}')
+        lines.append("# HELP fallacy_tokens_total Tokens by kind.")
+        lines.append("# TYPE fallacy_tokens_total counter")
+        for metrics in self.metrics.values():
+            for kind, count in metrics.tokens.items():
+                lines.append(f'fallacy_tokens_total{{model="{metrics.model}",dataset="{metrics.dataset}",'
+                             f'kind="{kind[:-len("_tokens")]}"}} {count}')
+        lines.append("# HELP fallacy_errors_total Failed API calls by error class.")
+        lines.append("# TYPE fallacy_errors_total counter")
+        for metrics in self.metrics.values():
+            for error, count in metrics.errors.items():
+                lines.append(f'fallacy_errors_total{{model="{metrics.model}",dataset="{metrics.dataset}",'
+                             f'error="{error}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, base_path: str):
+        """Write <base_path>.json and <base_path>.prom; returns both paths."""
+        directory = os.path.dirname(base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        json_path, prom_path = base_path + ".json", base_path + ".prom"
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        return json_path, prom_path
+
+
+def add_telemetry_arguments(parser):
+    parser.add_argument("--telemetry", default=None, metavar="PATH",
+                        help="Write the telemetry report to PATH.json and PATH.prom")
@@ -0,0 +1,342 @@
+"""
+Sharded evaluation over a local durable work queue.
+
+A queue is a SQLite file next to the result file
+(res/<dataset>/<model>.queue.sqlite). init splits the dataset's sentences
+into shards of --shard-size rows. Any number of worker processes, on one
+machine or on several hosts sharing the filesystem, then lease shards,
+classify them with the engine's process_line and commit each result as it
+completes; merge finally writes the usual res/<dataset>/<model>.json.
+
+- A lease lasts --lease seconds and is renewed while the shard is being
+  worked on. A shard whose lease expired (its worker crashed or lost the
+  filesystem) is handed to the next worker that asks.
+- Commits are idempotent: results are keyed by row id, a finished result is
+  never replaced, and a worker that picks up a reclaimed shard skips the rows
+  already finished. Two workers racing on one shard waste calls, not results.
+- A shard leased MAX_LEASES times without finishing is left alone and
+  reported by status, so one poison shard cannot hold up the rest.
+
+The queue uses SQLite's rollback journal and short BEGIN IMMEDIATE
+transactions, not WAL, since WAL does not work across hosts on a network
+filesystem; the filesystem must support POSIX locks. A worker runs its queue
+calls in threads, so waiting on another host's lock never stalls its requests.
+For the same reason workers use no response cache by default: the cache is
+in WAL mode and is read on the event loop, so it belongs on local disk.
+Pass --cache-path with a file on the worker's own host to use one.
+
+Usage (from the repository root):
+    python -m fallacy.workqueue init --model gpt-4o --dataset SmartyPat_augmented --shard-size 50
+    python -m fallacy.workqueue work --model gpt-4o --dataset SmartyPat_augmented   # on each host, any number
+    python -m fallacy.workqueue status --model gpt-4o --dataset SmartyPat_augmented
+    python -m fallacy.workqueue merge --model gpt-4o --dataset SmartyPat_augmented
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from fallacy.cache import ResponseCache, add_cache_arguments, open_cache
+from fallacy.checkpoint import is_done
+from fallacy.clients import connection_report
+from fallacy.engine import format_result, load_sentences, make_client, process_line
+from fallacy.ratelimit import get_controller
+from fallacy.registry import DATASETS, MODELS, get_model, output_path
+from fallacy.retry import FailureMonitor, FatalError, RunAborted, gather_or_abort
+from fallacy.storage import write_json
+from fallacy.telemetry import Telemetry, add_telemetry_arguments
+
+SHARD_SIZE = 50  # Sentences per shard
+LEASE_SECONDS = 600.0  # A shard not renewed for this long is handed to another worker
+SHARDS_IN_FLIGHT = 4  # Shards one worker processes at once
+MAX_LEASES = 5  # Leases after which an unfinished shard is given up
+
+
+def queue_path(output_file: str) -> str:
+    """Queue file that sits next to a result file."""
+    return os.path.splitext(output_file)[0] + ".queue.sqlite"
+
+
+def input_digest(sentences: list) -> str:
+    """Fingerprint of the sentences, so workers can tell the queue belongs to the same input."""
+    return hashlib.sha256("\n".join(sentences).encode("utf-8")).hexdigest()
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Shards, leases and committed results of one (model, dataset) run in a SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit mode; every change is an explicit BEGIN IMMEDIATE ... COMMIT. Workers call
+        # in from threads, one at a time under the lock
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS shards ("
+            "id INTEGER PRIMARY KEY, first INTEGER NOT NULL, last INTEGER NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', worker TEXT, lease_until REAL, "
+            "leases INTEGER NOT NULL DEFAULT 0, updated REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "id INTEGER PRIMARY KEY, shard INTEGER NOT NULL, done INTEGER NOT NULL, "
+            "record TEXT NOT NULL, worker TEXT NOT NULL, created REAL NOT NULL)"
+        )
+
+    @contextmanager
+    def _write(self):
+        """One write transaction: BEGIN IMMEDIATE, then COMMIT, or ROLLBACK on an error."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _transaction(self, statements):
+        """Run (sql, params) pairs in one write transaction and return the cursor of the last."""
+        with self._write() as db:
+            cursor = None
+            for sql, params in statements:
+                cursor = db.execute(sql, params)
+        return cursor
+
+    def meta(self) -> dict:
+        with self._lock:
+            return dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+
+    def create(self, name: str, dataset: str, sentences: list, shard_size: int = SHARD_SIZE) -> bool:
+        """
+        Split rows 1..len(sentences) into shards. Returns False when the queue
+        already holds this run, and raises ValueError when it holds another one.
+        """
+        meta = {"model": name, "dataset": dataset, "sentences": str(len(sentences)),
+                "input": input_digest(sentences), "shard_size": str(shard_size)}
+        # Checked in the same transaction, so workers starting together cannot both create the shards
+        with self._write() as db:
+            existing = dict(db.execute("SELECT key, value FROM meta").fetchall())
+            if existing:
+                different = {key for key in ("model", "dataset", "input") if existing.get(key) != meta[key]}
+                if different:
+                    raise ValueError(f"Queue {self.path} holds another run "
+                                     f"(differs in {', '.join(sorted(different))})")
+                return False
+            db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta.items())
+            db.executemany("INSERT INTO shards (first, last) VALUES (?, ?)",
+                           [(first, min(first + shard_size - 1, len(sentences)))
+                            for first in range(1, len(sentences) + 1, shard_size)])
+        return True
+
+    def lease(self, worker: str, seconds: float = LEASE_SECONDS):
+        """
+        Lease the next pending shard, or one whose lease expired. Returns
+        (shard id, first row, last row, reclaimed) or None when there is none.
+        """
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                "SELECT id, first, last, status FROM shards WHERE leases < ? AND "
+                "(status = 'pending' OR (status = 'leased' AND lease_until < ?)) ORDER BY id LIMIT 1",
+                (MAX_LEASES, now)).fetchone()
+            if row is not None:
+                db.execute("UPDATE shards SET status = 'leased', worker = ?, lease_until = ?, "
+                           "leases = leases + 1, updated = ? WHERE id = ?", (worker, now + seconds, now, row[0]))
+        if row is None:
+            return None
+        shard, first, last, status = row
+        return shard, first, last, status == "leased"
+
+    def renew(self, shard: int, worker: str, seconds: float = LEASE_SECONDS) -> bool:
+        """Extend a lease; False when the shard was reclaimed by another worker or is already done."""
+        now = time.time()
+        cursor = self._transaction([("UPDATE shards SET lease_until = ?, updated = ? "
+                                     "WHERE id = ? AND worker = ? AND status = 'leased'",
+                                     (now + seconds, now, shard, worker))])
+        return cursor.rowcount == 1
+
+    def finished_rows(self, first: int, last: int) -> set:
+        with self._lock:
+            return {row[0] for row in self._db.execute(
+                "SELECT id FROM results WHERE id BETWEEN ? AND ? AND done = 1", (first, last))}
+
+    def commit(self, shard: int, record: dict, worker: str):
+        """Store one result; a finished result already stored is never replaced."""
+        self._transaction([(
+            "INSERT INTO results (id, shard, done, record, worker, created) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET done = excluded.done, record = excluded.record, "
+            "worker = excluded.worker, created = excluded.created WHERE results.done = 0",
+            (record["id"], shard, int(is_done(record)), json.dumps(record, ensure_ascii=False), worker, time.time()),
+        )])
+
+    def complete(self, shard: int):
+        """Mark a shard done, whichever worker holds it now: its rows are all committed."""
+        self._transaction([("UPDATE shards SET status = 'done', lease_until = NULL, updated = ? WHERE id = ?",
+                            (time.time(), shard))])
+
+    def status(self) -> dict:
+        now = time.time()
+        shards = dict(self._db.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+        expired = self._db.execute("SELECT COUNT(*) FROM shards WHERE status = 'leased' AND lease_until < ?",
+                                   (now,)).fetchone()[0]
+        exhausted = self._db.execute("SELECT COUNT(*) FROM shards WHERE status != 'done' AND leases >= ?",
+                                     (MAX_LEASES,)).fetchone()[0]
+        results = dict(self._db.execute("SELECT done, COUNT(*) FROM results GROUP BY done").fetchall())
+        workers = self._db.execute("SELECT worker, COUNT(*) FROM shards WHERE status = 'leased' "
+                                   "AND lease_until >= ? GROUP BY worker", (now,)).fetchall()
+        return {
+            "sentences": int(self.meta().get("sentences", 0)),
+            "shards": {status: shards.get(status, 0) for status in ("pending", "leased", "done")},
+            "expired_leases": expired,
+            "exhausted_shards": exhausted,
+            "results": {"done": results.get(1, 0), "errors": results.get(0, 0)},
+            "active_workers": dict(workers),
+        }
+
+    def records(self) -> list:
+        """Every committed result, in row order."""
+        return [json.loads(row[0]) for row in self._db.execute("SELECT record FROM results ORDER BY id")]
+
+    def close(self):
+        self._db.close()
+
+
+async def work(name: str, dataset: str, queue: WorkQueue, worker: str = None, lease_seconds: float = LEASE_SECONDS,
+               shards_in_flight: int = SHARDS_IN_FLIGHT, cache: ResponseCache = None,
+               telemetry: Telemetry = None) -> int:
+    """
+    Lease and process shards until none is left to lease. Returns the number
+    of sentences this worker committed.
+    """
+    config = get_model(name)
+    worker = worker or worker_name()
+    sentences = load_sentences(DATASETS[dataset])
+    if queue.meta().get("input") != input_digest(sentences):
+        raise ValueError(f"Queue {queue.path} was built from different input; re-create it with init")
+    client = make_client(config)
+    controller = get_controller({}, config["provider"])
+    metrics = telemetry.get(name, dataset, config["model"]) if telemetry is not None else None
+    monitor = FailureMonitor()
+    parse_stats = {}
+    committed = 0
+
+    async def keep_leased(shard: int):
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            if not await asyncio.to_thread(queue.renew, shard, worker, lease_seconds):
+                print(f"[{worker}] Lost the lease on shard {shard}; finishing it anyway")
+                return
+
+    async def run_one(shard: int, idx: int):
+        nonlocal committed
+        result = await process_line(client, config, sentences[idx - 1], controller, cache, None, parse_stats,
+                                    metrics, monitor=monitor)
+        await asyncio.to_thread(queue.commit, shard, format_result(idx, sentences[idx - 1], result), worker)
+        committed += 1
+
+    async def shard_loop():
+        while True:
+            leased = await asyncio.to_thread(queue.lease, worker, lease_seconds)
+            if leased is None:
+                return
+            shard, first, last, reclaimed = leased
+            finished = await asyncio.to_thread(queue.finished_rows, first, last)
+            rows = [idx for idx in range(first, last + 1) if idx not in finished]
+            print(f"[{worker}] Shard {shard} (rows {first}-{last}){' reclaimed' if reclaimed else ''}: "
+                  f"{len(rows)} to do")
+            heartbeat = asyncio.ensure_future(keep_leased(shard))
+            try:
+                await gather_or_abort(run_one(shard, idx) for idx in rows)
+            finally:
+                heartbeat.cancel()
+            await asyncio.to_thread(queue.complete, shard)
+
+    await gather_or_abort(shard_loop() for _ in range(shards_in_flight))
+    print(f"[{worker}] No shards left; committed {committed} results")
+    print(f"[{worker}] Rate control: {controller.stats()}")
+    print(f"[{worker}] Connections: {connection_report()}")
+    return committed
+
+
+def merge(queue: WorkQueue, output_file: str, partial: bool = False) -> list:
+    """
+    Write the committed results as res/<dataset>/<model>.json. Rows without a
+    result make this fail unless partial is set; error markers are kept.
+    """
+    records = queue.records()
+    total = int(queue.meta().get("sentences", 0))
+    missing = total - len(records)
+    if missing and not partial:
+        raise SystemExit(f"{missing}/{total} sentences have no result yet; run more workers or use --partial")
+    write_json(output_file, records)
+    errors = sum(not is_done(record) for record in records)
+    print(f"{len(records)} results ({errors} errors, {missing} missing) written to {output_file}")
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a dataset with any number of workers over a shared queue.")
+    parser.add_argument("command", choices=("init", "work", "status", "merge"))
+    parser.add_argument("--model", required=True, choices=sorted(MODELS))
+    parser.add_argument("--dataset", default="SmartyPat", choices=sorted(DATASETS))
+    parser.add_argument("--output", default=None, help="Override the output JSON path (the queue sits next to it)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Sentences per shard (init)")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="Lease duration in seconds (work)")
+    parser.add_argument("--shards-in-flight", type=int, default=SHARDS_IN_FLIGHT,
+                        help="Shards this worker processes at once (work)")
+    parser.add_argument("--worker-id", default=None, help="Name of this worker (default: host:pid)")
+    parser.add_argument("--partial", action="store_true", help="Merge even if some sentences have no result")
+    add_cache_arguments(parser)
+    # No shared default: the response cache uses WAL, which is unsafe on a network filesystem
+    parser.set_defaults(cache_path=None)
+    add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    if args.replay and not args.cache_path:
+        parser.error("--replay needs --cache-path (workers use no response cache by default)")
+    output_file = args.output or output_path(args.model, args.dataset)
+    queue = WorkQueue(queue_path(output_file))
+
+    try:
+        if args.command == "init":
+            sentences = load_sentences(DATASETS[args.dataset])
+            created = queue.create(args.model, args.dataset, sentences, args.shard_size)
+            print(f"Queue {queue.path} {'created' if created else 'already exists'}: {queue.status()}")
+        elif args.command == "work":
+            if not queue.meta():
+                queue.create(args.model, args.dataset, load_sentences(DATASETS[args.dataset]), args.shard_size)
+            cache = open_cache(args) if args.cache_path else None
+            telemetry = Telemetry()
+            try:
+                asyncio.run(work(args.model, args.dataset, queue, args.worker_id, args.lease,
+                                 args.shards_in_flight, cache, telemetry))
+            except (FatalError, RunAborted) as e:
+                raise SystemExit(f"Worker stopped: {e}. Its shards are reclaimed once their leases expire.")
+            finally:
+                if args.telemetry:
+                    print(f"Telemetry written to {', '.join(telemetry.write(args.telemetry))}")
+            print(f"Queue: {queue.status()}")
+        elif args.command == "status":
+            print(json.dumps(queue.status(), indent=2))
+        else:
+            merge(queue, output_file, args.partial)
+    finally:
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,12 @@
+import os
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from matplotlib import font_manager
 
+SCORE_TABLE = "score_table.csv"  # Written by evaluation/count.py; its rows replace the matching ones below
+
 custom_font = font_manager.FontProperties(family='Times New Roman', size=18)
 
 data = [
@@ -44,6 +48,12 @@ data = [
 
 df = pd.DataFrame(data, columns=['Fallacy', 'Method', '0', '1', '2', '3'])
 
+if os.path.exists(SCORE_TABLE):
+    scored = pd.read_csv(SCORE_TABLE).set_index(['Fallacy', 'Method'])
+    df = df.set_index(['Fallacy', 'Method'])
+    df.update(scored[['0', '1', '2', '3']])
+    df = df.astype(int).reset_index()
+
 method_names = {
     'Direct': 'Direct',
     'Prolog': 'Prolog',
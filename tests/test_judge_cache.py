@@ -0,0 +1,31 @@
+from evaluation.judge_cache import JudgeCache, judge_key, label_set
+
+DEFINITIONS = {"false cause": "Post hoc.", "false analogy": "A is like B."}
+
+
+def key(sentence="It rained, so I won.", label="false cause", definitions=DEFINITIONS, guide="guide",
+        model="gpt-4o", temperature=0):
+    return judge_key(sentence, label_set(label), definitions, guide, model, temperature)
+
+
+def test_key_ignores_spacing_quotes_and_label_order():
+    assert key(" “It  rained,\nso I won.” ") == key()
+    assert key(label="False Analogy, false cause") == key(label="false cause,false analogy")
+
+
+def test_key_covers_definitions_guide_model_and_temperature():
+    assert key(definitions=dict(DEFINITIONS, **{"false cause": "Changed."})) != key()
+    assert key(definitions=dict(DEFINITIONS, **{"false analogy": "Changed."})) == key()  # Not this row's label
+    assert key(guide="other") != key()
+    assert key(model="deepseek-chat") != key()
+    assert key(temperature=1) != key()
+
+
+def test_put_overwrites(tmp_path):
+    cache = JudgeCache(str(tmp_path / "judge.sqlite"))
+    cache.put(key(), {"score": 1}, "gpt-4o")
+    cache.put(key(), {"score": 3}, "gpt-4o")
+    assert cache.get(key()) == {"score": 3}
+    assert cache.get(key(sentence="Something else.")) is None
+    assert cache.stats()["hits"] == 1
+    cache.close()
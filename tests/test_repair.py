@@ -0,0 +1,37 @@
+import asyncio
+
+from fallacy import engine
+from fallacy.storage import read_json, write_json
+
+GOOD = {"logic_error": "yes", "logic_fallacies": ["False Cause"], "details": "Post hoc."}
+
+
+def broken(idx: int, sentence: str) -> dict:
+    return {"id": idx, "error": "error: Failed after multiple retries", "error_kind": "transient",
+            "original_sentence": sentence, "raw_response": ""}
+
+
+def test_repair_survives_ids_removed_before_the_merge(tmp_path, monkeypatch):
+    result_file = str(tmp_path / "gpt-4o.json")
+    write_json(result_file, [broken(1, "One."), broken(2, "Two."), broken(3, "Three.")])
+
+    async def fake_process_line(client, config, sentence, *args, **kwargs):
+        if sentence == "One.":
+            # Another writer rewrites the file after the scan: ids 1 and 2 are gone
+            write_json(result_file, [broken(3, "Three.")])
+        if sentence == "Two.":
+            return {"error": "error: Failed after multiple retries", "error_kind": "transient",
+                    "original_sentence": sentence, "raw_response": ""}
+        return dict(GOOD)
+
+    monkeypatch.setattr(engine, "process_line", fake_process_line)
+    monkeypatch.setattr(engine, "make_client", lambda config: None)
+
+    report = asyncio.run(engine.repair("gpt-4o", result_file))
+
+    assert report["missing"] == 2
+    assert report["fixed"] == 2 and report["still_broken"] == 0
+    records = {record["id"]: record for record in read_json(result_file)}
+    assert set(records) == {1, 3}  # The fix for id 1 is kept; the failed retry of the removed id 2 is not
+    assert records[1]["logic_error"] == "yes" and records[1]["sentence"] == "One."
+    assert records[3]["logic_error"] == "yes"
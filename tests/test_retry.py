@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from fallacy.retry import gather_or_abort
+
+
+def test_gather_or_abort_cancels_siblings_on_any_error():
+    cancelled = []
+
+    async def sibling(number):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(number)
+            raise
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        with pytest.raises(RuntimeError, match="boom"):
+            await gather_or_abort([sibling(1), failing(), sibling(2)])
+        # Awaited before the error is re-raised, not merely asked to stop
+        assert sorted(cancelled) == [1, 2]
+
+    asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+def test_gather_or_abort_returns_results_in_order():
+    async def value(number):
+        await asyncio.sleep(0.01 * (3 - number))
+        return number
+
+    assert asyncio.run(gather_or_abort(value(number) for number in range(3))) == [0, 1, 2]